@@ -0,0 +1,909 @@
+# -*- coding: utf-8 -*-
+#
+#    BitcoinLib - Python Cryptocurrency Library
+#    EC BACKENDS - Elliptic curve operations on the secp256k1 curve
+#    © 2017 October - 1200 Web Development <http://1200wd.com/>
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU Affero General Public License as
+#    published by the Free Software Foundation, either version 3 of the
+#    License, or (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU Affero General Public License for more details.
+#
+#    You should have received a copy of the GNU Affero General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import hmac
+import mmap
+import struct
+import hashlib
+import binascii
+import ecdsa
+from bitcoinlib.main import *
+from bitcoinlib.config.secp256k1 import secp256k1_generator, secp256k1_curve, secp256k1_p, secp256k1_n, \
+    secp256k1_Gx, secp256k1_Gy
+
+try:
+    import coincurve
+except ImportError:
+    coincurve = None
+
+
+_logger = logging.getLogger(__name__)
+
+
+class EcBackendError(Exception):
+    """
+    Handle elliptic curve backend Exceptions
+
+    """
+    def __init__(self, msg=''):
+        self.msg = msg
+        _logger.error(msg)
+
+    def __str__(self):
+        return self.msg
+
+
+def _int_to_bytes(i):
+    return binascii.unhexlify('%064x' % i)
+
+
+def _bytes_to_int(b):
+    return int(binascii.hexlify(b), 16)
+
+
+def rfc6979_nonces(digest, secret):
+    """
+    Generate deterministic nonces to sign a digest with a secret as specified in RFC6979, using HMAC-SHA256.
+
+    The first nonce is used to create a signature, the next nonces are only needed if it results in an invalid
+    signature with r or s equal to 0.
+
+    :param digest: Hash to sign
+    :type digest: bytes
+    :param secret: Secret exponent
+    :type secret: int
+
+    :return generator: Nonces as integers
+    """
+    x = _int_to_bytes(secret)
+    h = _int_to_bytes(_bytes_to_int(digest) % secp256k1_n)
+    v = b'\x01' * 32
+    k = b'\x00' * 32
+    k = hmac.new(k, v + b'\x00' + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    k = hmac.new(k, v + b'\x01' + x + h, hashlib.sha256).digest()
+    v = hmac.new(k, v, hashlib.sha256).digest()
+    while True:
+        v = hmac.new(k, v, hashlib.sha256).digest()
+        nonce = _bytes_to_int(v)
+        if 0 < nonce < secp256k1_n:
+            yield nonce
+        k = hmac.new(k, v + b'\x00', hashlib.sha256).digest()
+        v = hmac.new(k, v, hashlib.sha256).digest()
+
+
+def point_on_curve(point):
+    """
+    Check if a point is on the secp256k1 curve: y^2 = x^3 + 7 (mod p). Signatures of public keys which are not on
+    the curve must never be verified, as they can be forged.
+
+    :param point: (x, y) point
+    :type point: tuple
+
+    :return bool:
+    """
+    x, y = point
+    return 0 <= x < secp256k1_p and 0 <= y < secp256k1_p and (y * y - x * x * x - 7) % secp256k1_p == 0
+
+
+def _low_s(r, s):
+    # Use low S value to prevent 'Non-canonical signature: High S Value' errors, (r, n - s) is equally valid
+    if s > secp256k1_n // 2:
+        s = secp256k1_n - s
+    return r, s
+
+
+class EcdsaBackend(object):
+    """
+    Elliptic curve operations with the pure Python ecdsa library, using affine point arithmetic.
+
+    """
+
+    name = 'ecdsa'
+
+    @staticmethod
+    def _point(point):
+        return ecdsa.ellipticcurve.Point(secp256k1_curve, point[0], point[1], secp256k1_n)
+
+    def ec_point(self, secret):
+        """
+        Multiply generator point G with secret
+
+        :param secret: Secret exponent
+        :type secret: int
+
+        :return tuple: (x, y) point
+        """
+        point = secp256k1_generator * secret
+        return point.x(), point.y()
+
+    def point_add(self, point1, point2):
+        """
+        Add two points on the curve
+
+        :param point1: (x, y) point
+        :type point1: tuple
+        :param point2: (x, y) point
+        :type point2: tuple
+
+        :return tuple: (x, y) point
+        """
+        point = self._point(point1) + self._point(point2)
+        return point.x(), point.y()
+
+    def ec_points_add(self, secrets, point):
+        """
+        Calculate secret * G + point for a list of secrets, as used in public BIP32 child key derivation
+
+        :param secrets: List of secret exponents
+        :type secrets: list
+        :param point: (x, y) point to add
+        :type point: tuple
+
+        :return list: List of (x, y) points
+        """
+        return [self.point_add(self.ec_point(secret), point) for secret in secrets]
+
+    def point_multiply(self, point, k):
+        """
+        Multiply a point on the curve with k
+
+        :param point: (x, y) point
+        :type point: tuple
+        :param k: Multiplier
+        :type k: int
+
+        :return tuple: (x, y) point
+        """
+        point = self._point(point) * k
+        return point.x(), point.y()
+
+    def sign(self, digest, secret):
+        """
+        Sign a 32 byte digest with secret exponent
+
+        :param digest: Hash to sign
+        :type digest: bytes
+        :param secret: Secret exponent
+        :type secret: int
+
+        :return tuple: Signature as (r, s) integers with low S value
+        """
+        sk = ecdsa.SigningKey.from_secret_exponent(secret, curve=ecdsa.SECP256k1)
+        nonce = next(rfc6979_nonces(digest, secret))
+        return _low_s(*sk.sign_digest(digest, sigencode=lambda r, s, order: (r, s), k=nonce))
+
+    def verify(self, digest, signature, point):
+        """
+        Verify if signature signs digest and corresponds with public key point
+
+        :param digest: Signed hash
+        :type digest: bytes
+        :param signature: Signature as (r, s) integers
+        :type signature: tuple
+        :param point: Public key (x, y) point
+        :type point: tuple
+
+        :return bool:
+        """
+        vk = self._verifying_key(point)
+        return vk is not None and self._verify_vk(vk, digest, signature)
+
+    def _verifying_key(self, point):
+        if not point_on_curve(point):
+            return None
+        try:
+            return ecdsa.VerifyingKey.from_public_point(self._point(point), curve=ecdsa.SECP256k1)
+        except (AssertionError, ValueError):
+            return None
+
+    @staticmethod
+    def _verify_vk(vk, digest, signature):
+        try:
+            return vk.verify_digest(signature, digest, sigdecode=lambda sig, order: sig)
+        except (ecdsa.keys.BadSignatureError, ecdsa.keys.BadDigestError):
+            return False
+
+    def verify_batch(self, items):
+        """
+        Verify a list of signatures. A verifying key is created once for every public key point in the list.
+
+        :param items: List of (digest, signature, point) tuples, signatures as (r, s) integers
+        :type items: list
+
+        :return list: List of booleans
+        """
+        vks = {}
+        results = []
+        for digest, signature, point in items:
+            if point not in vks:
+                vks[point] = self._verifying_key(point)
+            results.append(vks[point] is not None and self._verify_vk(vks[point], digest, signature))
+        return results
+
+
+# Jacobian coordinate helpers for the PythonBackend. Points are (X, Y, Z) tuples which represent the affine point
+# (X / Z^2, Y / Z^3), Z = 0 is the point at infinity. The curve parameter a is 0 for secp256k1.
+_INFINITY = (0, 1, 0)
+
+
+def _jacobian_double(point):
+    x1, y1, z1 = point
+    if not z1 or not y1:
+        return _INFINITY
+    p = secp256k1_p
+    yy = y1 * y1 % p
+    s = 4 * x1 * yy % p
+    m = 3 * x1 * x1 % p
+    x3 = (m * m - 2 * s) % p
+    y3 = (m * (s - x3) - 8 * yy * yy) % p
+    z3 = 2 * y1 * z1 % p
+    return x3, y3, z3
+
+
+def _jacobian_add(point1, point2):
+    x1, y1, z1 = point1
+    x2, y2, z2 = point2
+    if not z1:
+        return point2
+    if not z2:
+        return point1
+    p = secp256k1_p
+    z1z1 = z1 * z1 % p
+    z2z2 = z2 * z2 % p
+    u1 = x1 * z2z2 % p
+    u2 = x2 * z1z1 % p
+    s1 = y1 * z2 * z2z2 % p
+    s2 = y2 * z1 * z1z1 % p
+    h = (u2 - u1) % p
+    r = (s2 - s1) % p
+    if not h:
+        if not r:
+            return _jacobian_double(point1)
+        return _INFINITY
+    hh = h * h % p
+    hhh = h * hh % p
+    v = u1 * hh % p
+    x3 = (r * r - hhh - 2 * v) % p
+    y3 = (r * (v - x3) - s1 * hhh) % p
+    z3 = z1 * z2 * h % p
+    return x3, y3, z3
+
+
+def _jacobian_add_affine(point1, point2):
+    # Mixed addition of a jacobian point1 and affine (x, y) point2, saves multiplications because z2 = 1
+    x1, y1, z1 = point1
+    x2, y2 = point2
+    if not z1:
+        return x2, y2, 1
+    p = secp256k1_p
+    z1z1 = z1 * z1 % p
+    u2 = x2 * z1z1 % p
+    s2 = y2 * z1 * z1z1 % p
+    h = (u2 - x1) % p
+    r = (s2 - y1) % p
+    if not h:
+        if not r:
+            return _jacobian_double(point1)
+        return _INFINITY
+    hh = h * h % p
+    hhh = h * hh % p
+    v = x1 * hh % p
+    x3 = (r * r - hhh - 2 * v) % p
+    y3 = (r * (v - x3) - y1 * hhh) % p
+    z3 = z1 * h % p
+    return x3, y3, z3
+
+
+def _jacobian_to_affine(point):
+    x, y, z = point
+    if not z:
+        raise EcBackendError("Point at infinity has no affine coordinates")
+    p = secp256k1_p
+    zinv = pow(z, p - 2, p)
+    zinv2 = zinv * zinv % p
+    return x * zinv2 % p, y * zinv2 * zinv % p
+
+
+def _batch_inverse(values, modulus):
+    # Modular inverses of a list of non-zero values with a single modular inversion (Montgomery's trick)
+    prefix = []
+    acc = 1
+    for value in values:
+        prefix.append(acc)
+        acc = acc * value % modulus
+    inv = pow(acc, modulus - 2, modulus)
+    inverses = [None] * len(values)
+    for i in reversed(range(len(values))):
+        inverses[i] = inv * prefix[i] % modulus
+        inv = inv * values[i] % modulus
+    return inverses
+
+
+def _batch_to_affine(points):
+    # Convert a list of jacobian points to affine coordinates with a single modular inversion
+    p = secp256k1_p
+    affine = []
+    for (x, y, z), zinv in zip(points, _batch_inverse([point[2] for point in points], p)):
+        zinv2 = zinv * zinv % p
+        affine.append((x * zinv2 % p, y * zinv2 * zinv % p))
+    return affine
+
+
+def _wnaf(k, width):
+    # Width-w non-adjacent form of k, least significant digit first. Non-zero digits are odd and |digit| < 2^(w-1)
+    digits = []
+    window = 1 << width
+    half_window = window >> 1
+    while k:
+        if k & 1:
+            digit = k % window
+            if digit >= half_window:
+                digit -= window
+            k -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        k >>= 1
+    return digits
+
+
+def _odd_multiples_affine(point, width):
+    # Affine points P, 3P, 5P, ..., (2^(w-1) - 1)P and their negations for wNAF multiplication
+    p = secp256k1_p
+    double = _jacobian_double((point[0], point[1], 1))
+    multiples = [(point[0], point[1], 1)]
+    for _ in range((1 << (width - 2)) - 1):
+        multiples.append(_jacobian_add(multiples[-1], double))
+    affine = _batch_to_affine(multiples)
+    return affine, [(x, p - y) for x, y in affine]
+
+
+def _jacobian_multiply_wnaf(k, multiples, multiples_neg):
+    result = _INFINITY
+    for digit in reversed(_wnaf(k, _WNAF_WIDTH)):
+        result = _jacobian_double(result)
+        if digit > 0:
+            result = _jacobian_add_affine(result, multiples[digit >> 1])
+        elif digit < 0:
+            result = _jacobian_add_affine(result, multiples_neg[(-digit) >> 1])
+    return result
+
+
+def _jacobian_multiply_ladder(point, k):
+    # Montgomery ladder: performs the same sequence of additions and doublings for every bit of k
+    r0 = _INFINITY
+    r1 = (point[0], point[1], 1)
+    for i in reversed(range(secp256k1_n.bit_length())):
+        if (k >> i) & 1:
+            r0 = _jacobian_add(r0, r1)
+            r1 = _jacobian_double(r1)
+        else:
+            r1 = _jacobian_add(r0, r1)
+            r0 = _jacobian_double(r0)
+    return r0
+
+
+_WNAF_WIDTH = 5
+
+
+class GeneratorTable(object):
+    """
+    Precomputed table of multiples of generator point G for fixed-base multiplication.
+
+    For every window i of 8 bits of the secret the table contains the affine points d * 256^i * G for d = 1..255,
+    so G * secret is calculated with at most 32 point additions and without any point doublings. Points are stored
+    as 64 byte x + y strings in one buffer, which can be a bytes object or a memory-mapped table file.
+
+    """
+
+    WINDOW_BITS = 8
+    WINDOWS = 32
+    MAGIC = b'BLGT'
+    VERSION = 2
+    # Magic bytes, format version, window bits, table size and SHA256 checksum of the points
+    HEADER_SIZE = 4 + 1 + 1 + 4 + 32
+    POINT_SIZE = 64
+
+    def __init__(self, data):
+        """
+        Initialize table from a buffer with table header and points. Use the build or load methods to create a table.
+
+        :param data: Table data as bytes or mmap object
+        :type data: bytes, mmap
+        """
+        self._data = data
+        self._digits = (1 << self.WINDOW_BITS) - 1
+
+    @classmethod
+    def size(cls):
+        return cls.HEADER_SIZE + cls.WINDOWS * ((1 << cls.WINDOW_BITS) - 1) * cls.POINT_SIZE
+
+    @classmethod
+    def _marker(cls):
+        return cls.MAGIC + struct.pack('<BBL', cls.VERSION, cls.WINDOW_BITS, cls.size())
+
+    @classmethod
+    def _header(cls, body):
+        return cls._marker() + hashlib.sha256(body).digest()
+
+    @classmethod
+    def build(cls):
+        """
+        Calculate table of generator multiples. Takes a fraction of a second, see also load() to use a cached table.
+
+        :return GeneratorTable:
+        """
+        digits = (1 << cls.WINDOW_BITS) - 1
+        body = []
+        base = (secp256k1_Gx, secp256k1_Gy, 1)
+        for _ in range(cls.WINDOWS):
+            multiples = [base]
+            for _ in range(digits - 1):
+                multiples.append(_jacobian_add(multiples[-1], base))
+            # Base for next window is 2^WINDOW_BITS * base = (digits * base) + base
+            base = _jacobian_add(multiples[-1], base)
+            body += [_int_to_bytes(x) + _int_to_bytes(y) for x, y in _batch_to_affine(multiples)]
+        body = b''.join(body)
+        return cls(cls._header(body) + body)
+
+    @classmethod
+    def load(cls, filename, verify=True):
+        """
+        Load table from file created with the save() method. The file is memory-mapped, so the operating system
+        shares it between processes.
+
+        The format version, window size and table size in the header, the first point and the SHA256 checksum of all
+        points are checked, so a truncated or corrupted file is never used. The checksum takes about a millisecond
+        and can be skipped with verify=False.
+
+        :param filename: Path to table file
+        :type filename: str
+        :param verify: Verify checksum of all points in table. Default is True
+        :type verify: bool
+
+        :return GeneratorTable: Table object or None if file is missing, corrupted or in an unknown format
+        """
+        try:
+            with open(filename, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            return None
+        marker_size = cls.HEADER_SIZE - 32
+        table = cls(data)
+        if len(data) != cls.size() or data[:marker_size] != cls._marker() or \
+                table.point(0, 1) != (secp256k1_Gx, secp256k1_Gy) or \
+                (verify and data[marker_size:cls.HEADER_SIZE] != hashlib.sha256(data[cls.HEADER_SIZE:]).digest()):
+            _logger.warning("Ignoring invalid generator table file %s" % filename)
+            data.close()
+            return None
+        return table
+
+    def save(self, filename):
+        """
+        Write table to file. The file is written to a temporary file first and then renamed, so other processes
+        never see a partially written table.
+
+        :param filename: Path to table file
+        :type filename: str
+
+        :return bool: True if table is saved
+        """
+        tmpfile = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            with open(tmpfile, 'wb') as f:
+                f.write(self._data[:])
+            os.rename(tmpfile, filename)
+        except (IOError, OSError) as e:
+            _logger.warning("Could not save generator table to %s: %s" % (filename, e))
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+            return False
+        return True
+
+    def point(self, window, digit):
+        """
+        Get affine point digit * 2^(8 * window) * G from table
+
+        :param window: Window number, 0 is the least significant window
+        :type window: int
+        :param digit: Value of the window, between 1 and 255
+        :type digit: int
+
+        :return tuple: (x, y) point
+        """
+        pos = self.HEADER_SIZE + (window * self._digits + digit - 1) * self.POINT_SIZE
+        return _bytes_to_int(self._data[pos:pos + 32]), _bytes_to_int(self._data[pos + 32:pos + 64])
+
+    def multiply(self, k):
+        """
+        Multiply generator point G with k, which must be between 0 and 2^256
+
+        :param k: Multiplier
+        :type k: int
+
+        :return tuple: jacobian (X, Y, Z) point
+        """
+        result = _INFINITY
+        window = 0
+        while k:
+            digit = k & self._digits
+            if digit:
+                result = _jacobian_add_affine(result, self.point(window, digit))
+            k >>= self.WINDOW_BITS
+            window += 1
+        return result
+
+
+_G_TABLE = None
+
+
+def generator_table(filename=DEFAULT_EC_TABLEFILE):
+    """
+    Get the precomputed table of generator multiples. The table is created on first use. If a filename is given the
+    table is loaded from this file, or calculated and saved to this file if it does not exist yet or is invalid.
+
+    The default file location can be changed with the BITCOINLIB_EC_TABLEFILE environment variable, set it to an
+    empty string to disable the on-disk cache.
+
+    :param filename: Path to table file, use None to keep the table in memory only
+    :type filename: str
+
+    :return GeneratorTable:
+    """
+    global _G_TABLE
+    if _G_TABLE is None:
+        table = GeneratorTable.load(filename) if filename else None
+        if table is None:
+            table = GeneratorTable.build()
+            if filename:
+                table.save(filename)
+        _G_TABLE = table
+    return _G_TABLE
+
+
+class PythonBackend(object):
+    """
+    Optimized pure Python elliptic curve operations. Uses jacobian coordinates to avoid modular inversions, a
+    precomputed table of generator multiples (see GeneratorTable) for multiplications of the generator point and a
+    Montgomery ladder for other points.
+
+    """
+
+    name = 'python'
+
+    def ec_point(self, secret):
+        """
+        Multiply generator point G with secret
+
+        :param secret: Secret exponent
+        :type secret: int
+
+        :return tuple: (x, y) point
+        """
+        if not 0 < secret < secp256k1_n:
+            raise EcBackendError("Secret must be between 1 and secp256k1_n")
+        return _jacobian_to_affine(generator_table().multiply(secret))
+
+    def point_add(self, point1, point2):
+        """
+        Add two points on the curve
+
+        :param point1: (x, y) point
+        :type point1: tuple
+        :param point2: (x, y) point
+        :type point2: tuple
+
+        :return tuple: (x, y) point
+        """
+        return _jacobian_to_affine(_jacobian_add_affine((point1[0], point1[1], 1), point2))
+
+    def ec_points_add(self, secrets, point):
+        """
+        Calculate secret * G + point for a list of secrets, as used in public BIP32 child key derivation.
+        All points are converted to affine coordinates with a single modular inversion
+
+        :param secrets: List of secret exponents
+        :type secrets: list
+        :param point: (x, y) point to add
+        :type point: tuple
+
+        :return list: List of (x, y) points
+        """
+        table = generator_table()
+        points = [_jacobian_add_affine(table.multiply(secret), point) for secret in secrets]
+        if not all(p[2] for p in points):
+            raise EcBackendError("Point at infinity has no affine coordinates")
+        return _batch_to_affine(points)
+
+    def point_multiply(self, point, k):
+        """
+        Multiply a point on the curve with k
+
+        :param point: (x, y) point
+        :type point: tuple
+        :param k: Multiplier
+        :type k: int
+
+        :return tuple: (x, y) point
+        """
+        return _jacobian_to_affine(_jacobian_multiply_ladder(point, k % secp256k1_n))
+
+    def sign(self, digest, secret):
+        """
+        Sign a 32 byte digest with secret exponent
+
+        :param digest: Hash to sign
+        :type digest: bytes
+        :param secret: Secret exponent
+        :type secret: int
+
+        :return tuple: Signature as (r, s) integers with low S value
+        """
+        n = secp256k1_n
+        z = _bytes_to_int(digest)
+        for k in rfc6979_nonces(digest, secret):
+            r = self.ec_point(k)[0] % n
+            if not r:
+                continue
+            s = pow(k, n - 2, n) * (z + r * secret) % n
+            if s:
+                return _low_s(r, s)
+
+    def verify(self, digest, signature, point):
+        """
+        Verify if signature signs digest and corresponds with public key point
+
+        :param digest: Signed hash
+        :type digest: bytes
+        :param signature: Signature as (r, s) integers
+        :type signature: tuple
+        :param point: Public key (x, y) point
+        :type point: tuple
+
+        :return bool:
+        """
+        n = secp256k1_n
+        r, s = signature
+        if not (0 < r < n and 0 < s < n) or not point_on_curve(point):
+            return False
+        w = pow(s, n - 2, n)
+        u1 = _bytes_to_int(digest) * w % n
+        u2 = r * w % n
+        rp = _jacobian_add(generator_table().multiply(u1),
+                           _jacobian_multiply_wnaf(u2, *_odd_multiples_affine(point, _WNAF_WIDTH)))
+        if not rp[2]:
+            return False
+        return _jacobian_to_affine(rp)[0] % n == r
+
+    def verify_batch(self, items):
+        """
+        Verify a list of signatures
+
+        Shares the expensive steps between signatures: the inverses of all s values are calculated with a single
+        modular inversion, the precomputed multiples of a public key point are reused for all signatures of this key,
+        and the resulting points are converted to affine coordinates with one inversion.
+
+        :param items: List of (digest, signature, point) tuples, signatures as (r, s) integers
+        :type items: list
+
+        :return list: List of booleans
+        """
+        n = secp256k1_n
+        results = [False] * len(items)
+        on_curve = {}
+        for _, _, point in items:
+            if point not in on_curve:
+                on_curve[point] = point_on_curve(point)
+        valid = [pos for pos, (_, (r, s), point) in enumerate(items) if 0 < r < n and 0 < s < n and on_curve[point]]
+        inverses = _batch_inverse([items[pos][1][1] for pos in valid], n)
+        table = generator_table()
+        multiples = {}
+        checks = []
+        for pos, w in zip(valid, inverses):
+            digest, (r, s), point = items[pos]
+            if point not in multiples:
+                multiples[point] = _odd_multiples_affine(point, _WNAF_WIDTH)
+            rp = _jacobian_add(table.multiply(_bytes_to_int(digest) * w % n),
+                               _jacobian_multiply_wnaf(r * w % n, *multiples[point]))
+            if rp[2]:
+                checks.append((pos, r, rp))
+        for (pos, r, _), affine in zip(checks, _batch_to_affine([rp for _, _, rp in checks])):
+            results[pos] = affine[0] % n == r
+        return results
+
+
+class Secp256k1Backend(object):
+    """
+    Elliptic curve operations with the native libsecp256k1 library through the coincurve package.
+
+    """
+
+    name = 'secp256k1'
+
+    def __init__(self):
+        if coincurve is None:
+            raise EcBackendError("Package coincurve not found, please install to use the secp256k1 backend")
+
+    def ec_point(self, secret):
+        """
+        Multiply generator point G with secret
+
+        :param secret: Secret exponent
+        :type secret: int
+
+        :return tuple: (x, y) point
+        """
+        if not 0 < secret < secp256k1_n:
+            raise EcBackendError("Secret must be between 1 and secp256k1_n")
+        return coincurve.PublicKey.from_valid_secret(_int_to_bytes(secret)).point()
+
+    def point_add(self, point1, point2):
+        """
+        Add two points on the curve
+
+        :param point1: (x, y) point
+        :type point1: tuple
+        :param point2: (x, y) point
+        :type point2: tuple
+
+        :return tuple: (x, y) point
+        """
+        return coincurve.PublicKey.combine_keys([coincurve.PublicKey.from_point(*point1),
+                                                 coincurve.PublicKey.from_point(*point2)]).point()
+
+    def ec_points_add(self, secrets, point):
+        """
+        Calculate secret * G + point for a list of secrets, as used in public BIP32 child key derivation
+
+        :param secrets: List of secret exponents
+        :type secrets: list
+        :param point: (x, y) point to add
+        :type point: tuple
+
+        :return list: List of (x, y) points
+        """
+        pub = coincurve.PublicKey.from_point(*point)
+        return [pub.add(_int_to_bytes(secret)).point() for secret in secrets]
+
+    def point_multiply(self, point, k):
+        """
+        Multiply a point on the curve with k
+
+        :param point: (x, y) point
+        :type point: tuple
+        :param k: Multiplier
+        :type k: int
+
+        :return tuple: (x, y) point
+        """
+        return coincurve.PublicKey.from_point(*point).multiply(_int_to_bytes(k % secp256k1_n)).point()
+
+    def sign(self, digest, secret):
+        """
+        Sign a 32 byte digest with secret exponent
+
+        :param digest: Hash to sign
+        :type digest: bytes
+        :param secret: Secret exponent
+        :type secret: int
+
+        :return tuple: Signature as (r, s) integers with low S value
+        """
+        # libsecp256k1 uses RFC6979 nonces and always returns low S values
+        sig = coincurve.PrivateKey(_int_to_bytes(secret)).sign_recoverable(digest, hasher=None)
+        return _bytes_to_int(sig[:32]), _bytes_to_int(sig[32:64])
+
+    def verify(self, digest, signature, point):
+        """
+        Verify if signature signs digest and corresponds with public key point
+
+        :param digest: Signed hash
+        :type digest: bytes
+        :param signature: Signature as (r, s) integers
+        :type signature: tuple
+        :param point: Public key (x, y) point
+        :type point: tuple
+
+        :return bool:
+        """
+        r, s = signature
+        if not (0 < r < secp256k1_n and 0 < s < secp256k1_n) or not point_on_curve(point):
+            return False
+        # libsecp256k1 only accepts low S values, a signature with S or n - S is equally valid
+        if s > secp256k1_n // 2:
+            s = secp256k1_n - s
+        try:
+            pub = coincurve.PublicKey.from_point(*point)
+        except ValueError:
+            return False
+        return pub.verify(ecdsa.util.sigencode_der(r, s, secp256k1_n), digest, hasher=None)
+
+    def verify_batch(self, items):
+        """
+        Verify a list of signatures. A libsecp256k1 public key object is created once for every public key point.
+
+        :param items: List of (digest, signature, point) tuples, signatures as (r, s) integers
+        :type items: list
+
+        :return list: List of booleans
+        """
+        pubs = {}
+        results = []
+        for digest, (r, s), point in items:
+            if not (0 < r < secp256k1_n and 0 < s < secp256k1_n):
+                results.append(False)
+                continue
+            if s > secp256k1_n // 2:
+                s = secp256k1_n - s
+            if point not in pubs:
+                try:
+                    pubs[point] = coincurve.PublicKey.from_point(*point) if point_on_curve(point) else None
+                except ValueError:
+                    pubs[point] = None
+            results.append(pubs[point] is not None and
+                           pubs[point].verify(ecdsa.util.sigencode_der(r, s, secp256k1_n), digest, hasher=None))
+        return results
+
+
+EC_BACKENDS = {
+    'ecdsa': EcdsaBackend,
+    'python': PythonBackend,
+    'secp256k1': Secp256k1Backend,
+}
+
+
+def get_backend(name='auto'):
+    """
+    Get elliptic curve backend object by name.
+
+    Available backends are 'secp256k1' (native libsecp256k1 library, requires the coincurve package), 'python'
+    (optimized pure Python) and 'ecdsa' (ecdsa library). Use 'auto' to select the secp256k1 backend if available and
+    the python backend otherwise.
+
+    :param name: Backend name
+    :type name: str
+
+    :return object: Backend object
+    """
+    if name == 'auto':
+        name = 'secp256k1' if coincurve is not None else 'python'
+    if name not in EC_BACKENDS:
+        raise EcBackendError("Unknown elliptic curve backend %s, use one of %s" % (name, list(EC_BACKENDS.keys())))
+    return EC_BACKENDS[name]()
+
+
+def set_backend(name='auto'):
+    """
+    Select elliptic curve backend used for key derivation, signing and signature verification.
+
+    :param name: Backend name, see get_backend for available options
+    :type name: str
+
+    :return object: Backend object
+    """
+    global backend
+    backend = get_backend(name)
+    _logger.info("Using elliptic curve backend '%s'" % backend.name)
+    return backend
+
+
+backend = set_backend(DEFAULT_EC_BACKEND)
@@ -21,6 +21,7 @@
 import sys
 import math
 import numbers
+import collections
 import ecdsa
 import struct
 import hashlib
@@ -44,6 +45,85 @@ class EncodingError(Exception):
     def __str__(self):
         return self.msg
 
+
+class LRUCache(object):
+    """
+    Bounded in-memory cache. When the cache is full the least recently used item is removed.
+
+    The number of cache hits and misses of lookups are counted in the hits and misses attributes.
+    """
+
+    def __init__(self, maxsize):
+        """
+        Initialize cache
+
+        :param maxsize: Maximum number of items in cache, use 0 to disable caching
+        :type maxsize: int
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        """
+        Get item from cache and mark it as most recently used
+
+        :param key: Cache key
+        :type key: hashable
+
+        :return: Cached value or None if not found
+        """
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return None
+        self._items[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Add item to cache, removes least recently used items if cache is full
+
+        :param key: Cache key
+        :type key: hashable
+        :param value: Value to cache
+        """
+        if not self.maxsize:
+            return
+        self._items.pop(key, None)
+        self._items[key] = value
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def resize(self, maxsize):
+        """
+        Change maximum size of cache
+
+        :param maxsize: Maximum number of items in cache, use 0 to disable caching
+        :type maxsize: int
+        """
+        self.maxsize = maxsize
+        while len(self._items) > maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all items from cache and reset hit and miss counters
+        """
+        self._items.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 bytesascii = b''
 for x in range(256):
     bytesascii += bytes(bytearray((x,)))
@@ -59,6 +139,10 @@ code_strings = {
 }
 
 
+_b58_alphabet = code_strings[58].decode('ascii')
+_b58_index = dict((c, i) for i, c in enumerate(_b58_alphabet))
+
+
 def _get_code_string(base):
     if base in code_strings:
         return code_strings[base]
@@ -236,6 +320,89 @@ def change_base(chars, base_from, base_to, min_lenght=0, output_even=None, outpu
         return output
 
 
+def b58encode(v):
+    """
+    Encode bytes to a Base58 string.
+
+    Uses integer arithmetic on the whole input instead of converting character by character. Every leading zero byte
+    is encoded as a leading '1' character.
+
+    :param v: Bytes to encode
+    :type v: bytes, bytearray
+
+    :return str: Base58 encoded string
+    """
+    v = bytes(normalize_var(v))
+    n_zeros = len(v) - len(v.lstrip(b'\0'))
+    n = int(binascii.hexlify(v), 16) if v else 0
+    output = []
+    while n:
+        n, remainder = divmod(n, 58)
+        output.append(_b58_alphabet[remainder])
+    return '1' * n_zeros + ''.join(reversed(output))
+
+
+def b58decode(s):
+    """
+    Decode a Base58 string to bytes. Every leading '1' character is decoded as a leading zero byte.
+
+    :param s: Base58 encoded string
+    :type s: str, bytes
+
+    :return bytes: Decoded bytes
+    """
+    if isinstance(s, (bytes, bytearray)):
+        try:
+            s = bytes(s).decode('ascii')
+        except UnicodeDecodeError:
+            raise EncodingError("Invalid Base58 input, non-ascii characters found")
+    if not isinstance(s, (str, unicode if not PY3 else str)):
+        raise EncodingError("Base58 input must be a string or bytes")
+    n = 0
+    try:
+        for c in s:
+            n = n * 58 + _b58_index[c]
+    except KeyError:
+        raise EncodingError("Unknown character '%s' in Base58 input" % c)
+    n_zeros = len(s) - len(s.lstrip('1'))
+    if not n:
+        return b'\0' * n_zeros
+    h = '%x' % n
+    return b'\0' * n_zeros + binascii.unhexlify('0' * (len(h) % 2) + h)
+
+
+def b58check_encode(v):
+    """
+    Encode bytes to Base58Check: append the first 4 bytes of the double SHA256 of the input as checksum and
+    Base58 encode the result.
+
+    :param v: Bytes to encode, normally a version byte followed by the payload
+    :type v: bytes, bytearray
+
+    :return str: Base58Check encoded string
+    """
+    v = bytes(normalize_var(v))
+    return b58encode(v + hashlib.sha256(hashlib.sha256(v).digest()).digest()[:4])
+
+
+def b58check_decode(s):
+    """
+    Decode a Base58Check string and verify its checksum.
+
+    :param s: Base58Check encoded string
+    :type s: str, bytes
+
+    :return bytes: Decoded bytes without the 4 byte checksum
+    """
+    v = b58decode(s)
+    if len(v) < 4:
+        raise EncodingError("Invalid Base58Check input, too short to contain a checksum")
+    payload, check = v[:-4], v[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != check:
+        raise EncodingError("Invalid checksum for Base58Check input")
+    return payload
+
+
 def varbyteint_to_int(byteint):
     """
     Convert CompactSize Variable length integer in byte format to integer.
@@ -337,15 +504,11 @@ def addr_to_pubkeyhash(address, as_hex=False):
     :return bytes, str: public key hash
     """
     try:
-        address = change_base(address, 58, 256, 25)
+        pkh = b58check_decode(address)
     except EncodingError as err:
         raise EncodingError("Invalid address %s: %s" % (address, err))
-    check = address[-4:]
-    pkh = address[:-4]
-    checksum = hashlib.sha256(hashlib.sha256(pkh).digest()).digest()[0:4]
-    assert (check == checksum), "Invalid address, checksum incorrect"
     if as_hex:
-        return change_base(pkh, 256, 16)[2:]
+        return to_hexstring(pkh[1:])
     else:
         return pkh[1:]
 
@@ -363,9 +526,7 @@ def pubkeyhash_to_addr(pkh, versionbyte=b'\x00'):
 
     """
     pkh = to_bytearray(pkh)
-    key = versionbyte + pkh
-    addr256 = key + hashlib.sha256(hashlib.sha256(key).digest()).digest()[:4]
-    return change_base(addr256, 256, 58)
+    return b58check_encode(versionbyte + pkh)
 
 
 def script_to_pubkeyhash(script):
@@ -19,9 +19,12 @@
 #
 
 import binascii
+import collections
+import copy
 import hashlib
 import hmac
 import numbers
+import multiprocessing
 import random
 import struct
 import sys
@@ -32,9 +35,10 @@ from Crypto.Cipher import AES
 
 from bitcoinlib.main import *
 from bitcoinlib.networks import Network, DEFAULT_NETWORK, network_by_value, network_values_for
-from bitcoinlib.config.secp256k1 import secp256k1_generator as generator, secp256k1_curve as curve, \
-    secp256k1_p, secp256k1_n
-from bitcoinlib.encoding import change_base, to_bytes, to_hexstring, EncodingError
+from bitcoinlib.config.secp256k1 import secp256k1_curve as curve, secp256k1_p, secp256k1_n
+from bitcoinlib import ecbackends
+from bitcoinlib.encoding import change_base, to_bytes, to_hexstring, EncodingError, b58decode, b58check_encode, \
+    b58check_decode, LRUCache
 
 
 _logger = logging.getLogger(__name__)
@@ -149,7 +153,7 @@ def get_key_format(key, isprivate=None):
         isprivate = True
     else:
         try:
-            key_hex = change_base(key, 58, 16)
+            key_hex = to_hexstring(b58decode(key))
             networks = network_by_value('prefix_wif', key_hex[:2])
             if networks:
                 if key_hex[-10:-8] == '01':
@@ -195,10 +199,8 @@ def ec_point(p):
     
     :return Point: Point multiplied by generator G
     """
-    p = int(p)
-    point = generator
-    point *= p
-    return point
+    x, y = ecbackends.backend.ec_point(int(p))
+    return ecdsa.ellipticcurve.Point(curve, x, y, secp256k1_n)
 
 
 def deserialize_address(address):
@@ -215,13 +217,11 @@ def deserialize_address(address):
     :return dict: with information about this address
     """
     try:
-        address_bytes = change_base(address, 58, 256, 25)
+        key_hash = b58check_decode(address)
     except EncodingError as err:
         raise EncodingError("Invalid address %s: %s" % (address, err))
-    check = address_bytes[-4:]
-    key_hash = address_bytes[:-4]
-    checksum = hashlib.sha256(hashlib.sha256(key_hash).digest()).digest()[0:4]
-    assert (check == checksum), "Invalid address, checksum incorrect"
+    if len(key_hash) != 21:
+        raise EncodingError("Invalid address %s: length of %d bytes is incorrect" % (address, len(key_hash) + 4))
     address_prefix = key_hash[0:1]
     networks_p2pkh = network_by_value('prefix_address', address_prefix)
     networks_p2sh = network_by_value('prefix_address_p2sh', address_prefix)
@@ -239,7 +239,7 @@ def deserialize_address(address):
 
     return {
         'address': address,
-        'public_key_hash': change_base(public_key_hash, 256, 16),
+        'public_key_hash': to_hexstring(public_key_hash),
         'public_key_hash_bytes': public_key_hash,
         'network': network,
         'script_type': script_type,
@@ -248,19 +248,63 @@ def deserialize_address(address):
     }
 
 
-class Key:
+def _deserialize_address_item(address):
+    try:
+        address_dict = deserialize_address(address)
+        address_dict['error'] = ''
+        return address_dict
+    except EncodingError as err:
+        return {'address': address, 'error': str(err)}
+
+
+def deserialize_addresses(addresses, processes=None, chunksize=1000):
+    """
+    Deserialize a list or other iterable of addresses. Works like deserialize_address but yields a dictionary for
+    each address in the same order as the input.
+
+    Invalid addresses do not raise an error, instead a dictionary with the 'address' and an 'error' message is
+    returned. For valid addresses the 'error' item is empty.
+
+    For large batches the work can be spread over a pool of worker processes.
+
+    :param addresses: List, generator or other iterable of base-58 encoded addresses
+    :type addresses: list, iterable
+    :param processes: Number of worker processes to use. Leave empty to deserialize in current process
+    :type processes: int
+    :param chunksize: Number of addresses send to a worker process at once. Only used if processes is specified.
+    :type chunksize: int
+
+    :return generator: Dictionaries with address information or error
+    """
+    if not processes:
+        for address in addresses:
+            yield _deserialize_address_item(address)
+        return
+    pool = multiprocessing.Pool(processes)
+    try:
+        for address_dict in pool.imap(_deserialize_address_item, addresses, chunksize):
+            yield address_dict
+    finally:
+        pool.terminate()
+
+
+class Key(object):
     """
     Class to generate, import and convert public cryptograpic key pairs used for bitcoin.
 
     If no key is specified when creating class a cryptographically secure Private Key is
     generated using the os.urandom() function.
+
+    The public key is derived from the private key when it is first used, so creating a Key object only to get the WIF
+    or private key bytes does not require an elliptic curve point multiplication. The key data is stored as bytes and
+    integers, hexstring versions are created on request.
     """
 
     def __init__(self, import_key=None, network=None, compressed=True, passphrase=''):
         """
         Initialize a Key object. Import key can be in WIF, bytes, hexstring, etc.
-        If a private key is imported a public key will be derived. If a public is imported the private key data will
-        be empty.
+        If a private key is imported a public key will be derived when needed. If a public is imported the private key
+        data will be empty.
         
         Both compressed and uncompressed key version is available, the Key.compressed boolean attribute tells if the
         original imported key was compressed or not.
@@ -276,18 +320,16 @@ class Key:
         
         :return: Key object
         """
-        self.public_hex = None
-        self.public_uncompressed_hex = None
-        self.public_byte = None
-        self.public_uncompressed_byte = None
+        self._point = None
+        self._public_byte = None
+        self._public_uncompressed_byte = None
+        self._hash160_cache = {}
+        self._address_cache = {}
         self.private_byte = None
-        self.private_hex = None
-        self._x = None
-        self._y = None
         self.secret = None
         self.compressed = compressed
         if not import_key:
-            import_key = random.SystemRandom().randint(0, secp256k1_n)
+            import_key = random.SystemRandom().randint(1, secp256k1_n - 1)
         kf = get_key_format(import_key)
         self.key_format = kf["format"]
         network = check_network_and_key(import_key, network, kf["networks"])
@@ -304,58 +346,33 @@ class Key:
             import_key, self.key_format = self._bip38_decrypt(import_key, passphrase)
 
         if not self.isprivate:
-            self.secret = None
-            pub_key = to_hexstring(import_key)
-            if len(pub_key) == 130:
-                self.public_uncompressed_hex = pub_key
-                self._x = pub_key[2:66]
-                self._y = pub_key[66:130]
+            pub_key = to_bytes(import_key)
+            if len(pub_key) == 65:
                 self.compressed = False
-                if int(self._y, 16) % 2:
-                    prefix = '03'
-                else:
-                    prefix = '02'
-                self.public_hex = prefix + self._x
+                self._public_uncompressed_byte = pub_key
+                self._point = (int(binascii.hexlify(pub_key[1:33]), 16), int(binascii.hexlify(pub_key[33:]), 16))
             else:
-                self.public_hex = pub_key
-                self._x = pub_key[2:66]
                 self.compressed = True
-                # Calculate y from x with y=x^3 + 7 function
-                sign = pub_key[:2] == '03'
-                x = int(self._x, 16)
-                ys = (x**3+7) % secp256k1_p
-                y = ecdsa.numbertheory.square_root_mod_prime(ys, secp256k1_p)
-                if y & 1 != sign:
-                    y = secp256k1_p - y
-                self._y = change_base(y, 10, 16, 64)
-                self.public_uncompressed_hex = '04' + self._x + self._y
-            self.public_byte = binascii.unhexlify(self.public_hex)
-            self.public_uncompressed_byte = binascii.unhexlify(self.public_uncompressed_hex)
-        elif self.isprivate and self.key_format == 'decimal':
-            self.secret = import_key
-            self.private_hex = change_base(import_key, 10, 16, 64)
-            self.private_byte = binascii.unhexlify(self.private_hex)
-        elif self.isprivate:
+                self._public_byte = pub_key
+        elif self.key_format == 'decimal':
+            self.secret = int(import_key)
+            self.private_byte = binascii.unhexlify('%064x' % self.secret)
+        else:
             if self.key_format == 'hex':
-                key_hex = import_key
-                key_byte = binascii.unhexlify(key_hex)
+                key_byte = binascii.unhexlify(import_key)
             elif self.key_format == 'hex_compressed':
-                key_hex = import_key[:-2]
-                key_byte = binascii.unhexlify(key_hex)
+                key_byte = binascii.unhexlify(import_key[:-2])
                 self.compressed = True
             elif self.key_format == 'bin':
                 key_byte = import_key
-                key_hex = to_hexstring(key_byte)
             elif self.key_format == 'bin_compressed':
                 key_byte = import_key[:-1]
-                key_hex = to_hexstring(key_byte)
                 self.compressed = True
-            elif self.isprivate and self.key_format in ['wif', 'wif_compressed']:
+            elif self.key_format in ['wif', 'wif_compressed']:
                 # Check and remove Checksum, prefix and postfix tags
-                key = change_base(import_key, 58, 256)
-                checksum = key[-4:]
-                key = key[:-4]
-                if checksum != hashlib.sha256(hashlib.sha256(key).digest()).digest()[:4]:
+                try:
+                    key = b58check_decode(import_key)
+                except EncodingError:
                     raise BKeyError("Invalid checksum, not a valid WIF key")
                 found_networks = network_by_value('prefix_wif', key[0:1])
                 if not len(found_networks):
@@ -374,32 +391,86 @@ class Key:
                 else:
                     self.compressed = False
                 key_byte = key[1:]
-                key_hex = to_hexstring(key_byte)
             else:
                 raise KeyError("Unknown key format %s" % self.key_format)
 
-            if not (key_byte or key_hex):
+            if not key_byte:
                 raise KeyError("Cannot format key in hex or byte format")
-            self.private_hex = key_hex
-            self.private_byte = key_byte
-            self.secret = int(key_hex, 16)
-        else:
-            raise KeyError("Cannot import key. Public key format unknown")
-
-        if self.isprivate and not (self.public_byte or self.public_hex):
-            if not self.isprivate:
-                raise KeyError("Private key has no known secret number")
-            point = ec_point(self.secret)
-            self._x = change_base(point.x(), 10, 16, 64)
-            self._y = change_base(point.y(), 10, 16, 64)
-            if point.y() % 2:
-                prefix = '03'
+            self.private_byte = bytes(key_byte)
+            self.secret = int(binascii.hexlify(self.private_byte), 16)
+
+    @property
+    def private_hex(self):
+        """
+        Private key as hexstring or None for public keys
+
+        :return str:
+        """
+        return self.private_byte and to_hexstring(self.private_byte)
+
+    def _public_xy(self):
+        # Public key point as (x, y) integers. Derived from the secret or the compressed public key on first use.
+        if self._point is None:
+            if self.secret:
+                self._point = ecbackends.backend.ec_point(self.secret)
             else:
-                prefix = '02'
-            self.public_hex = prefix + self._x
-            self.public_uncompressed_hex = '04' + self._x + self._y
-            self.public_byte = binascii.unhexlify(self.public_hex)
-            self.public_uncompressed_byte = binascii.unhexlify(self.public_uncompressed_hex)
+                # Calculate y from x with y=x^3 + 7 function
+                x = int(binascii.hexlify(self._public_byte[1:33]), 16)
+                ys = (x**3+7) % secp256k1_p
+                y = ecdsa.numbertheory.square_root_mod_prime(ys, secp256k1_p)
+                if y & 1 != (self._public_byte[0:1] == b'\x03'):
+                    y = secp256k1_p - y
+                self._point = (x, y)
+        return self._point
+
+    @property
+    def public_byte(self):
+        """
+        Compressed public key as bytes
+
+        :return bytes:
+        """
+        if self._public_byte is None:
+            x, y = self._public_xy()
+            self._public_byte = binascii.unhexlify('%02x%064x' % (2 + (y & 1), x))
+        return self._public_byte
+
+    @property
+    def public_uncompressed_byte(self):
+        """
+        Uncompressed public key as bytes
+
+        :return bytes:
+        """
+        if self._public_uncompressed_byte is None:
+            self._public_uncompressed_byte = binascii.unhexlify('04%064x%064x' % self._public_xy())
+        return self._public_uncompressed_byte
+
+    @property
+    def public_hex(self):
+        """
+        Compressed public key as hexstring
+
+        :return str:
+        """
+        return to_hexstring(self.public_byte)
+
+    @property
+    def public_uncompressed_hex(self):
+        """
+        Uncompressed public key as hexstring
+
+        :return str:
+        """
+        return to_hexstring(self.public_uncompressed_byte)
+
+    @property
+    def _x(self):
+        return '%064x' % self._public_xy()[0]
+
+    @property
+    def _y(self):
+        return '%064x' % self._public_xy()[1]
 
     def __repr__(self):
         if self.secret:
@@ -422,7 +493,7 @@ class Key:
         :return str: Private Key WIF
         """
         # TODO: Also check first 2 bytes
-        d = change_base(encrypted_privkey, 58, 256)[2:]
+        d = b58check_decode(encrypted_privkey)[2:]
         flagbyte = d[0:1]
         d = d[1:]
         if flagbyte == b'\xc0':
@@ -432,7 +503,7 @@ class Key:
         else:
             raise Warning("Unrecognised password protected key format. Flagbyte incorrect.")
         addresshash = d[0:4]
-        d = d[4:-4]
+        d = d[4:]
         key = scrypt.hash(passphrase, addresshash, 16384, 8, 8)
         derivedhalf1 = key[0:32]
         derivedhalf2 = key[32:64]
@@ -488,8 +559,7 @@ class Key:
         encryptedhalf2 = aes.encrypt(binascii.unhexlify('%0.32x' % (int(privkey[32:64], 16) ^
                                                                     int(binascii.hexlify(derivedhalf1[16:32]), 16))))
         encrypted_privkey = b'\x01\x42' + flagbyte + addresshash + encryptedhalf1 + encryptedhalf2
-        encrypted_privkey += hashlib.sha256(hashlib.sha256(encrypted_privkey).digest()).digest()[:4]
-        return change_base(encrypted_privkey, 256, 58)
+        return b58check_encode(encrypted_privkey)
 
     def wif(self):
         """
@@ -501,12 +571,10 @@ class Key:
         """
         if not self.secret:
             raise KeyError("WIF format not supported for public key")
-        version = self.network.prefix_wif
-        key = version + change_base(self.secret, 10, 256, 32)
+        key = self.network.prefix_wif + self.private_byte
         if self.compressed:
             key += b'\1'
-        key += hashlib.sha256(hashlib.sha256(key).digest()).digest()[:4]
-        return change_base(key, 256, 58)
+        return b58check_encode(key)
 
     def public(self, return_compressed=None):
         """
@@ -536,9 +604,7 @@ class Key:
         
         :return tuple: (x, y) point
         """
-        x = self._x and int(self._x, 16)
-        y = self._y and int(self._y, 16)
-        return (x, y)
+        return self._public_xy()
 
     def hash160(self):
         """
@@ -546,29 +612,29 @@ class Key:
         
         :return bytes: Hash160 of public key 
         """
-        if self.compressed:
-            pb = self.public_byte
-        else:
-            pb = self.public_uncompressed_byte
-        return hashlib.new('ripemd160', hashlib.sha256(pb).digest()).digest()
+        return self._hash160(self.compressed)
+
+    def _hash160(self, compressed):
+        # Hash160 of compressed or uncompressed public key, calculated once per key
+        if compressed not in self._hash160_cache:
+            pb = self.public_byte if compressed else self.public_uncompressed_byte
+            self._hash160_cache[compressed] = hashlib.new('ripemd160', hashlib.sha256(pb).digest()).digest()
+        return self._hash160_cache[compressed]
 
     def address(self, compressed=None):
         """
-        Get address derived from public key
+        Get address derived from public key. Addresses are cached per network and compression type.
         
         :param compressed: Always return compressed address
         :type compressed: bool
         
         :return str: Base58 encoded address 
         """
-        if (self.compressed and compressed is None) or compressed:
-            key = self.public_byte
-        else:
-            key = self.public_uncompressed_byte
+        compressed = bool((self.compressed and compressed is None) or compressed)
         versionbyte = self.network.prefix_address
-        key = versionbyte + hashlib.new('ripemd160', hashlib.sha256(key).digest()).digest()
-        checksum = hashlib.sha256(hashlib.sha256(key).digest()).digest()[:4]
-        return change_base(key + checksum, 256, 58)
+        if (versionbyte, compressed) not in self._address_cache:
+            self._address_cache[(versionbyte, compressed)] = b58check_encode(versionbyte + self._hash160(compressed))
+        return self._address_cache[(versionbyte, compressed)]
 
     def address_uncompressed(self):
         """
@@ -604,7 +670,30 @@ class Key:
         print("\n")
 
 
-class HDKey:
+class DerivationCache(LRUCache):
+    """
+    Bounded cache of derived HD Keys, used by HDKey.subkey_for_path to avoid deriving the same intermediate keys
+    again. When the cache is full the least recently used key is removed.
+
+    Keys are stored by public key hash and chain code of the parent key, network and normalized path, so secrets are
+    not used as cache keys. The number of cache hits and misses of lookups are counted in the hits and misses
+    attributes.
+    """
+
+    def __init__(self, maxsize=DEFAULT_DERIVATION_CACHE_SIZE):
+        """
+        Initialize derivation cache
+
+        :param maxsize: Maximum number of keys in cache, use 0 to disable caching
+        :type maxsize: int
+        """
+        super(DerivationCache, self).__init__(maxsize)
+
+
+derivation_cache = DerivationCache()
+
+
+class HDKey(object):
     """
     Class for Hierarchical Deterministic keys as defined in BIP0032
 
@@ -612,8 +701,16 @@ class HDKey:
     a structure of related keys.
 
     The structure and key-path are defined in BIP0043 and BIP0044.
+
+    To keep memory usage low for wallets with many keys only the raw key bytes, chain code, depth, fingerprint and
+    child index are stored. Hex versions of keys are created on request, the public key, Key object, WIF and address
+    are cached once calculated.
     """
 
+    __slots__ = ('_private_byte', '_public_byte', 'chain', 'depth', 'parent_fingerprint', 'child_index', 'isprivate',
+                 'network', 'key_type', 'key_format', 'compressed', '_key', '_wif', '_wif_public', '_address',
+                 '_hash160')
+
     @staticmethod
     def from_seed(import_seed, network=DEFAULT_NETWORK):
         """
@@ -663,10 +760,11 @@ class HDKey:
         """
 
         self.key_format = None
+        self.compressed = True
         if (key and not chain) or (not key and chain):
             raise KeyError("Please specify both key and chain, use import_key attribute "
                            "or use simple Key class instead")
-        self.key = None
+        self._key = None
         if not (key and chain):
             if not import_key:
                 # Generate new Master Key
@@ -680,9 +778,11 @@ class HDKey:
                 kf = get_key_format(import_key)
                 self.key_format = kf["format"]
                 network = check_network_and_key(import_key, network, kf["networks"])
-                self.network = Network(network)
                 if self.key_format in ['hdkey_private', 'hdkey_public']:
-                    bkey = change_base(import_key, 58, 256)
+                    try:
+                        bkey = b58check_decode(import_key)
+                    except EncodingError:
+                        raise BKeyError("Invalid checksum, not a valid extended key")
                     # Derive key, chain, depth, child_index and fingerprint part from extended key WIF
                     if ord(bkey[45:46]):
                         isprivate = False
@@ -691,15 +791,15 @@ class HDKey:
                         key = bkey[46:78]
                     depth = ord(bkey[4:5])
                     parent_fingerprint = bkey[5:9]
-                    child_index = int(change_base(bkey[9:13], 256, 10))
+                    child_index = struct.unpack('>L', bkey[9:13])[0]
                     chain = bkey[13:45]
-                    # chk = bkey[78:82]
                 else:
                     try:
-                        self.key = Key(import_key, passphrase=passphrase, network=network)
+                        self._key = Key(import_key, passphrase=passphrase, network=network)
+                        self.compressed = self._key.compressed
                         # FIXME: Maybe its better to create a random chain?
                         chain = b'\0'*32
-                        key = self.key.private_byte
+                        key = self._key.private_byte
                         key_type = 'private'
                     except BKeyError as e:
                         raise BKeyError("[BKeyError] %s" % e)
@@ -707,32 +807,119 @@ class HDKey:
         if not isinstance(key, (bytes, bytearray)) or not(len(key) == 32 or len(key) == 33):
             raise KeyError("Invalid key specified must be in bytes with lenght 32. You can use "
                            "'import_key' attribute to import keys in other formats")
-        self.chain = chain
-        if self.key is None:
-            self.key = Key(key, passphrase=passphrase, network=network)
-        self.depth = depth
-        self.parent_fingerprint = parent_fingerprint
-        self.child_index = child_index
-        self.isprivate = isprivate
         if not network:
             network = DEFAULT_NETWORK
         self.network = Network(network)
-        self.public_byte = self.key.public_byte
-        self.public_hex = self.key.public_hex
-        self.private_hex = None
-        self.private_byte = None
-        if isprivate:
-            self.secret = self.key.secret
-            self.private_hex = self.key.private_hex
-            self.private_byte = self.key.private_byte
-            self.key_hex = self.private_hex
+        self._private_byte = None
+        self._public_byte = None
+        if len(key) == 33 and key[:1] in [b'\2', b'\3']:
+            self._public_byte = bytes(key)
+        elif len(key) == 32 and isprivate and self._key is None:
+            self._private_byte = bytes(key)
         else:
-            self.key_hex = self.public_hex
+            if self._key is None:
+                self._key = Key(key, passphrase=passphrase, network=network)
+            if isprivate:
+                self._private_byte = self._key.private_byte
+            else:
+                self._public_byte = self._key.public_byte
+                self._key = None
+        self.chain = bytes(chain)
+        self.depth = depth
+        self.parent_fingerprint = parent_fingerprint
+        self.child_index = child_index
+        self.isprivate = isprivate
         self.key_type = key_type
+        self._wif = None
+        self._wif_public = None
+        self._address = None
+        self._hash160 = None
 
     def __repr__(self):
         return "<HDKey (%s)>" % self.wif()
 
+    @property
+    def key(self):
+        """
+        Key object with private or public key of this HD Key. Created on first use.
+
+        :return Key:
+        """
+        if self._key is None:
+            self._key = Key(self._private_byte or self._public_byte, network=self.network.network_name,
+                            compressed=self.compressed)
+        return self._key
+
+    @property
+    def private_byte(self):
+        """
+        Private key as 32 bytes or None for public keys
+
+        :return bytes:
+        """
+        return self._private_byte if self.isprivate else None
+
+    @property
+    def private_hex(self):
+        """
+        Private key as hexstring or None for public keys
+
+        :return str:
+        """
+        return self.private_byte and to_hexstring(self._private_byte)
+
+    @property
+    def secret(self):
+        """
+        Private key as integer or None for public keys
+
+        :return int:
+        """
+        return self.private_byte and int(binascii.hexlify(self._private_byte), 16)
+
+    @property
+    def public_byte(self):
+        """
+        Compressed public key as 33 bytes
+
+        :return bytes:
+        """
+        if self._public_byte is None:
+            if self._key is not None:
+                self._public_byte = self._key.public_byte
+            else:
+                x, y = ecbackends.backend.ec_point(self.secret)
+                self._public_byte = binascii.unhexlify('%02x%064x' % (2 + (y & 1), x))
+        return self._public_byte
+
+    @property
+    def public_hex(self):
+        """
+        Compressed public key as hexstring
+
+        :return str:
+        """
+        return to_hexstring(self.public_byte)
+
+    @property
+    def key_hex(self):
+        """
+        Private key hexstring for private keys, public key hexstring otherwise
+
+        :return str:
+        """
+        return self.private_hex if self.isprivate else self.public_hex
+
+    def address(self):
+        """
+        Get address derived from public key
+
+        :return str: Base58 encoded address
+        """
+        if self._address is None:
+            self._address = b58check_encode(self.network.prefix_address + self.hash160())
+        return self._address
+
     def info(self):
         """
         Prints key information to standard output
@@ -746,8 +933,8 @@ class HDKey:
             print("")
         print("PUBLIC KEY")
         print(" Public Key (hex)            %s" % self.public_hex)
-        print(" Public Key Hash160          %s" % self.key.hash160())
-        print(" Address (b58)               %s" % self.key.address())
+        print(" Public Key Hash160          %s" % self.hash160())
+        print(" Address (b58)               %s" % self.address())
         print(" Fingerprint (hex)           %s" % change_base(self.fingerprint(), 256, 16))
         point_x, point_y = self.key.public_point()
         print(" Point x                     %s" % point_x)
@@ -775,8 +962,8 @@ class HDKey:
             'private_long': self.secret,
             'private_wif': self.key.wif(),
             'public_hex': self.public_hex,
-            'public_hash160': self.key.hash160(),
-            'address': self.key.address(),
+            'public_hash160': self.hash160(),
+            'address': self.address(),
             'fingerprint': change_base(self.fingerprint(), 256, 16),
             'point_x': point_x,
             'point_y': point_y,
@@ -798,19 +985,34 @@ class HDKey:
         
         :return tuple: key and chain bytes
         """
-        chain = hasattr(self, 'chain') and self.chain or b"Bitcoin seed"
+        chain = getattr(self, 'chain', None) or b"Bitcoin seed"
         I = hmac.new(chain, seed, hashlib.sha512).digest()
         key = I[:32]
         chain = I[32:]
         return key, chain
 
+    def hash160(self):
+        """
+        Get public key in Hash160 format. Calculated once and cached.
+
+        Uses the uncompressed public key if this key is imported from an uncompressed private key.
+
+        :return bytes: Hash160 of public key
+        """
+        if self._hash160 is None:
+            public_byte = self.public_byte if self.compressed else self.key.public_uncompressed_byte
+            self._hash160 = hashlib.new('ripemd160', hashlib.sha256(public_byte).digest()).digest()
+        return self._hash160
+
     def fingerprint(self):
         """
         Get fingerprint of keys public part
 
         :return bytes:
         """
-        return hashlib.new('ripemd160', hashlib.sha256(self.public_byte).digest()).digest()[:4]
+        if not self.compressed:
+            return hashlib.new('ripemd160', hashlib.sha256(self.public_byte).digest()).digest()[:4]
+        return self.hash160()[:4]
 
     def wif(self, public=None, child_index=None):
         """
@@ -823,24 +1025,23 @@ class HDKey:
         
         :return str: Base58 encoded WIF key 
         """
-        rkey = self.private_byte or self.public_byte
         if not self.isprivate and public is False:
             return ''
-        if self.isprivate and not public:
-            raw = self.network.prefix_hdkey_private
-            typebyte = b'\x00'
-        else:
-            raw = self.network.prefix_hdkey_public
-            typebyte = b''
-            if public:
-                rkey = self.public_byte
-        if child_index:
+        if child_index and child_index != self.child_index:
             self.child_index = child_index
-        raw += struct.pack('B', self.depth) + self.parent_fingerprint + \
-            struct.pack('>L', self.child_index) + self.chain + typebyte + rkey
-        chk = hashlib.sha256(hashlib.sha256(raw).digest()).digest()[:4]
-        ret = raw+chk
-        return change_base(ret, 256, 58, 111)
+            self._wif = self._wif_public = None
+        if self.isprivate and not public:
+            if self._wif is None:
+                self._wif = self._wif_raw(self.network.prefix_hdkey_private, b'\x00' + self._private_byte)
+            return self._wif
+        if self._wif_public is None:
+            self._wif_public = self._wif_raw(self.network.prefix_hdkey_public, self.public_byte)
+        return self._wif_public
+
+    def _wif_raw(self, prefix, rkey):
+        raw = prefix + struct.pack('B', self.depth) + self.parent_fingerprint + \
+            struct.pack('>L', self.child_index) + self.chain + rkey
+        return b58check_encode(raw)
 
     def wif_public(self):
         """
@@ -857,6 +1058,10 @@ class HDKey:
         Example: m/44'/0'/0'/0/2
         See BIP0044 bitcoin proposal for more explanation.
 
+        Derived keys are stored in the derivation_cache. If the key or one of its parent keys is found in the cache
+        derivation resumes from the deepest cached key. Hardened levels can not be derived from public keys or with
+        a public 'M' path, a BKeyError is raised for these.
+
         :param path: BIP0044 key path
         :type path: str
         
@@ -865,31 +1070,57 @@ class HDKey:
 
         if self.key_type == 'single':
             raise KeyError("Key derivation cannot be used for 'single' type keys")
-        key = self
-        first_public = False
+        public = not self.isprivate
         if path[0] == 'm':  # Use Private master key
             path = path[2:]
         elif path[0] == 'M':  # Use Public master key
             path = path[2:]
-            first_public = True
-        if path:
-            levels = path.split("/")
-            if len(levels) > 1:
-                _logger.warning("Path length > 1 can be slow for larger paths, use Wallet Class to generate keys paths")
-            for level in levels:
-                if not level:
-                    raise BKeyError("Could not parse path. Index is empty.")
-                hardened = level[-1] in "'HhPp"
-                if hardened:
-                    level = level[:-1]
-                index = int(level)
-                if index < 0:
-                    raise BKeyError("Could not parse path. Index must be a positive integer.")
-                if first_public or not key.isprivate:
-                    key = key.child_public(index=index, network=network)  # TODO hardened=hardened key?
-                    first_public = False
-                else:
-                    key = key.child_private(index=index, hardened=hardened, network=network)
+            public = True
+        if not path:
+            return self
+        levels = []
+        for level in path.split("/"):
+            if not level:
+                raise BKeyError("Could not parse path. Index is empty.")
+            hardened = level[-1] in "'HhPp"
+            if hardened:
+                level = level[:-1]
+            index = int(level)
+            if index < 0:
+                raise BKeyError("Could not parse path. Index must be a positive integer.")
+            if hardened and public:
+                raise BKeyError("Hardened derivation of %s is not possible with public key derivation" % path)
+            levels.append((index, hardened))
+        levels = tuple(levels)
+
+        # Find deepest cached key for this path. The cache is keyed by public key hash and chain code, so private
+        # keys are not used as dictionary keys.
+        parent_id = (hashlib.new('ripemd160', hashlib.sha256(self.public_byte).digest()).digest(), self.chain,
+                     self.depth, self.isprivate, network or self.network.network_name, public)
+        key = self
+        depth = len(levels)
+        while depth:
+            cached = derivation_cache.get(parent_id + (levels[:depth],))
+            if cached is not None:
+                key = cached
+                break
+            depth -= 1
+
+        for depth in range(depth + 1, len(levels) + 1):
+            index, hardened = levels[depth - 1]
+            if public:
+                key = key.child_public(index=index, network=network)
+            else:
+                key = key.child_private(index=index, hardened=hardened, network=network)
+            derivation_cache.put(parent_id + (levels[:depth],), key)
+        return copy.copy(key)
+
+    def __copy__(self):
+        key = HDKey.__new__(HDKey)
+        for attr in self.__slots__:
+            setattr(key, attr, getattr(self, attr))
+        # The Key object is mutable, the copy creates its own on first use
+        key._key = None
         return key
 
     def account_key(self, account_id=0, purpose=44, set_network=None):
@@ -945,6 +1176,7 @@ class HDKey:
         :return bool: True
         """
         self.network = Network(new_network)
+        self._key = self._wif = self._wif_public = self._address = None
         return True
 
     def child_private(self, index=0, hardened=False, network=None):
@@ -969,13 +1201,13 @@ class HDKey:
             data = self.public_byte + struct.pack('>L', index)
         key, chain = self._key_derivation(data)
 
-        key = change_base(key, 256, 10)
+        key = int(binascii.hexlify(key), 16)
         if key > secp256k1_n:
             raise BKeyError("Key cannot be greater then secp256k1_n. Try another index number.")
         newkey = (key + self.secret) % secp256k1_n
         if newkey == 0:
             raise BKeyError("Key cannot be zero. Try another index number.")
-        newkey = change_base(newkey, 10, 256, 32)
+        newkey = binascii.unhexlify('%064x' % newkey)
 
         return HDKey(key=newkey, chain=chain, depth=self.depth+1, parent_fingerprint=self.fingerprint(),
                      child_index=index, network=network)
@@ -995,23 +1227,108 @@ class HDKey:
             raise BKeyError("Cannot derive hardened key from public private key. Index must be less then 0x80000000")
         data = self.public_byte + struct.pack('>L', index)
         key, chain = self._key_derivation(data)
-        key = change_base(key, 256, 10)
+        key = int(binascii.hexlify(key), 16)
         if key > secp256k1_n:
             raise BKeyError("Key cannot be greater then secp256k1_n. Try another index number.")
 
-        x, y = self.key.public_point()
-        Ki = ec_point(key) + ecdsa.ellipticcurve.Point(curve, x, y, secp256k1_n)
-
-        # if change_base(Ki.y(), 16, 10) % 2:
-        if Ki.y() % 2:
+        backend = ecbackends.backend
+        Ki_x, Ki_y = backend.point_add(backend.ec_point(key), self.key.public_point())
+        if Ki_y % 2:
             prefix = '03'
         else:
             prefix = '02'
-        xhex = change_base(Ki.x(), 10, 16, 64)
-        secret = binascii.unhexlify(prefix + xhex)
+        secret = binascii.unhexlify(prefix + '%064x' % Ki_x)
         return HDKey(key=secret, chain=chain, depth=self.depth+1, parent_fingerprint=self.fingerprint(),
                      child_index=index, isprivate=False, network=network)
 
+    def derive_children(self, start=0, count=1, public_only=False, output='key', processes=None, chunksize=1000):
+        """
+        Derive a range of consecutive child keys of current HD Key object, i.e. to pre-generate addresses or scan for
+        used addresses.
+
+        The parent public key, chain code and fingerprint are calculated once for the whole range. Public keys are
+        derived with the ec_points_add method of the elliptic curve backend, which derives all public keys of the range
+        in one batch.
+
+        Use the processes argument to divide large ranges over a pool of worker processes.
+
+        :param start: Index number of first child key
+        :type start: int
+        :param count: Number of child keys to derive
+        :type count: int
+        :param public_only: Derive public child keys, also if this is a private key
+        :type public_only: bool
+        :param output: Output format: 'key' for HDKey objects, 'address' for addresses or 'hash160' for public key hashes
+        :type output: str
+        :param processes: Number of worker processes to use. Leave empty to derive keys in current process
+        :type processes: int
+        :param chunksize: Number of child keys derived by a worker process at once. Only used if processes is specified.
+        :type chunksize: int
+
+        :return list: List of HDKey objects, address strings or hash160 bytes
+        """
+        if output not in ['key', 'address', 'hash160']:
+            raise BKeyError("Unknown output format %s, use 'key', 'address' or 'hash160'" % output)
+        if self.key_type == 'single':
+            raise KeyError("Key derivation cannot be used for 'single' type keys")
+        if processes:
+            chunks = [(self, index, min(chunksize, start + count - index), public_only, output)
+                      for index in range(start, start + count, chunksize)]
+            pool = multiprocessing.Pool(processes)
+            try:
+                return [item for items in pool.map(_derive_children_chunk, chunks) for item in items]
+            finally:
+                pool.terminate()
+
+        private = self.isprivate and not public_only
+        public_byte = self.public_byte
+        indexes = range(start, start + count)
+        tweaks = []
+        chains = []
+        for index in indexes:
+            if index & 0x80000000:
+                if not private:
+                    raise BKeyError("Cannot derive hardened key from public private key. "
+                                    "Index must be less then 0x80000000")
+                data = b'\0' + self._private_byte + struct.pack('>L', index)
+            else:
+                data = public_byte + struct.pack('>L', index)
+            I = hmac.new(self.chain, data, hashlib.sha512).digest()
+            tweak = int(binascii.hexlify(I[:32]), 16)
+            if tweak > secp256k1_n:
+                raise BKeyError("Key cannot be greater then secp256k1_n. Try another index number.")
+            tweaks.append(tweak)
+            chains.append(I[32:])
+
+        if private:
+            secret = self.secret
+            keys = []
+            for tweak in tweaks:
+                newkey = (tweak + secret) % secp256k1_n
+                if newkey == 0:
+                    raise BKeyError("Key cannot be zero. Try another index number.")
+                keys.append(newkey)
+            if output == 'key':
+                keys = [binascii.unhexlify('%064x' % k) for k in keys]
+            else:
+                keys = [binascii.unhexlify('%02x%064x' % (2 + (y & 1), x)) for x, y in
+                        [ecbackends.backend.ec_point(k) for k in keys]]
+        else:
+            keys = [binascii.unhexlify('%02x%064x' % (2 + (y & 1), x)) for x, y in
+                    ecbackends.backend.ec_points_add(tweaks, self.key.public_point())]
+
+        if output == 'key':
+            fingerprint = self.fingerprint()
+            network = self.network.network_name
+            return [HDKey(key=key, chain=chain, depth=self.depth + 1, parent_fingerprint=fingerprint,
+                          child_index=index, isprivate=private, network=network)
+                    for key, chain, index in zip(keys, chains, indexes)]
+        hash160s = [hashlib.new('ripemd160', hashlib.sha256(key).digest()).digest() for key in keys]
+        if output == 'hash160':
+            return hash160s
+        prefix = self.network.prefix_address
+        return [b58check_encode(prefix + h) for h in hash160s]
+
     def public(self):
         """
         Public version of current private key.
@@ -1022,3 +1339,9 @@ class HDKey:
         #TODO: more clevvvvver
         return HDKey(self.wif_public(), parent_fingerprint=self.parent_fingerprint, isprivate=self.isprivate,
                      key_type=self.key_type, network=self.network.network_name)
+
+
+def _derive_children_chunk(args):
+    # Worker function for HDKey.derive_children with a process pool. Must be defined on module level to be pickled.
+    key, start, count, public_only, output = args
+    return key.derive_children(start, count, public_only, output)
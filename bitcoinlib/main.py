@@ -33,6 +33,17 @@ CURRENT_INSTALLDIR_DATA = os.path.join(os.path.dirname(__file__), 'data')
 DEFAULT_DATABASEFILE = 'bitcoinlib.sqlite'
 DEFAULT_DATABASE = DEFAULT_DATABASEDIR + DEFAULT_DATABASEFILE
 
+# Elliptic curve backend: 'auto', 'secp256k1' (native libsecp256k1 with coincurve), 'python' or 'ecdsa'
+DEFAULT_EC_BACKEND = os.environ.get('BITCOINLIB_EC_BACKEND', 'auto')
+# Cache file for precomputed generator point multiples, set to empty string to disable
+DEFAULT_EC_TABLEFILE = os.environ.get('BITCOINLIB_EC_TABLEFILE', os.path.join(DEFAULT_DOCDIR, 'secp256k1_gtable.bin'))
+# Maximum number of derived HD keys kept in memory by HDKey.subkey_for_path, use 0 to disable
+DEFAULT_DERIVATION_CACHE_SIZE = int(os.environ.get('BITCOINLIB_DERIVATION_CACHE_SIZE', 1000))
+# Maximum number of deserialized scripts kept in memory by transactions.script_deserialize, use 0 to disable
+DEFAULT_SCRIPT_CACHE_SIZE = int(os.environ.get('BITCOINLIB_SCRIPT_CACHE_SIZE', 10000))
+# Maximum number of public key points kept in memory for signature verification, use 0 to disable
+DEFAULT_PUBLIC_POINT_CACHE_SIZE = int(os.environ.get('BITCOINLIB_PUBLIC_POINT_CACHE_SIZE', 10000))
+
 
 if not os.path.exists(DEFAULT_DOCDIR):
     os.makedirs(DEFAULT_DOCDIR)
@@ -74,5 +85,6 @@ logger.setLevel(logging.DEBUG)
 
 logging.info('WELCOME TO BITCOINLIB - CRYPTOCURRENCY LIBRARY')
 logging.info('Logger name: %s' % logging.__name__)
+logging.info('Elliptic curve backend setting: %s' % DEFAULT_EC_BACKEND)
 
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
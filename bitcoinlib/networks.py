@@ -70,6 +70,9 @@ def read_network_definitions():
 
 NETWORK_DEFINITIONS = read_network_definitions()
 
+NETWORK_PREFIX_FIELDS = ['prefix_wif', 'prefix_address', 'prefix_address_p2sh', 'prefix_hdkey_private',
+                         'prefix_hdkey_public']
+
 
 def _format_value(field, value):
     if field[:6] == 'prefix':
@@ -80,6 +83,52 @@ def _format_value(field, value):
         return value
 
 
+def _build_network_index(network_definitions):
+    """
+    Build index of network prefixes. For every prefix field the index contains a dictionary with the prefix as bytes,
+    uppercase and lowercase hexstring as key and a tuple of network names as value. The prefix values of all networks
+    are stored under the 'values' key.
+
+    :param network_definitions: Network definitions as returned by read_network_definitions
+    :type network_definitions: dict
+
+    :return dict: Index with prefix field as key
+    """
+    index = {}
+    for field in NETWORK_PREFIX_FIELDS:
+        networks_by_prefix = {}
+        values = []
+        for network_name, nv in network_definitions.items():
+            prefix_hex = nv[field].upper()
+            prefix = binascii.unhexlify(prefix_hex)
+            values.append(prefix)
+            for key in set([prefix_hex, prefix_hex.lower(), prefix]):
+                networks_by_prefix[key] = networks_by_prefix.get(key, ()) + (network_name,)
+        index[field] = {
+            'networks': networks_by_prefix,
+            'values': tuple(values),
+        }
+    return index
+
+_NETWORK_INDEX = _build_network_index(NETWORK_DEFINITIONS)
+
+
+def reload_network_definitions():
+    """
+    Read network definitions from json file again and rebuild the network prefix index. Use this method after
+    updating the networks.json file in the settings directory.
+
+    :return dict: Network definitions
+    """
+    global _NETWORK_INDEX
+    network_definitions = read_network_definitions()
+    NETWORK_DEFINITIONS.clear()
+    NETWORK_DEFINITIONS.update(network_definitions)
+    _NETWORK_INDEX = _build_network_index(NETWORK_DEFINITIONS)
+    _NETWORK_INSTANCES.clear()
+    return NETWORK_DEFINITIONS
+
+
 def network_values_for(field, output_as='default'):
     """
     Return all prefixes mentioned field, i.e.: prefix_wif, prefix_address_p2sh, prefix_hdkey_public, etc
@@ -91,7 +140,10 @@ def network_values_for(field, output_as='default'):
     
     :return str: 
     """
-    r = [_format_value(field, nv[field]) for nv in NETWORK_DEFINITIONS.values()]
+    if field in _NETWORK_INDEX:
+        r = list(_NETWORK_INDEX[field]['values'])
+    else:
+        r = [_format_value(field, nv[field]) for nv in NETWORK_DEFINITIONS.values()]
     if output_as == 'str':
         return [normalize_var(i) for i in r]
     elif output_as == 'hex':
@@ -117,11 +169,23 @@ def network_by_value(field, value):
     
     :return list: Of network name strings 
     """
+    if field not in _NETWORK_INDEX:
+        try:
+            value = to_hexstring(value).upper()
+        except:
+            pass
+        return [nv for nv in NETWORK_DEFINITIONS if NETWORK_DEFINITIONS[nv][field] == value]
+
+    networks_by_prefix = _NETWORK_INDEX[field]['networks']
+    try:
+        return list(networks_by_prefix[value])
+    except (KeyError, TypeError):
+        pass
     try:
         value = to_hexstring(value).upper()
     except:
         pass
-    return [nv for nv in NETWORK_DEFINITIONS if NETWORK_DEFINITIONS[nv][field] == value]
+    return list(networks_by_prefix.get(value, ()))
 
 
 def network_defined(network):
@@ -140,35 +204,79 @@ def network_defined(network):
     return True
 
 
-class Network:
+_NETWORK_INSTANCES = {}
+
+
+class Network(object):
     """
     Network class with all network definitions. 
     
     Prefixes for WIF, P2SH keys, HD public and private keys, addresses. A currency symbol and type, the 
     denominator (such as satoshi) and a BIP0044 cointype.
+
+    Network objects are immutable and only created once per network name: Network('bitcoin') always returns the same
+    object, so networks can be compared by identity.
     
     """
 
-    def __init__(self, network_name=DEFAULT_NETWORK):
+    __slots__ = ('network_name', 'prefix_wif', 'currency_name', 'currency_name_plural', 'currency_code',
+                 'currency_symbol', 'prefix_address_p2sh', 'prefix_address', 'prefix_hdkey_public', 'description',
+                 'prefix_hdkey_private', 'denominator', 'bip44_cointype')
+
+    def __new__(cls, network_name=DEFAULT_NETWORK):
+        if isinstance(network_name, Network):
+            return network_name
+        try:
+            return _NETWORK_INSTANCES[network_name]
+        except KeyError:
+            pass
         if network_name not in NETWORK_DEFINITIONS:
             raise NetworkError("Network %s not found in network definitions" % network_name)
-        self.network_name = network_name
-        self.prefix_wif = binascii.unhexlify(NETWORK_DEFINITIONS[network_name]['prefix_wif'])
-        self.currency_name = NETWORK_DEFINITIONS[network_name]['currency_name']
-        self.currency_name_plural = NETWORK_DEFINITIONS[network_name]['currency_name_plural']
-        self.currency_code = NETWORK_DEFINITIONS[network_name]['currency_code']
-        self.currency_symbol = NETWORK_DEFINITIONS[network_name]['currency_symbol']
-        self.prefix_address_p2sh = binascii.unhexlify(NETWORK_DEFINITIONS[network_name]['prefix_address_p2sh'])
-        self.prefix_address = binascii.unhexlify(NETWORK_DEFINITIONS[network_name]['prefix_address'])
-        self.prefix_hdkey_public = binascii.unhexlify(NETWORK_DEFINITIONS[network_name]['prefix_hdkey_public'])
-        self.description = NETWORK_DEFINITIONS[network_name]['description']
-        self.prefix_hdkey_private = binascii.unhexlify(NETWORK_DEFINITIONS[network_name]['prefix_hdkey_private'])
-        self.denominator = NETWORK_DEFINITIONS[network_name]['denominator']
-        self.bip44_cointype = NETWORK_DEFINITIONS[network_name]['bip44_cointype']
-
-        # This could be more shorter and more flexible with this code, but this gives 'Unresolved attributes' warnings
-        # for f in list(NETWORK_DEFINITIONS[network_name].keys()):
-        #     exec("self.%s = NETWORK_DEFINITIONS[network_name]['%s']" % (f, f))
+        nd = NETWORK_DEFINITIONS[network_name]
+        self = object.__new__(cls)
+        setattr_ = super(Network, self).__setattr__
+        setattr_('network_name', network_name)
+        setattr_('prefix_wif', binascii.unhexlify(nd['prefix_wif']))
+        setattr_('currency_name', nd['currency_name'])
+        setattr_('currency_name_plural', nd['currency_name_plural'])
+        setattr_('currency_code', nd['currency_code'])
+        setattr_('currency_symbol', nd['currency_symbol'])
+        setattr_('prefix_address_p2sh', binascii.unhexlify(nd['prefix_address_p2sh']))
+        setattr_('prefix_address', binascii.unhexlify(nd['prefix_address']))
+        setattr_('prefix_hdkey_public', binascii.unhexlify(nd['prefix_hdkey_public']))
+        setattr_('description', nd['description'])
+        setattr_('prefix_hdkey_private', binascii.unhexlify(nd['prefix_hdkey_private']))
+        setattr_('denominator', nd['denominator'])
+        setattr_('bip44_cointype', nd['bip44_cointype'])
+        _NETWORK_INSTANCES[network_name] = self
+        return self
+
+    @classmethod
+    def get(cls, network_name=DEFAULT_NETWORK):
+        """
+        Get Network object for given network name. Same as calling Network(network_name).
+
+        :param network_name: Network name
+        :type network_name: str
+
+        :return Network:
+        """
+        return cls(network_name)
+
+    def __setattr__(self, key, value):
+        raise NetworkError("Network objects are immutable, cannot set attribute %s" % key)
+
+    def __delattr__(self, key):
+        raise NetworkError("Network objects are immutable, cannot delete attribute %s" % key)
+
+    def __reduce__(self):
+        return Network, (self.network_name,)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
 
     def __repr__(self):
         return "<Network: %s>" % self.network_name
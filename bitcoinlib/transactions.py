@@ -18,12 +18,15 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from itertools import combinations
-from copy import deepcopy
+import time
+import mmap
+import multiprocessing
 from bitcoinlib.encoding import *
 from bitcoinlib.config.opcodes import *
 from bitcoinlib.keys import HDKey, Key, deserialize_address
 from bitcoinlib.networks import Network, DEFAULT_NETWORK
+from bitcoinlib.config.secp256k1 import secp256k1_n
+from bitcoinlib import ecbackends
 
 
 _logger = logging.getLogger(__name__)
@@ -41,7 +44,7 @@ SCRIPT_TYPES = {
 SIGHASH_ALL = 1
 SIGHASH_NONE = 2
 SIGHASH_SINGLE = 3
-SIGHASH_ANYONECANPAY = 80
+SIGHASH_ANYONECANPAY = 0x80
 
 
 class TransactionError(Exception):
@@ -58,6 +61,177 @@ class TransactionError(Exception):
         return self.msg
 
 
+_VARINT_FORMATS = {253: ('<H', 2), 254: ('<I', 4), 255: ('<Q', 8)}
+
+
+def _read_varint(data, cursor):
+    # Read CompactSize variable length integer from buffer, returns value and position after the integer
+    ni = struct.unpack_from('<B', data, cursor)[0]
+    if ni < 253:
+        return ni, cursor + 1
+    fmt, size = _VARINT_FORMATS[ni]
+    return struct.unpack_from(fmt, data, cursor + 1)[0], cursor + 1 + size
+
+
+def transaction_parse(rawtx, offset=0):
+    """
+    Parse a raw transaction into lightweight input and output records, without interpreting scripts or importing keys.
+
+    The raw transaction is read with a memoryview, scripts are returned as memoryview slices which refer to rawtx
+    without copying data. Use transaction_deserialize to get Input and Output objects.
+
+    :param rawtx: Raw transaction as bytes, bytearray, memoryview or mmap object
+    :type rawtx: bytes, bytearray, memoryview, mmap
+    :param offset: Position of the transaction in rawtx
+    :type offset: int
+
+    :return tuple: Version bytes, list of inputs as (prev_hash, output_index, unlocking_script, sequence) tuples, list of outputs as (amount, lock_script) tuples, locktime and position of the end of the transaction in rawtx
+    """
+    data = memoryview(rawtx)
+    end = len(data)
+    try:
+        version = data[offset:offset + 4].tobytes()[::-1]
+        n_inputs, cursor = _read_varint(data, offset + 4)
+        inputs = []
+        for _ in range(n_inputs):
+            if cursor + 36 > end:
+                raise TransactionError("Input transaction hash not found. Probably malformed raw transaction")
+            prev_hash = data[cursor:cursor + 32].tobytes()[::-1]
+            output_index = struct.unpack_from('<I', data, cursor + 32)[0]
+            script_size, cursor = _read_varint(data, cursor + 36)
+            unlocking_script = data[cursor:cursor + script_size]
+            cursor += script_size
+            sequence = data[cursor:cursor + 4].tobytes()
+            cursor += 4
+            inputs.append((prev_hash, output_index, unlocking_script, sequence))
+
+        n_outputs, cursor = _read_varint(data, cursor)
+        outputs = []
+        for _ in range(n_outputs):
+            amount = struct.unpack_from('<Q', data, cursor)[0]
+            script_size, cursor = _read_varint(data, cursor + 8)
+            outputs.append((amount, data[cursor:cursor + script_size]))
+            cursor += script_size
+        locktime = struct.unpack_from('<I', data, cursor)[0]
+    except (struct.error, KeyError):
+        raise TransactionError("Error parsing raw transaction, data is truncated or malformed")
+    cursor += 4
+    if cursor > end:
+        raise TransactionError("Error parsing raw transaction, data is truncated or malformed")
+    if not outputs:
+        raise TransactionError("Error no outputs found in this transaction")
+    return version, inputs, outputs, locktime, cursor
+
+
+def _inputs_from_records(records, network):
+    # Inputs with an unlocking script which can not be parsed get script type 'unknown' and keep the script as is
+    inputs = []
+    for tid, (prev_hash, output_index, unlocking_script, sequence) in enumerate(records):
+        try:
+            inp = Input(prev_hash=prev_hash, output_index=output_index, unlocking_script=unlocking_script.tobytes(),
+                        sequence=sequence, tid=tid, network=network)
+        except TransactionError:
+            inp = Input(prev_hash=prev_hash, output_index=output_index, script_type='unknown', sequence=sequence,
+                        tid=tid, network=network)
+            inp.unlocking_script = unlocking_script.tobytes()
+        inputs.append(inp)
+    return inputs
+
+
+def _outputs_from_records(records, network):
+    return [Output(amount=amount, lock_script=lock_script.tobytes(), network=network)
+            for amount, lock_script in records]
+
+
+def _transaction_from_parsed(parsed, network):
+    version, inputs, outputs, locktime, _ = parsed
+    t = Transaction(locktime=locktime, version=version, network=network)
+    t._inputs = None
+    t._outputs = None
+    t._records = (inputs, outputs)
+    return t
+
+
+def _open_buffer(buffer_or_file):
+    """
+    Return a buffer for a bytes-like object, an open file, a filename or a hexadecimal string. Files are
+    memory-mapped read-only.
+
+    :return tuple: Buffer and memory-map to close afterwards or None
+    """
+    if isinstance(buffer_or_file, (bytes, bytearray, memoryview, mmap.mmap)):
+        return buffer_or_file, None
+    if isinstance(buffer_or_file, str):
+        if os.path.isfile(buffer_or_file):
+            with open(buffer_or_file, 'rb') as f:
+                return _open_buffer(f)
+        try:
+            return binascii.unhexlify(buffer_or_file), None
+        except (TypeError, binascii.Error):
+            raise TransactionError("String is not an existing filename or a hexadecimal string")
+    if hasattr(buffer_or_file, 'fileno'):
+        if not os.fstat(buffer_or_file.fileno()).st_size:
+            return b'', None
+        mm = mmap.mmap(buffer_or_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return mm, mm
+    raise TransactionError("Expected bytes, an open file, a filename or a hexadecimal string, not %s" %
+                           type(buffer_or_file).__name__)
+
+
+def iter_transactions(buffer_or_file, offset=0, count=None, network=DEFAULT_NETWORK):
+    """
+    Iterate over consecutive raw transactions in a buffer or file, for instance a dump of raw transactions or the
+    transaction part of a block.
+
+    Files are memory-mapped, so only the pages which are parsed are loaded and memory use does not grow with the
+    file size. The transaction id is calculated from the raw transaction slice, transactions are not serialized again.
+    Input and output objects of the returned transactions are created on first use and refer to the buffer, so keep
+    the file open while using them.
+
+    >>> rawtx = ('0100000001a97830933769fe33c6155286ffae34db44c6b8783a2d8ca52ebee6414d399ec300000000'
+    ...          '8a47304402202c2e1a746c556546f2c959e92f2d0bd2678274823cc55e11628284e4a13016f80220797e716835f9dbcddb'
+    ...          '752cd0115a970a022ea6f2d8edafff6e087f928e41baac014104392b964e911955ed50e4e368a9476bc3f9dcc134280e15'
+    ...          '636430eb91145dab739f0d68b82cf33003379d885a0b212ac95e9cddfd2d391807934d25995468bc55ffffffff02015f00'
+    ...          '00000000001976a914c8e90996c7c6080ee06284600c684ed904d14c5c88ace0e1c6090000000017a914d2343fb4dd2bcf'
+    ...          '40a7d61e7fbff45fa48ee3b2b58700000000')
+    >>> for txid, t, start, end in iter_transactions(rawtx):
+    ...     print(txid, start, end)
+    b9fab39fb10d54d484edafb8f26d8cfd000280957ca85e00522eb8b44e1a192c 0 255
+
+    :param buffer_or_file: Raw transactions as bytes-like object, open file in binary mode, filename or hex string
+    :type buffer_or_file: bytes, bytearray, memoryview, mmap, file, str
+    :param offset: Position of first transaction
+    :type offset: int
+    :param count: Number of transactions to read. Leave empty to read until end of buffer
+    :type count: int
+    :param network: Network, leave empty for default
+    :type network: str
+
+    :return generator: Tuples with transaction id, Transaction object, start and end position in buffer
+    """
+    data, mm = _open_buffer(buffer_or_file)
+    try:
+        view = memoryview(data)
+        end = len(view)
+        n = 0
+        while offset < end and (count is None or n < count):
+            parsed = transaction_parse(view, offset)
+            tx_end = parsed[4]
+            t = _transaction_from_parsed(parsed, network)
+            t._hash = hashlib.sha256(hashlib.sha256(view[offset:tx_end]).digest()).digest()[::-1]
+            yield t.txid, t, offset, tx_end
+            offset = tx_end
+            n += 1
+    finally:
+        if mm is not None:
+            view = None
+            try:
+                mm.close()
+            except BufferError:
+                # Transactions still refer to the map, it is closed when they are garbage collected
+                pass
+
+
 def transaction_deserialize(rawtx, network=DEFAULT_NETWORK):
     """
     Deserialize a raw transaction
@@ -74,49 +248,86 @@ def transaction_deserialize(rawtx, network=DEFAULT_NETWORK):
     :return dict: json list with inputs, outputs, locktime and version
     """
     rawtx = to_bytes(rawtx)
-    version = rawtx[0:4][::-1]
-    n_inputs, size = varbyteint_to_int(rawtx[4:13])
-    cursor = 4 + size
-    inputs = []
-    for i in range(0, n_inputs):
-        inp_hash = rawtx[cursor:cursor + 32][::-1]
-        if not len(inp_hash):
-            raise TransactionError("Input transaction hash not found. Probably malformed raw transaction")
-        inp_index = rawtx[cursor + 32:cursor + 36][::-1]
-        cursor += 36
-
-        unlocking_script_size, size = varbyteint_to_int(rawtx[cursor:cursor + 9])
-        cursor += size
-        unlocking_script = rawtx[cursor:cursor + unlocking_script_size]
-        cursor += unlocking_script_size
-        sequence_number = rawtx[cursor:cursor + 4]
-        cursor += 4
-        inputs.append(Input(prev_hash=inp_hash, output_index=inp_index, unlocking_script=unlocking_script,
-                            sequence=sequence_number, tid=i, network=network))
-    if len(inputs) != n_inputs:
-        raise TransactionError("Error parsing inputs. Number of tx specified %d but %d found" % (n_inputs, len(inputs)))
-
-    outputs = []
-    n_outputs, size = varbyteint_to_int(rawtx[cursor:cursor + 9])
-    cursor += size
-    for o in range(0, n_outputs):
-        amount = change_base(rawtx[cursor:cursor + 8][::-1], 256, 10)
-        cursor += 8
-        lock_script_size, size = varbyteint_to_int(rawtx[cursor:cursor + 9])
-        cursor += size
-        lock_script = rawtx[cursor:cursor + lock_script_size]
-        cursor += lock_script_size
-        outputs.append(Output(amount=amount, lock_script=lock_script, network=network))
-    if not outputs:
-        raise TransactionError("Error no outputs found in this transaction")
-    locktime = change_base(rawtx[cursor:cursor + 4][::-1], 256, 10)
+    version, inputs, outputs, locktime, _ = transaction_parse(rawtx)
+    return _inputs_from_records(inputs, network), _outputs_from_records(outputs, network), locktime, version
+
+
+def _script_data(script_type, signatures=None, keys=None, number_of_sigs_n=1, number_of_sigs_m=1):
+    return {'script_type': script_type, 'keys': keys or [], 'signatures': signatures or [], 'redeemscript': b'',
+            'number_of_sigs_n': number_of_sigs_n, 'number_of_sigs_m': number_of_sigs_m}
+
+
+def _match_p2pkh(script):
+    if script[23:25] == b'\x88\xac' and script[1:3] == b'\xa9\x14':
+        return _script_data('p2pkh', [script[3:23]])
+
+
+def _match_p2sh(script):
+    if script[1:2] == b'\x14' and script[22:23] == b'\x87':
+        return _script_data('p2sh', [script[2:22]])
+
 
-    return inputs, outputs, locktime, version
+def _match_pubkey(script):
+    if script[-1:] == b'\xac':
+        return _script_data('pubkey', [script[1:-1]])
+
+
+def _match_nulldata(script):
+    data = _script_data('nulldata')
+    data['op_return'] = script[1:]
+    return data
+
+
+def _match_sig_pubkey(script):
+    sig_size = ord(script[0:1])
+    key_size = ord(script[sig_size + 1:sig_size + 2] or b'\0')
+    if key_size in (33, 65) and len(script) == sig_size + key_size + 2:
+        return _script_data('sig_pubkey', [script[1:sig_size + 1]], [script[sig_size + 2:]])
+
+
+def _match_multisig(script):
+    if script[-1:] != b'\xae':
+        return None
+    m = ord(script[0:1]) - opcodes['OP_1'] + 1
+    n = ord(script[-2:-1]) - opcodes['OP_1'] + 1
+    if not 0 < m <= n < 16:
+        return None
+    keys = []
+    cur = 1
+    while cur < len(script) - 2:
+        key_size = ord(script[cur:cur + 1])
+        if key_size not in (33, 65):
+            return None
+        keys.append(script[cur + 1:cur + 1 + key_size])
+        cur += key_size + 1
+    if cur != len(script) - 2 or len(keys) != n:
+        return None
+    return _script_data('multisig', keys, number_of_sigs_n=n, number_of_sigs_m=m)
+
+
+# Script templates with fixed length and first opcode
+_SCRIPT_MATCHERS_LENGTH = {
+    (25, opcodes['OP_DUP']): _match_p2pkh,
+    (23, opcodes['OP_HASH160']): _match_p2sh,
+    (35, 33): _match_pubkey,
+    (67, 65): _match_pubkey,
+}
+# Script templates with variable length, by first opcode
+_SCRIPT_MATCHERS_OPCODE = dict(
+    [(opcodes['OP_RETURN'], _match_nulldata)] +
+    [(size, _match_sig_pubkey) for size in range(70, 74)] +
+    [(op, _match_multisig) for op in OP_N_CODES]
+)
+
+_SCRIPT_CACHE = LRUCache(DEFAULT_SCRIPT_CACHE_SIZE)
 
 
 def script_deserialize(script, script_types=None):
     """
     Deserialize a script: determine type, number of signatures and script data.
+
+    Standard scripts are recognised by a template matcher which is selected by script length and first opcode,
+    other scripts are parsed by comparing them with all known script types. Results are cached by script.
     
     :param script: Raw script
     :type script: str, bytes, bytearray
@@ -125,6 +336,30 @@ def script_deserialize(script, script_types=None):
 
     :return list: With this items: [script_type, data, number_of_sigs_n, number_of_sigs_m] 
     """
+    script = to_bytes(script)
+    if script_types is not None or not script:
+        return _script_deserialize_parse(script, script_types)
+    data = _SCRIPT_CACHE.get(script)
+    if data is None:
+        first = ord(script[0:1])
+        matcher = _SCRIPT_MATCHERS_LENGTH.get((len(script), first)) or _SCRIPT_MATCHERS_OPCODE.get(first)
+        if matcher:
+            data = matcher(script)
+        if data is None:
+            data = _script_deserialize_parse(script)
+        _SCRIPT_CACHE.put(script, data)
+    data = dict(data)
+    for item in ['keys', 'signatures']:
+        if item in data:
+            data[item] = list(data[item])
+    return data
+
+
+def _script_deserialize_parse(script, script_types=None):
+    """
+    Deserialize a script by comparing it with all known script types. Used by script_deserialize for scripts
+    which do not match a standard script template.
+    """
 
     def _parse_signatures(scr, max_signatures=None, redeemscript_expected=False):
         scr = to_bytes(scr)
@@ -145,7 +380,6 @@ def script_deserialize(script, script_types=None):
         return sigs, total_length
 
     data = {'script_type': '', 'keys': [], 'signatures': [], 'redeemscript': b''}
-    script = to_bytes(script)
     if not script:
         data.update({'script_type': 'empty'})
         return data
@@ -381,6 +615,49 @@ def _p2sh_multisig_unlocking_script(sigs, redeemscript, hash_type=None):
     return usu
 
 
+def _signature_decode(signature):
+    """
+    Convert a DER encoded signature, with or without hash type, or a 64 byte signature to a (r, s) tuple
+
+    The hash type byte is detected by comparing the signature length with the length in the DER header.
+
+    :return tuple: Signature as (r, s) integers or None if signature could not be decoded
+    """
+    signature = to_bytes(signature)
+    if signature.startswith(b'\x30') and len(signature) > 2:
+        der_length = ord(signature[1:2]) + 2
+        if len(signature) == der_length + 1:
+            signature = signature[:-1]
+        if len(signature) == der_length:
+            try:
+                signature = convert_der_sig(signature, as_hex=False)
+            except Exception:
+                pass
+    if len(signature) != 64:
+        _logger.info("Invalid signature length %d for signature %s" % (len(signature), binascii.hexlify(signature)))
+        return None
+    return int(binascii.hexlify(signature[:32]), 16), int(binascii.hexlify(signature[32:]), 16)
+
+
+_PUBLIC_POINTS = LRUCache(DEFAULT_PUBLIC_POINT_CACHE_SIZE)
+
+
+def _public_point(public_key):
+    """
+    Get public key point of a public key in bytes or hexstring format. Points are cached by public key.
+
+    :return tuple: Public key point as (x, y) integers
+    """
+    public_key = to_bytes(public_key)
+    if len(public_key) == 64:
+        public_key = b'\x04' + public_key
+    point = _PUBLIC_POINTS.get(public_key)
+    if point is None:
+        point = Key(public_key).public_point()
+        _PUBLIC_POINTS.put(public_key, point)
+    return point
+
+
 def verify_signature(transaction_to_sign, signature, public_key):
     """
     Verify if signatures signs provided transaction hash and corresponds with public key
@@ -396,30 +673,640 @@ def verify_signature(transaction_to_sign, signature, public_key):
 
     """
     transaction_to_sign = to_bytes(transaction_to_sign)
-    signature = to_bytes(signature)
-    public_key = to_bytes(public_key)
     if len(transaction_to_sign) != 32:
         transaction_to_sign = hashlib.sha256(hashlib.sha256(transaction_to_sign).digest()).digest()
-    if len(public_key) == 65:
-        public_key = public_key[1:]
-    ver_key = ecdsa.VerifyingKey.from_string(public_key, curve=ecdsa.SECP256k1)
-    try:
-        if signature.startswith(b'\x30'):
-            try:
-                signature = convert_der_sig(signature[:-1], as_hex=False)
-            except Exception as e:
-                pass
-        ver_key.verify_digest(signature, transaction_to_sign)
-    except ecdsa.keys.BadSignatureError:
-        return False
-    except ecdsa.keys.BadDigestError as e:
-        _logger.info("Bad Digest %s (error %s)" %
-                     (binascii.hexlify(signature), e))
+    signature = _signature_decode(signature)
+    if signature is None:
         return False
-    return True
+    return ecbackends.backend.verify(transaction_to_sign, signature, _public_point(public_key))
+
+
+def verify_batch(items, processes=None, chunksize=1000):
+    """
+    Verify a list of signatures. Works like verify_signature but verifies all signatures in one batch.
+
+    Public key points are cached by public key and the active elliptic curve backend can share work between the
+    signatures of a batch. For large batches the work can be spread over a pool of worker processes.
+
+    Signatures or public keys which can not be decoded are reported as invalid, no error is raised.
+
+    :param items: List of (hash, signature, public_key) tuples. Hashes of 32 bytes, signatures in DER or 64 bytes format and public keys as bytes or hexstring
+    :type items: list
+    :param processes: Number of worker processes to use. Leave empty to verify in current process
+    :type processes: int
+    :param chunksize: Number of signatures send to a worker process at once. Only used if processes is specified.
+    :type chunksize: int
+
+    :return list: List of booleans, True for every valid signature
+    """
+    if processes:
+        chunks = [items[i:i + chunksize] for i in range(0, len(items), chunksize)]
+        pool = multiprocessing.Pool(processes)
+        try:
+            return [res for chunk in pool.map(verify_batch, chunks) for res in chunk]
+        finally:
+            pool.terminate()
+    results = [False] * len(items)
+    positions = []
+    decoded = []
+    for pos, (digest, signature, public_key) in enumerate(items):
+        signature = _signature_decode(signature)
+        if signature is None:
+            continue
+        try:
+            point = _public_point(public_key)
+        except Exception:
+            _logger.info("Could not decode public key %s" % to_hexstring(public_key))
+            continue
+        positions.append(pos)
+        decoded.append((to_bytes(digest), signature, point))
+    for pos, res in zip(positions, ecbackends.backend.verify_batch(decoded)):
+        results[pos] = res
+    return results
+
+
+class ScriptError(TransactionError):
+    """
+    Handle script evaluation errors. A failing script is a normal verification result, so these errors are logged
+    with info level.
+
+    """
+
+    def __init__(self, msg=''):
+        self.msg = msg
+        _logger.info(msg)
+
+
+MAX_SCRIPT_SIZE = 10000
+MAX_SCRIPT_ELEMENT_SIZE = 520
+MAX_SCRIPT_OPS = 201
+MAX_STACK_SIZE = 1000
+MAX_PUBKEYS_PER_MULTISIG = 20
+
+_DISABLED_OPCODES = [opcodes[op] for op in [
+    'OP_CAT', 'OP_SUBSTR', 'OP_LEFT', 'OP_RIGHT', 'OP_INVERT', 'OP_AND', 'OP_OR', 'OP_XOR', 'OP_2MUL', 'OP_2DIV',
+    'OP_MUL', 'OP_DIV', 'OP_MOD', 'OP_LSHIFT', 'OP_RSHIFT', 'OP_VERIF', 'OP_VERNOTIF']]
+
+
+def script_ops(script):
+    """
+    Split a script in opcodes and push data
+
+    :param script: Raw script
+    :type script: bytes
+
+    :return generator: Tuples with opcode, pushed data or None and position of next opcode in script
+    """
+    script = to_bytes(script)
+    cur = 0
+    end = len(script)
+    while cur < end:
+        op = ord(script[cur:cur + 1])
+        cur += 1
+        if op > opcodes['OP_PUSHDATA4']:
+            yield op, None, cur
+            continue
+        if op < opcodes['OP_PUSHDATA1']:
+            size = op
+        else:
+            size_bytes = {opcodes['OP_PUSHDATA1']: 1, opcodes['OP_PUSHDATA2']: 2, opcodes['OP_PUSHDATA4']: 4}[op]
+            if cur + size_bytes > end:
+                raise ScriptError("Script push size exceeds end of script")
+            size = int(binascii.hexlify(script[cur:cur + size_bytes][::-1]), 16)
+            cur += size_bytes
+        if cur + size > end:
+            raise ScriptError("Script push data exceeds end of script")
+        yield op, script[cur:cur + size], cur + size
+        cur += size
+
+
+def _script_num_decode(data, max_size=4):
+    if len(data) > max_size:
+        raise ScriptError("Script number overflow, %d bytes" % len(data))
+    if not data:
+        return 0
+    n = int(binascii.hexlify(data[::-1]), 16)
+    if ord(data[-1:]) & 0x80:
+        return -(n & ~(0x80 << (8 * (len(data) - 1))))
+    return n
+
+
+def _script_num_encode(n):
+    if not n:
+        return b''
+    negative = n < 0
+    n = abs(n)
+    r = bytearray()
+    while n:
+        r.append(n & 0xff)
+        n >>= 8
+    if r[-1] & 0x80:
+        r.append(0x80 if negative else 0)
+    elif negative:
+        r[-1] |= 0x80
+    return bytes(r)
+
+
+def _script_bool(data):
+    data = bytearray(data)
+    for n, c in enumerate(data):
+        if c:
+            # Negative zero is false
+            return not (n == len(data) - 1 and c == 0x80)
+    return False
+
+
+def _script_remove_signature(script, signature):
+    # Remove pushes of signature from script, the signature can not sign itself
+    r = []
+    cur = 0
+    for op, data, pos in script_ops(script):
+        if data is None or data != signature:
+            r.append(script[cur:pos])
+        cur = pos
+    return b''.join(r)
+
+
+def _op_hash256(data):
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+_HASH_OPS = {
+    opcodes['OP_RIPEMD160']: lambda data: hashlib.new('ripemd160', data).digest(),
+    opcodes['OP_SHA1']: lambda data: hashlib.sha1(data).digest(),
+    opcodes['OP_SHA256']: lambda data: hashlib.sha256(data).digest(),
+    opcodes['OP_HASH160']: script_to_pubkeyhash,
+    opcodes['OP_HASH256']: _op_hash256,
+}
+
+# Opcodes with one number argument and one number result
+_UNARY_NUM_OPS = {
+    opcodes['OP_1ADD']: lambda a: a + 1,
+    opcodes['OP_1SUB']: lambda a: a - 1,
+    opcodes['OP_NEGATE']: lambda a: -a,
+    opcodes['OP_ABS']: abs,
+    opcodes['OP_NOT']: lambda a: int(a == 0),
+    opcodes['OP_0NOTEQUAL']: lambda a: int(a != 0),
+}
+
+# Opcodes with two number arguments and one number result
+_BINARY_NUM_OPS = {
+    opcodes['OP_ADD']: lambda a, b: a + b,
+    opcodes['OP_SUB']: lambda a, b: a - b,
+    opcodes['OP_BOOLAND']: lambda a, b: int(a != 0 and b != 0),
+    opcodes['OP_BOOLOR']: lambda a, b: int(a != 0 or b != 0),
+    opcodes['OP_NUMEQUAL']: lambda a, b: int(a == b),
+    opcodes['OP_NUMEQUALVERIFY']: lambda a, b: int(a == b),
+    opcodes['OP_NUMNOTEQUAL']: lambda a, b: int(a != b),
+    opcodes['OP_LESSTHAN']: lambda a, b: int(a < b),
+    opcodes['OP_GREATERTHAN']: lambda a, b: int(a > b),
+    opcodes['OP_LESSTHANOREQUAL']: lambda a, b: int(a <= b),
+    opcodes['OP_GREATERTHANOREQUAL']: lambda a, b: int(a >= b),
+    opcodes['OP_MIN']: min,
+    opcodes['OP_MAX']: max,
+}
+
+
+def _op_pick(stack, roll):
+    n = _script_num_decode(stack.pop())
+    if n < 0 or n >= len(stack):
+        raise ScriptError("Invalid stack position %d" % n)
+    item = stack[-n - 1]
+    if roll:
+        del stack[-n - 1]
+    stack.append(item)
+
+
+def _op_tuck(stack):
+    if len(stack) < 2:
+        raise IndexError
+    stack.insert(-2, stack[-1])
+
+
+def _op_rot(stack):
+    stack.append(stack.pop(-3))
+
+
+def _op_2rot(stack):
+    stack += [stack.pop(-6), stack.pop(-5)]
+
+
+# Opcodes which only move, copy or remove stack items
+_STACK_OPS = {
+    opcodes['OP_DROP']: lambda s: s.pop(),
+    opcodes['OP_2DROP']: lambda s: (s.pop(), s.pop()),
+    opcodes['OP_DUP']: lambda s: s.append(s[-1]),
+    opcodes['OP_2DUP']: lambda s: s.extend([s[-2], s[-1]]),
+    opcodes['OP_3DUP']: lambda s: s.extend([s[-3], s[-2], s[-1]]),
+    opcodes['OP_2OVER']: lambda s: s.extend([s[-4], s[-3]]),
+    opcodes['OP_2ROT']: _op_2rot,
+    opcodes['OP_2SWAP']: lambda s: s.extend([s.pop(-4), s.pop(-3)]),
+    opcodes['OP_IFDUP']: lambda s: s.append(s[-1]) if _script_bool(s[-1]) else None,
+    opcodes['OP_DEPTH']: lambda s: s.append(_script_num_encode(len(s))),
+    opcodes['OP_NIP']: lambda s: s.pop(-2),
+    opcodes['OP_OVER']: lambda s: s.append(s[-2]),
+    opcodes['OP_PICK']: lambda s: _op_pick(s, False),
+    opcodes['OP_ROLL']: lambda s: _op_pick(s, True),
+    opcodes['OP_ROT']: _op_rot,
+    opcodes['OP_SWAP']: lambda s: s.append(s.pop(-2)),
+    opcodes['OP_TUCK']: _op_tuck,
+    opcodes['OP_SIZE']: lambda s: s.append(_script_num_encode(len(s[-1]))),
+}
 
 
-class Input:
+class ScriptInterpreter(object):
+    """
+    Stack based interpreter to evaluate bitcoin scripts
+
+    Evaluates the unlocking script of an input and the locking script of the output it spends, including the
+    redeemscript of pay-to-script-hash outputs. Signatures are checked by a signature checker object, see
+    SignatureChecker and BatchSignatureChecker. Without a checker all signature checks fail.
+
+    The number of executed opcodes can be limited with max_steps, and a trace method can be provided which is called
+    before every executed opcode, for instance to profile or debug scripts.
+
+    The check_dependent attribute is set if the result of an OP_CHECKSIG is used for anything else than failing the
+    script when it is false, for instance by OP_NOT or OP_IF. Such scripts can not be verified with a
+    BatchSignatureChecker.
+
+    """
+
+    def __init__(self, checker=None, max_steps=None, trace=None):
+        """
+        Create a new script interpreter
+
+        :param checker: Object with a check(signature, public_key, script) method to check signatures
+        :type checker: SignatureChecker
+        :param max_steps: Maximum number of opcodes to execute, for all scripts evaluated by this interpreter. Leave empty for no limit
+        :type max_steps: int
+        :param trace: Method called before executing an opcode with the step number, opcode name and the stack
+        :type trace: function
+        """
+        self.checker = checker
+        self.max_steps = max_steps
+        self.trace = trace
+        self.steps = 0
+        self.error = ''
+        self.check_dependent = False
+        self._pending_check = False
+
+    def _check_signature(self, signature, public_key, script, multisig=False):
+        if not signature or self.checker is None:
+            return False
+        return self.checker.check(signature, public_key, script, multisig)
+
+    def evaluate(self, script, stack=None):
+        """
+        Evaluate a script and return the resulting stack. Raises a ScriptError if the script fails.
+
+        :param script: Raw script
+        :type script: bytes
+        :param stack: Stack to start with, for instance the result of the unlocking script. The list is changed.
+        :type stack: list
+
+        :return list: The stack after evaluation
+        """
+        script = to_bytes(script)
+        self._pending_check = False
+        if len(script) > MAX_SCRIPT_SIZE:
+            raise ScriptError("Script size %d exceeds maximum" % len(script))
+        stack = [] if stack is None else stack
+        altstack = []
+        conditions = []
+        n_ops = 0
+        code_start = 0
+        for op, data, pos in script_ops(script):
+            if op > opcodes['OP_16']:
+                n_ops += 1
+                if n_ops > MAX_SCRIPT_OPS:
+                    raise ScriptError("Script exceeds maximum number of opcodes")
+            if op in _DISABLED_OPCODES:
+                raise ScriptError("Disabled opcode %s found" % opcodenames[op])
+            executing = False not in conditions
+            if not executing and not opcodes['OP_IF'] <= op <= opcodes['OP_ENDIF']:
+                continue
+            if self._pending_check:
+                # Result of previous OP_CHECKSIG is only safe to assume true if it is verified right away
+                self._pending_check = False
+                if op != opcodes['OP_VERIFY']:
+                    self.check_dependent = True
+            self.steps += 1
+            if self.max_steps and self.steps > self.max_steps:
+                raise ScriptError("Script evaluation exceeds step limit of %d opcodes" % self.max_steps)
+            if self.trace:
+                name = 'OP_PUSHBYTES_%d' % op if 0 < op < opcodes['OP_PUSHDATA1'] else opcodenames.get(op, 'OP_UNKNOWN')
+                self.trace(self.steps, name, stack)
+            try:
+                if data is not None:
+                    if len(data) > MAX_SCRIPT_ELEMENT_SIZE:
+                        raise ScriptError("Push data size exceeds %d bytes" % MAX_SCRIPT_ELEMENT_SIZE)
+                    stack.append(data)
+                elif op == opcodes['OP_0']:
+                    stack.append(b'')
+                elif op == opcodes['OP_1NEGATE'] or opcodes['OP_1'] <= op <= opcodes['OP_16']:
+                    stack.append(_script_num_encode(op - opcodes['OP_1'] + 1))
+                elif op in (opcodes['OP_IF'], opcodes['OP_NOTIF']):
+                    value = False
+                    if executing:
+                        value = _script_bool(stack.pop())
+                        if op == opcodes['OP_NOTIF']:
+                            value = not value
+                    conditions.append(value)
+                elif op == opcodes['OP_ELSE']:
+                    if not conditions:
+                        raise ScriptError("OP_ELSE without OP_IF")
+                    conditions[-1] = not conditions[-1]
+                elif op == opcodes['OP_ENDIF']:
+                    if not conditions:
+                        raise ScriptError("OP_ENDIF without OP_IF")
+                    conditions.pop()
+                elif op in _STACK_OPS:
+                    _STACK_OPS[op](stack)
+                elif op in _HASH_OPS:
+                    stack.append(_HASH_OPS[op](stack.pop()))
+                elif op in _UNARY_NUM_OPS:
+                    stack.append(_script_num_encode(_UNARY_NUM_OPS[op](_script_num_decode(stack.pop()))))
+                elif op in _BINARY_NUM_OPS:
+                    b = _script_num_decode(stack.pop())
+                    a = _script_num_decode(stack.pop())
+                    stack.append(_script_num_encode(_BINARY_NUM_OPS[op](a, b)))
+                    if op == opcodes['OP_NUMEQUALVERIFY']:
+                        self._verify(stack, op)
+                elif op == opcodes['OP_WITHIN']:
+                    maximum = _script_num_decode(stack.pop())
+                    minimum = _script_num_decode(stack.pop())
+                    value = _script_num_decode(stack.pop())
+                    stack.append(_script_num_encode(int(minimum <= value < maximum)))
+                elif op in (opcodes['OP_EQUAL'], opcodes['OP_EQUALVERIFY']):
+                    stack.append(_script_num_encode(int(stack.pop() == stack.pop())))
+                    if op == opcodes['OP_EQUALVERIFY']:
+                        self._verify(stack, op)
+                elif op == opcodes['OP_VERIFY']:
+                    self._verify(stack, op)
+                elif op == opcodes['OP_TOALTSTACK']:
+                    altstack.append(stack.pop())
+                elif op == opcodes['OP_FROMALTSTACK']:
+                    stack.append(altstack.pop())
+                elif op == opcodes['OP_CODESEPARATOR']:
+                    code_start = pos
+                elif op in (opcodes['OP_CHECKSIG'], opcodes['OP_CHECKSIGVERIFY']):
+                    public_key = stack.pop()
+                    signature = stack.pop()
+                    code = _script_remove_signature(script[code_start:], signature)
+                    stack.append(_script_num_encode(int(self._check_signature(signature, public_key, code))))
+                    if op == opcodes['OP_CHECKSIGVERIFY']:
+                        self._verify(stack, op)
+                    else:
+                        self._pending_check = True
+                elif op in (opcodes['OP_CHECKMULTISIG'], opcodes['OP_CHECKMULTISIGVERIFY']):
+                    n_keys = _script_num_decode(stack.pop())
+                    if not 0 <= n_keys <= MAX_PUBKEYS_PER_MULTISIG:
+                        raise ScriptError("Invalid number of public keys %d" % n_keys)
+                    n_ops += n_keys
+                    if n_ops > MAX_SCRIPT_OPS:
+                        raise ScriptError("Script exceeds maximum number of opcodes")
+                    public_keys = [stack.pop() for _ in range(n_keys)]
+                    n_sigs = _script_num_decode(stack.pop())
+                    if not 0 <= n_sigs <= n_keys:
+                        raise ScriptError("Invalid number of signatures %d" % n_sigs)
+                    signatures = [stack.pop() for _ in range(n_sigs)]
+                    # Extra item removed by OP_CHECKMULTISIG
+                    stack.pop()
+                    code = script[code_start:]
+                    for signature in signatures:
+                        code = _script_remove_signature(code, signature)
+                    # Signatures and keys are popped in reversed order, match both lists from the start
+                    while signatures and len(signatures) <= len(public_keys):
+                        if self._check_signature(signatures[0], public_keys[0], code, True):
+                            signatures.pop(0)
+                        public_keys.pop(0)
+                    stack.append(_script_num_encode(int(not signatures)))
+                    if op == opcodes['OP_CHECKMULTISIGVERIFY']:
+                        self._verify(stack, op)
+                elif op == opcodes['OP_NOP'] or opcodes['OP_NOP1'] <= op <= opcodes['OP_NOP10']:
+                    # OP_CHECKLOCKTIMEVERIFY and OP_CHECKSEQUENCEVERIFY are evaluated as OP_NOP2 and OP_NOP3
+                    pass
+                elif op == opcodes['OP_RETURN']:
+                    raise ScriptError("OP_RETURN found, output can not be spent")
+                else:
+                    raise ScriptError("Invalid opcode %s" % opcodenames.get(op, op))
+            except IndexError:
+                raise ScriptError("Not enough items on stack for %s" % opcodenames.get(op, op))
+            if len(stack) + len(altstack) > MAX_STACK_SIZE:
+                raise ScriptError("Stack size exceeds %d items" % MAX_STACK_SIZE)
+        if conditions:
+            raise ScriptError("Unbalanced conditional, OP_ENDIF missing")
+        return stack
+
+    @staticmethod
+    def _verify(stack, op):
+        if not _script_bool(stack.pop()):
+            raise ScriptError("%s failed" % opcodenames[op])
+
+    def verify(self, unlocking_script, lock_script):
+        """
+        Evaluate unlocking script and locking script and check if the result is true. For pay-to-script-hash locking
+        scripts the redeemscript is evaluated as well. If verification fails the reason is stored in the error
+        attribute.
+
+        :param unlocking_script: Unlocking script (scriptSig) of input
+        :type unlocking_script: bytes
+        :param lock_script: Locking script (scriptPubKey) of the spent output
+        :type lock_script: bytes
+
+        :return bool:
+        """
+        self.error = ''
+        self.check_dependent = False
+        unlocking_script = to_bytes(unlocking_script)
+        lock_script = to_bytes(lock_script)
+        try:
+            stack = self.evaluate(unlocking_script)
+            # A signature check at the end of a locking script or redeemscript decides the result of the script,
+            # at the end of the unlocking script its result is used by the locking script
+            self.check_dependent = self.check_dependent or self._pending_check
+            p2sh_stack = list(stack)
+            stack = self.evaluate(lock_script, stack)
+            if not stack or not _script_bool(stack[-1]):
+                raise ScriptError("Script evaluated to false")
+            if len(lock_script) == 23 and lock_script[:2] == b'\xa9\x14' and lock_script[-1:] == b'\x87':
+                if [op for op, _, _ in script_ops(unlocking_script) if op > opcodes['OP_16']]:
+                    raise ScriptError("Unlocking script of pay-to-script-hash input must only push data")
+                stack = self.evaluate(p2sh_stack.pop(), p2sh_stack)
+                if not stack or not _script_bool(stack[-1]):
+                    raise ScriptError("Redeemscript evaluated to false")
+        except ScriptError as e:
+            self.error = e.msg
+            return False
+        return True
+
+
+class SignatureChecker(object):
+    """
+    Check signatures of a transaction input for the ScriptInterpreter. Uses the cached signature hashes of the
+    transaction.
+
+    """
+
+    def __init__(self, transaction, tid):
+        """
+        Create a signature checker for a transaction input
+
+        :param transaction: Transaction to verify
+        :type transaction: Transaction
+        :param tid: Index of transaction input
+        :type tid: int
+        """
+        self.transaction = transaction
+        self.tid = tid
+
+    def _item(self, signature, public_key, script):
+        hash_type = ord(signature[-1:])
+        return self.transaction.signature_hash(self.tid, hash_type, script), signature, public_key
+
+    def check(self, signature, public_key, script, multisig=False):
+        """
+        Check if signature signs this transaction input with public key
+
+        :param signature: DER encoded signature with hash type
+        :type signature: bytes
+        :param public_key: Public key
+        :type public_key: bytes
+        :param script: Signed script
+        :type script: bytes
+        :param multisig: Signature is checked by OP_CHECKMULTISIG, a failing check does not mean the script fails.
+        :type multisig: bool
+
+        :return bool:
+        """
+        return verify_batch([self._item(signature, public_key, script)])[0]
+
+
+class BatchSignatureChecker(SignatureChecker):
+    """
+    Signature checker which collects signatures and verifies them later in one batch with verify_batch.
+
+    OP_CHECKSIG checks are assumed to be successful, which is correct for scripts which fail if a signature is
+    invalid, as all standard scripts do. Call the verify method after evaluating the scripts to check the signatures.
+    Signatures for OP_CHECKMULTISIG are checked directly, because its result depends on which signatures are valid.
+
+    If the ScriptInterpreter sets check_dependent the script uses a signature check result in another way, and the
+    input must be verified again with a SignatureChecker. Transaction.verify_scripts does this automatically.
+
+    """
+
+    def __init__(self, transaction, tid):
+        super(BatchSignatureChecker, self).__init__(transaction, tid)
+        self.items = []
+
+    def check(self, signature, public_key, script, multisig=False):
+        if multisig:
+            return super(BatchSignatureChecker, self).check(signature, public_key, script, multisig)
+        self.items.append(self._item(signature, public_key, script))
+        return True
+
+    def verify(self, processes=None):
+        """
+        Verify all collected signatures
+
+        :param processes: Number of worker processes to verify signatures. Leave empty to verify in current process
+        :type processes: int
+
+        :return bool: True if all signatures are valid
+        """
+        return all(verify_batch(self.items, processes))
+
+
+def _public_key_bytes(key):
+    """
+    Get public key as bytes if key is a public key in binary or hexadecimal format, without importing it as Key
+
+    :return bytes: Public key or None for other key formats
+    """
+    if isinstance(key, str) and len(key) in [66, 130]:
+        try:
+            key = binascii.unhexlify(key)
+        except (TypeError, binascii.Error):
+            return None
+    if isinstance(key, (bytes, bytearray)) and \
+            (len(key) == 33 and key[:1] in [b'\x02', b'\x03'] or len(key) == 65 and key[:1] == b'\x04'):
+        return bytes(key)
+    return None
+
+
+class _TransactionList(list):
+    """
+    List with the inputs or outputs of a transaction. Changing the list, or an input or output in it, clears the
+    cached serializations of the transaction.
+
+    """
+
+    def __init__(self, transaction, items=()):
+        super(_TransactionList, self).__init__(items)
+        self._transaction = transaction
+        for item in self:
+            item._transaction = transaction
+
+    def _changed(self, items=()):
+        for item in items:
+            item._transaction = self._transaction
+        self._transaction._clear_cache()
+
+    def __setitem__(self, index, value):
+        super(_TransactionList, self).__setitem__(index, value)
+        self._changed(value if isinstance(index, slice) else [value])
+
+    def __delitem__(self, index):
+        super(_TransactionList, self).__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, items):
+        items = list(items)
+        super(_TransactionList, self).__iadd__(items)
+        self._changed(items)
+        return self
+
+    def append(self, item):
+        super(_TransactionList, self).append(item)
+        self._changed([item])
+
+    def extend(self, items):
+        items = list(items)
+        super(_TransactionList, self).extend(items)
+        self._changed(items)
+
+    def insert(self, index, item):
+        super(_TransactionList, self).insert(index, item)
+        self._changed([item])
+
+    def pop(self, index=-1):
+        item = super(_TransactionList, self).pop(index)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super(_TransactionList, self).remove(item)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super(_TransactionList, self).sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super(_TransactionList, self).reverse()
+        self._changed()
+
+
+# Attributes of inputs and outputs which are serialized in a transaction. The unlocking script is not signed, so
+# changing it does not change the signature hashes.
+_INPUT_FIELDS = frozenset(['prev_hash', 'output_index', 'sequence', 'script_type', 'redeemscript', 'public_keys',
+                           'unlocking_script'])
+_OUTPUT_FIELDS = frozenset(['amount', 'lock_script'])
+# Attributes of inputs used to create the keys, address and unsigned unlocking script
+_INPUT_KEY_FIELDS = frozenset(['public_keys', 'redeemscript', 'script_type'])
+
+
+class Input(object):
     """
     Transaction Input class, normally part of Transaction class
     
@@ -472,7 +1359,7 @@ class Input:
         if isinstance(keys, (bytes, str)):
             keys = [keys]
         self.unlocking_script = to_bytes(unlocking_script)
-        self.unlocking_script_unsigned = b''
+        self._unlocking_script_unsigned = None
         self.script_type = script_type
         self.sequence = to_bytes(sequence)
         self.compressed = compressed
@@ -480,18 +1367,17 @@ class Input:
         self.tid = tid
         if keys is None:
             keys = []
-        self.keys = []
         if not isinstance(keys, list):
             keys = [keys]
         if not signatures:
             signatures = []
         if not isinstance(signatures, list):
             signatures = [signatures]
-        # Sort according to BIP45 standard
         self.sort = sort
-        if sort:
-            self.keys.sort(key=lambda k: k.public_byte)
-        self.address = ''
+        self.public_keys = []
+        self._key_objects = {}
+        self._keys = None
+        self._address = None
         self.signatures = []
         self.redeemscript = b''
         if not sigs_required:
@@ -506,7 +1392,7 @@ class Input:
             self.script_type = 'coinbase'
 
         # If unlocking script is specified extract keys, signatures, type from script
-        if unlocking_script:
+        if unlocking_script and self.script_type != 'coinbase':
             us_dict = script_deserialize(unlocking_script)
             if not us_dict or us_dict['script_type'] in ['unknown', 'empty']:
                 raise TransactionError("Could not parse unlocking script (%s)" % binascii.hexlify(unlocking_script))
@@ -516,13 +1402,20 @@ class Input:
             signatures += us_dict['signatures']
             keys += us_dict['keys']
 
+        # Keep public keys as bytes, Key objects are only created when needed
+        key_set = set()
         for key in keys:
-            if not isinstance(key, Key):
-                kobj = Key(key, network=network)
-            else:
-                kobj = key
-            if kobj not in self.keys:
-                self.keys.append(kobj)
+            public_byte = _public_key_bytes(key)
+            if public_byte is None:
+                kobj = key if isinstance(key, Key) else Key(key, network=network)
+                public_byte = kobj.public_byte if kobj.compressed else kobj.public_uncompressed_byte
+                self._key_objects[public_byte] = kobj
+            if public_byte not in key_set:
+                key_set.add(public_byte)
+                self.public_keys.append(public_byte)
+        # Sort according to BIP45 standard
+        if sort:
+            self.public_keys.sort()
 
         for sig in signatures:
             sig_der = ''
@@ -549,20 +1442,58 @@ class Input:
 
         if self.script_type == 'sig_pubkey':
             self.script_type = 'p2pkh'
-        if self.script_type == 'p2pkh':
-            if self.keys:
-                self.unlocking_script_unsigned = b'\x76\xa9\x14' + to_bytes(self.keys[0].hash160()) + b'\x88\xac'
-                self.address = self.keys[0].address()
-        elif self.script_type == 'p2sh_multisig':
-            if not self.keys:
+        if self.script_type == 'p2sh_multisig':
+            if not self.public_keys:
                 raise TransactionError("Please provide keys to append multisig transaction input")
             if not self.redeemscript:
-                self.redeemscript = serialize_multisig_redeemscript(self.keys, n_required=self.sigs_required,
-                                                                    compressed=self.compressed)
+                self.redeemscript = serialize_multisig_redeemscript(
+                    [self._key_objects.get(pk, pk) for pk in self.public_keys], n_required=self.sigs_required,
+                    compressed=self.compressed)
 
-            self.address = pubkeyhash_to_addr(script_to_pubkeyhash(self.redeemscript),
-                                              versionbyte=self.network.prefix_address_p2sh)
-            self.unlocking_script_unsigned = self.redeemscript
+    @property
+    def keys(self):
+        """
+        Public keys of this input as Key objects. Keys are created on first access.
+
+        :return list of Key:
+        """
+        if self._keys is None:
+            self._keys = [self._key_objects[pk] if pk in self._key_objects else
+                          Key(pk, network=self.network.network_name) for pk in self.public_keys]
+        return self._keys
+
+    @property
+    def address(self):
+        if self._address is None:
+            self._address = ''
+            if self.script_type == 'p2pkh' and self.public_keys:
+                self._address = pubkeyhash_to_addr(script_to_pubkeyhash(self.public_keys[0]),
+                                                   versionbyte=self.network.prefix_address)
+            elif self.script_type == 'p2sh_multisig':
+                self._address = pubkeyhash_to_addr(script_to_pubkeyhash(self.redeemscript),
+                                                   versionbyte=self.network.prefix_address_p2sh)
+        return self._address
+
+    @property
+    def unlocking_script_unsigned(self):
+        if self._unlocking_script_unsigned is None:
+            self._unlocking_script_unsigned = b''
+            if self.script_type == 'p2pkh' and self.public_keys:
+                self._unlocking_script_unsigned = \
+                    b'\x76\xa9\x14' + script_to_pubkeyhash(self.public_keys[0]) + b'\x88\xac'
+            elif self.script_type == 'p2sh_multisig':
+                self._unlocking_script_unsigned = self.redeemscript
+        return self._unlocking_script_unsigned
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in _INPUT_KEY_FIELDS:
+            object.__setattr__(self, '_keys', None)
+            object.__setattr__(self, '_address', None)
+            object.__setattr__(self, '_unlocking_script_unsigned', None)
+        transaction = self.__dict__.get('_transaction')
+        if transaction is not None and name in _INPUT_FIELDS:
+            transaction._clear_cache(sighash=name != 'unlocking_script')
 
     def json(self):
         """
@@ -571,10 +1502,8 @@ class Input:
         :return dict: Json with tid, prev_hash, output_index, type, address, public_key, public_key_hash, unlocking_script and sequence
         
         """
-        pks = []
-        for k in self.keys:
-            pks.append(k.public_hex)
-        if len(self.keys) == 1:
+        pks = [to_hexstring(pk) for pk in self.public_keys]
+        if len(pks) == 1:
             pks = pks[0]
         return {
             'tid': self.tid,
@@ -593,11 +1522,12 @@ class Input:
                (self.address, self.tid, struct.unpack('I', self.output_index)[0], self.script_type)
 
 
-class Output:
+class Output(object):
     """
     Transaction Output class, normally part of Transaction class.
     
-    Contains the amount and destination of a transaction. 
+    Contains the amount and destination of a transaction. The locking script is stored and the address, public key
+    hash and script type are derived from it when they are first used.
     
     """
     def __init__(self, amount, address='', public_key_hash=b'', public_key=b'', lock_script=b'',
@@ -631,53 +1561,120 @@ class Output:
 
         self.amount = amount
         self.lock_script = to_bytes(lock_script)
-        self.public_key_hash = to_bytes(public_key_hash)
-        self.address = address
         self.public_key = to_bytes(public_key)
         self.network = Network(network)
-        self.compressed = True
-        self.k = None
-        self.versionbyte = self.network.prefix_address
-        self.script_type = 'p2pkh'
+        self._address = address
+        self._public_key_hash = to_bytes(public_key_hash)
+        self._script_type = 'p2pkh' if self._public_key_hash else None
+        self._k = None
 
         if self.public_key:
-            self.k = Key(binascii.hexlify(self.public_key).decode('utf-8'), network=network)
-            self.address = self.k.address()
-            self.compressed = self.k.compressed
-        if self.public_key_hash and not self.address:
-            self.address = pubkeyhash_to_addr(public_key_hash, versionbyte=self.versionbyte)
-        if self.address:
-            address_dict = deserialize_address(self.address)
-            if address_dict['script_type']:
-                self.script_type = address_dict['script_type']
-            else:
-                raise TransactionError("Could not determine script type of address %s" % self.address)
-            self.public_key_hash = address_dict['public_key_hash_bytes']
+            if not (len(self.public_key) == 33 and self.public_key[:1] in b'\x02\x03') and \
+                    not (len(self.public_key) == 65 and self.public_key[:1] == b'\x04'):
+                raise TransactionError("Invalid public key %s" % to_hexstring(self.public_key))
+            if not self._public_key_hash:
+                self._public_key_hash = script_to_pubkeyhash(self.public_key)
+                self._script_type = 'p2pkh'
+        if address:
+            address_dict = deserialize_address(address)
+            if not address_dict['script_type']:
+                raise TransactionError("Could not determine script type of address %s" % address)
+            self._script_type = address_dict['script_type']
+            self._public_key_hash = address_dict['public_key_hash_bytes']
             if address_dict['network'] and self.network.network_name != address_dict['network']:
                 raise TransactionError("Address (%s) is from different network then defined %s" %
                                        (address_dict['network'], self.network.network_name))
-        if not self.public_key_hash and self.k:
-            self.public_key_hash = self.k.hash160()
-
-        if self.lock_script and not self.public_key_hash:
-            ss = script_deserialize(self.lock_script)
-            self.script_type = ss['script_type']
-            if self.script_type == 'p2sh':
-                self.versionbyte = self.network.prefix_address_p2sh
-            if self.script_type in ['p2pkh', 'p2sh']:
-                self.public_key_hash = ss['signatures'][0]
-                self.address = pubkeyhash_to_addr(self.public_key_hash, versionbyte=self.versionbyte)
-            else:
-                _logger.warning("Script type %s not supported" % self.script_type)
 
         if self.lock_script == b'':
-            if self.script_type == 'p2pkh':
-                self.lock_script = b'\x76\xa9\x14' + self.public_key_hash + b'\x88\xac'
-            elif self.script_type == 'p2sh':
-                self.lock_script = b'\xa9\x14' + self.public_key_hash + b'\x87'
+            if self._script_type == 'p2pkh':
+                self.lock_script = b'\x76\xa9\x14' + self._public_key_hash + b'\x88\xac'
+            elif self._script_type == 'p2sh':
+                self.lock_script = b'\xa9\x14' + self._public_key_hash + b'\x87'
             else:
                 raise TransactionError("Unknown output script type %s, please provide own locking script" %
-                                       self.script_type)
+                                       self._script_type)
+
+    @classmethod
+    def from_hash160(cls, amount, hash160, script_type='p2pkh', network=DEFAULT_NETWORK):
+        """
+        Create an output which pays to a public key hash or script hash. The hash is not checked or converted.
+
+        >>> Output.from_hash160(1000, binascii.unhexlify('23e102597c4a99516f851406f935a6e634dbccec')).address
+        '14GiCdJHj3bznWpcocjcu9ByCmDPEhEoP8'
+
+        :param amount: Amount of output in smallest denominator of currency, for example satoshi's for bitcoins
+        :type amount: int
+        :param hash160: Public key hash or script hash of 20 bytes
+        :type hash160: bytes
+        :param script_type: Script type of output, p2pkh or p2sh
+        :type script_type: str
+        :param network: Network, leave empty for default
+        :type network: str
+
+        :return Output:
+        """
+        if script_type == 'p2pkh':
+            lock_script = b'\x76\xa9\x14' + hash160 + b'\x88\xac'
+        elif script_type == 'p2sh':
+            lock_script = b'\xa9\x14' + hash160 + b'\x87'
+        else:
+            raise TransactionError("Unknown output script type %s, please provide own locking script" % script_type)
+        o = cls(amount, lock_script=lock_script, network=network)
+        o._public_key_hash = hash160
+        o._script_type = script_type
+        return o
+
+    def _parse_lock_script(self):
+        script = self.lock_script
+        if len(script) == 25 and script[:3] == b'\x76\xa9\x14' and script[23:] == b'\x88\xac':
+            self._script_type = 'p2pkh'
+            self._public_key_hash = script[3:23]
+        elif len(script) == 23 and script[:2] == b'\xa9\x14' and script[22:] == b'\x87':
+            self._script_type = 'p2sh'
+            self._public_key_hash = script[2:22]
+        else:
+            self._script_type = script_deserialize(script)['script_type']
+            _logger.warning("Script type %s not supported" % self._script_type)
+
+    @property
+    def script_type(self):
+        if self._script_type is None:
+            self._parse_lock_script()
+        return self._script_type
+
+    @property
+    def public_key_hash(self):
+        if self._script_type is None:
+            self._parse_lock_script()
+        return self._public_key_hash
+
+    @property
+    def versionbyte(self):
+        if self.script_type == 'p2sh':
+            return self.network.prefix_address_p2sh
+        return self.network.prefix_address
+
+    @property
+    def address(self):
+        if not self._address and self.public_key_hash:
+            self._address = pubkeyhash_to_addr(self.public_key_hash, versionbyte=self.versionbyte)
+        return self._address
+
+    @property
+    def compressed(self):
+        return len(self.public_key) != 65
+
+    @property
+    def k(self):
+        if self._k is None and self.public_key:
+            self._k = Key(self.public_key, network=self.network.network_name)
+        return self._k
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        transaction = self.__dict__.get('_transaction')
+        if transaction is not None and name in _OUTPUT_FIELDS:
+            transaction._clear_cache()
 
     def json(self):
         """
@@ -698,7 +1695,340 @@ class Output:
         return "<Output (address=%s, amount=%d, type=%s)>" % (self.address, self.amount, self.script_type)
 
 
-class Transaction:
+def _signing_key(key):
+    """
+    Get private and public key bytes of a private key in any supported format. Inputs can contain the compressed or
+    the uncompressed public key, so both are returned.
+
+    :return tuple: Private key, and compressed and uncompressed public key as bytes
+    """
+    if isinstance(key, HDKey):
+        ko = key.key
+    elif isinstance(key, Key):
+        ko = key
+    else:
+        ko = Key(key)
+    priv_key = ko.private_byte
+    if not priv_key:
+        raise TransactionError("Please provide a valid private key to sign the transaction. "
+                               "%s is not a private key" % priv_key)
+    return priv_key, ko.public_byte, ko.public_uncompressed_byte
+
+
+def _key_positions(inp):
+    # Position of every public key of an input, signatures must be in the same order as the keys
+    return dict((pk, pos) for pos, pk in enumerate(inp.public_keys))
+
+
+def _sign_digest(args):
+    """
+    Sign a hash with a secret using the active elliptic curve backend. Used by Transaction.sign_all worker processes
+
+    :param args: Tuple with hash to sign and secret as integer
+    :type args: tuple
+
+    :return tuple: Deterministic RFC6979 signature as (r, s) tuple with low S value
+    """
+    digest, secret = args
+    return ecbackends.backend.sign(digest, secret)
+
+
+class SignatureHash(object):
+    """
+    Calculate the signature hashes for the inputs of a transaction
+
+    The signed data of an input is the transaction with the unlocking script of this input replaced by its unsigned
+    script and all other unlocking scripts left empty. The parts which are equal for every input are serialized
+    once: the version and input count, all inputs with empty scripts and the outputs with locktime. The hash of an
+    input is calculated by feeding slices of these segments and the unsigned script to the hash function, so the
+    transaction does not need to be serialized again for every input.
+
+    The hash state of the data before each input is stored and copied, so the shared prefix is hashed only once for
+    all inputs. The data after the input still has to be hashed for every input, as the legacy signature hash does
+    not allow to share it.
+
+    The SIGHASH_NONE, SIGHASH_SINGLE and SIGHASH_ANYONECANPAY hash types sign only a part of the transaction and are
+    serialized separately for every signature.
+
+    """
+
+    def __init__(self, transaction):
+        """
+        Create the serialized segments of a transaction. The segments are created again when the number of inputs
+        or outputs changes.
+
+        :param transaction: Transaction to sign or verify
+        :type transaction: Transaction
+        """
+        self.transaction = transaction
+        self._build()
+
+    def _build(self):
+        transaction = self.transaction
+        self.inputs = transaction.inputs
+        self.outputs = transaction.outputs
+        self.n_inputs = len(self.inputs)
+        self.n_outputs = len(self.outputs)
+        self.version = transaction.version[::-1]
+        self.locktime = struct.pack('<L', transaction.locktime)
+        self.head = self.version + int_to_varbyteint(self.n_inputs)
+        self.positions = [0]
+        empty_inputs = []
+        for i in self.inputs:
+            empty_inputs.append(i.prev_hash[::-1] + i.output_index[::-1] + b'\0' + i.sequence)
+            self.positions.append(self.positions[-1] + len(empty_inputs[-1]))
+        self.empty_inputs = memoryview(b''.join(empty_inputs))
+        self.tail = transaction._raw_outputs()
+        self._prefix_states = [hashlib.sha256(self.head)]
+
+    def _update(self):
+        transaction = self.transaction
+        if transaction.inputs is not self.inputs or transaction.outputs is not self.outputs or \
+                len(self.inputs) != self.n_inputs or len(self.outputs) != self.n_outputs:
+            self._build()
+
+    def _prefix_state(self, tid):
+        # Copy of the hash state after the version, input count and the empty inputs before this input
+        states = self._prefix_states
+        while len(states) <= tid:
+            n = len(states) - 1
+            h = states[-1].copy()
+            h.update(self.empty_inputs[self.positions[n]:self.positions[n + 1]])
+            states.append(h)
+        return states[tid].copy()
+
+    def _current(self, tid, script=None):
+        i = self.inputs[tid]
+        if script is None:
+            script = i.unlocking_script_unsigned
+        return [i.prev_hash[::-1], i.output_index[::-1], int_to_varbyteint(len(script)), script, i.sequence]
+
+    @staticmethod
+    def _shared(hash_type):
+        # SIGHASH_ALL signs all inputs and outputs and can use the shared segments
+        return hash_type & 0x1f not in (SIGHASH_NONE, SIGHASH_SINGLE) and not hash_type & SIGHASH_ANYONECANPAY
+
+    def _suffix(self, tid, hash_type):
+        return [self.empty_inputs[self.positions[tid + 1]:], self.tail, struct.pack('<L', hash_type)]
+
+    def _segments(self, tid, hash_type, script=None):
+        current = self._current(tid, script)
+        if self._shared(hash_type):
+            return [self.head, self.empty_inputs[:self.positions[tid]]] + current + self._suffix(tid, hash_type)
+
+        base_type = hash_type & 0x1f
+        segments = [self.version]
+        if hash_type & SIGHASH_ANYONECANPAY:
+            segments += [b'\x01'] + current
+        else:
+            segments.append(int_to_varbyteint(len(self.inputs)))
+            for n, inp in enumerate(self.inputs):
+                if n == tid:
+                    segments += current
+                elif base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+                    segments += [inp.prev_hash[::-1], inp.output_index[::-1], b'\0\0\0\0\0']
+                else:
+                    segments += [inp.prev_hash[::-1], inp.output_index[::-1], b'\0', inp.sequence]
+        if base_type == SIGHASH_NONE:
+            segments.append(b'\0')
+        elif base_type == SIGHASH_SINGLE:
+            o = self.outputs[tid]
+            segments += [int_to_varbyteint(tid + 1), b'\xff\xff\xff\xff\xff\xff\xff\xff\0' * tid,
+                         struct.pack('<Q', o.amount), int_to_varbyteint(len(o.lock_script)), o.lock_script]
+        else:
+            segments.append(self.tail[:-4])
+        return segments + [self.locktime, struct.pack('<L', hash_type)]
+
+    def preimage(self, tid, hash_type=SIGHASH_ALL, script=None):
+        """
+        Get the serialized transaction which is signed by the input with this transaction ID
+
+        :param tid: Index of transaction input
+        :type tid: int
+        :param hash_type: Specific hash type, default is SIGHASH_ALL
+        :type hash_type: int
+        :param script: Script to sign. Leave empty to use the unsigned unlocking script of the input
+        :type script: bytes
+
+        :return bytes:
+        """
+        self._update()
+        if hash_type & 0x1f == SIGHASH_SINGLE and tid >= len(self.outputs):
+            raise TransactionError("No output found for input %d to sign with SIGHASH_SINGLE" % tid)
+        return b''.join(self._segments(tid, hash_type, script))
+
+    def hash(self, tid, hash_type=SIGHASH_ALL, script=None):
+        """
+        Get the double SHA256 hash of the serialized transaction which is signed by the input with this transaction ID
+
+        :param tid: Index of transaction input
+        :type tid: int
+        :param hash_type: Specific hash type, default is SIGHASH_ALL
+        :type hash_type: int
+        :param script: Script to sign. Leave empty to use the unsigned unlocking script of the input
+        :type script: bytes
+
+        :return bytes:
+        """
+        self._update()
+        if hash_type & 0x1f == SIGHASH_SINGLE and tid >= len(self.outputs):
+            # Signatures with SIGHASH_SINGLE for an input without output sign the number 1
+            return b'\x01' + b'\0' * 31
+        if self._shared(hash_type):
+            h = self._prefix_state(tid)
+            segments = self._current(tid, script) + self._suffix(tid, hash_type)
+        else:
+            h = hashlib.sha256()
+            segments = self._segments(tid, hash_type, script)
+        for segment in segments:
+            h.update(segment)
+        return hashlib.sha256(h.digest()).digest()
+
+
+# Maximum size of a DER encoded signature with low S value and hash type
+MAX_SIGNATURE_SIZE = 72
+
+
+def _push_size(size):
+    # Size of the opcode and length bytes to push data of given size to the stack
+    if size < opcodes['OP_PUSHDATA1']:
+        return 1
+    elif size <= 0xff:
+        return 2
+    elif size <= 0xffff:
+        return 3
+    return 5
+
+
+def estimate_input_size(script_type='p2pkh', compressed=True, sigs_required=1, n_keys=1, unlocking_script=None):
+    """
+    Estimate size of a transaction input in bytes. If the unlocking script is not known it is assumed all signatures
+    have the maximum length, so the size of a signed input is never larger than the estimate.
+
+    >>> estimate_input_size()
+    148
+    >>> estimate_input_size('p2sh_multisig', sigs_required=2, n_keys=3)
+    297
+
+    :param script_type: Script type of input: p2pkh or p2sh_multisig
+    :type script_type: str
+    :param compressed: Use compressed public keys. Default is True
+    :type compressed: bool
+    :param sigs_required: Number of signatures required for a p2sh_multisig input
+    :type sigs_required: int
+    :param n_keys: Number of keys in redeemscript of a p2sh_multisig input
+    :type n_keys: int
+    :param unlocking_script: Unlocking script of a signed input. If provided the actual size is returned.
+    :type unlocking_script: bytes
+
+    :return int: Size of input in bytes
+    """
+    public_key_size = 33 if compressed else 65
+    if unlocking_script is not None:
+        script_size = len(unlocking_script)
+    elif script_type == 'p2pkh':
+        script_size = 1 + MAX_SIGNATURE_SIZE + 1 + public_key_size
+    elif script_type == 'p2sh_multisig':
+        redeemscript_size = 3 + n_keys * (1 + public_key_size)
+        script_size = 1 + sigs_required * (1 + MAX_SIGNATURE_SIZE) + _push_size(redeemscript_size) + \
+            redeemscript_size
+    else:
+        raise TransactionError("Unknown input script type %s, can not estimate size" % script_type)
+    # Previous transaction hash, output index, script length and sequence
+    return 32 + 4 + len(int_to_varbyteint(script_size)) + script_size + 4
+
+
+def estimate_output_size(script_type='p2pkh', lock_script=None):
+    """
+    Get size of a transaction output in bytes
+
+    :param script_type: Script type of output: p2pkh or p2sh. Ignored if lock_script is provided
+    :type script_type: str
+    :param lock_script: Locking script of output
+    :type lock_script: bytes
+
+    :return int: Size of output in bytes
+    """
+    if lock_script:
+        script_size = len(lock_script)
+    elif script_type == 'p2pkh':
+        script_size = 25
+    elif script_type == 'p2sh':
+        script_size = 23
+    else:
+        raise TransactionError("Unknown output script type %s, can not estimate size" % script_type)
+    # Amount, script length and script
+    return 8 + len(int_to_varbyteint(script_size)) + script_size
+
+
+class SizeEstimator(object):
+    """
+    Estimate the size of a transaction while inputs and outputs are added, for instance to select inputs which
+    exactly pay for the fee of the transaction.
+
+    >>> se = SizeEstimator()
+    >>> se.add_input('p2pkh')
+    148
+    >>> se.add_output('p2pkh')
+    34
+    >>> se.size
+    192
+
+    """
+
+    def __init__(self):
+        self.n_inputs = 0
+        self.n_outputs = 0
+        self.inputs_size = 0
+        self.outputs_size = 0
+
+    def add_input(self, script_type='p2pkh', compressed=True, sigs_required=1, n_keys=1, unlocking_script=None):
+        """
+        Add estimated size of an input, see estimate_input_size for parameters
+
+        :return int: Size of input in bytes
+        """
+        size = estimate_input_size(script_type, compressed, sigs_required, n_keys, unlocking_script)
+        self.n_inputs += 1
+        self.inputs_size += size
+        return size
+
+    def add_output(self, script_type='p2pkh', lock_script=None):
+        """
+        Add size of an output, see estimate_output_size for parameters
+
+        :return int: Size of output in bytes
+        """
+        size = estimate_output_size(script_type, lock_script)
+        self.n_outputs += 1
+        self.outputs_size += size
+        return size
+
+    @property
+    def size(self):
+        """
+        Estimated size of transaction in bytes: version, inputs, outputs and locktime
+
+        :return int:
+        """
+        return 4 + len(int_to_varbyteint(self.n_inputs)) + self.inputs_size + \
+            len(int_to_varbyteint(self.n_outputs)) + self.outputs_size + 4
+
+    def fee(self, fee_per_kb, extra_size=0):
+        """
+        Calculate fee for the estimated transaction size
+
+        :param fee_per_kb: Fee per kilobyte in smallest denominator of currency
+        :type fee_per_kb: int
+        :param extra_size: Size in bytes to add to the estimated size, for instance for a change output
+        :type extra_size: int
+
+        :return int: Fee
+        """
+        return int((self.size + extra_size) / 1024.0 * fee_per_kb)
+
+
+class Transaction(object):
     """
     Transaction Class
     
@@ -719,8 +2049,9 @@ class Transaction:
         """
         Import a raw transaction and create a Transaction object
         
-        Uses the transaction_deserialize method to parse the raw transaction and then calls the init method of
-        this transaction class to create the transaction object
+        Uses the transaction_parse method to parse the raw transaction and then calls the init method of
+        this transaction class to create the transaction object. Input and Output objects are created when the
+        inputs or outputs attribute is first used.
         
         :param rawtx: Raw transaction string
         :type rawtx: bytes, str
@@ -731,8 +2062,9 @@ class Transaction:
          
         """
         rawtx = to_bytes(rawtx)
-        inputs, outputs, locktime, version = transaction_deserialize(rawtx, network=network)
-        return Transaction(inputs, outputs, locktime, version, network)
+        t = _transaction_from_parsed(transaction_parse(rawtx), network)
+        t._raw = rawtx
+        return t
 
     def __init__(self, inputs=None, outputs=None, locktime=0, version=b'\x00\x00\x00\x01', network=DEFAULT_NETWORK):
         """
@@ -754,23 +2086,146 @@ class Transaction:
         :param network: Network, leave empty for default network
         :type network: str
         """
-        if inputs is None:
-            self.inputs = []
-        else:
-            self.inputs = inputs
-        if outputs is None:
-            self.outputs = []
-        else:
-            self.outputs = outputs
-
-        self.version = version
-        self.locktime = locktime
+        self._records = None
+        self._raw = None
+        self._hash = None
+        self._sighash = None
+        self._verified = {}
+        self._inputs = _TransactionList(self, inputs or [])
+        self._outputs = _TransactionList(self, outputs or [])
+
+        self._version = version
+        self._locktime = locktime
         self.network = Network(network)
         self.fee = None
         self.fee_per_kb = None
         self.size = None
         self.change = None
 
+    @property
+    def inputs(self):
+        """
+        List of Input objects. For imported raw transactions the inputs are created on first use, inputs with an
+        unlocking script which can not be parsed get script type 'unknown'.
+
+        :return list:
+        """
+        if self._inputs is None:
+            self._inputs = _TransactionList(self, _inputs_from_records(self._records[0], self.network.network_name))
+        return self._inputs
+
+    @inputs.setter
+    def inputs(self, value):
+        self._inputs = _TransactionList(self, value)
+        self._clear_cache()
+
+    @property
+    def outputs(self):
+        """
+        List of Output objects. For imported raw transactions the outputs are created on first use.
+
+        :return list:
+        """
+        if self._outputs is None:
+            self._outputs = _TransactionList(self, _outputs_from_records(self._records[1], self.network.network_name))
+        return self._outputs
+
+    @outputs.setter
+    def outputs(self, value):
+        self._outputs = _TransactionList(self, value)
+        self._clear_cache()
+
+    @property
+    def version(self):
+        """
+        Transaction version as bytes
+
+        :return bytes:
+        """
+        return self._version
+
+    @version.setter
+    def version(self, value):
+        self._version = value
+        self._clear_cache()
+
+    @property
+    def locktime(self):
+        """
+        Transaction locktime, a unix timestamp or blocknumber
+
+        :return int:
+        """
+        return self._locktime
+
+    @locktime.setter
+    def locktime(self, value):
+        self._locktime = value
+        self._clear_cache()
+
+    @property
+    def hash(self):
+        """
+        Double SHA256 hash of the raw transaction, in the same byte order as the prev_hash of an input
+
+        :return bytes:
+        """
+        if self._hash is None:
+            self._hash = hashlib.sha256(hashlib.sha256(self.raw()).digest()).digest()[::-1]
+        return self._hash
+
+    @property
+    def txid(self):
+        """
+        Transaction ID, the hash of the raw transaction as hexadecimal string
+
+        :return str:
+        """
+        return to_hexstring(self.hash)
+
+    def __getstate__(self):
+        # Memoryviews of an imported transaction can not be copied or pickled, so create the inputs and outputs first
+        state = self.__dict__.copy()
+        state.update(_inputs=self.inputs, _outputs=self.outputs, _records=None, _sighash=None)
+        if state['_raw'] is not None:
+            state['_raw'] = bytes(state['_raw'])
+        return state
+
+    def _clear_cache(self, sighash=True):
+        self._raw = None
+        self._hash = None
+        if sighash:
+            self._sighash = None
+
+    def _raw_outputs(self):
+        r = [int_to_varbyteint(len(self.outputs))]
+        for o in self.outputs:
+            if o.amount < 0:
+                raise TransactionError("Output amount <0 not allowed")
+            r += [struct.pack('<Q', o.amount), int_to_varbyteint(len(o.lock_script)), o.lock_script]
+        r.append(struct.pack('<L', self.locktime))
+        return b''.join(r)
+
+    def signature_hash(self, tid, hash_type=SIGHASH_ALL, script=None):
+        """
+        Get the hash which is signed by the signature of the input with this transaction ID
+
+        Uses a SignatureHash object which is created on first use and reused for all inputs until inputs or
+        outputs are added or changed. Signing inputs does not change the signature hashes.
+
+        :param tid: Index of transaction input
+        :type tid: int
+        :param hash_type: Specific hash type, default is SIGHASH_ALL
+        :type hash_type: int
+        :param script: Script to sign. Leave empty to use the unsigned unlocking script of the input
+        :type script: bytes
+
+        :return bytes: Double SHA256 hash of 32 bytes
+        """
+        if self._sighash is None:
+            self._sighash = SignatureHash(self)
+        return self._sighash.hash(tid, hash_type, script)
+
     def __repr__(self):
         return "<Transaction (input_count=%d, output_count=%d, network=%s)>" % \
                (len(self.inputs), len(self.outputs), self.network.network_name)
@@ -799,6 +2254,9 @@ class Transaction:
         Get raw transaction 
         
         Return transaction with signed inputs if signatures are available
+
+        The full raw transaction is cached until the inputs, outputs, version or locktime change or the transaction
+        is signed. For imported transactions the imported raw transaction is used.
         
         :param sign_id: Create raw transaction which can be signed by transaction with this input ID
         :type sign_id: int
@@ -808,28 +2266,19 @@ class Transaction:
         :return bytes:
         
         """
-        r = self.version[::-1]
-        r += int_to_varbyteint(len(self.inputs))
-        for i in self.inputs:
-            r += i.prev_hash[::-1] + i.output_index[::-1]
-            if sign_id is None:
-                r += int_to_varbyteint(len(i.unlocking_script)) + i.unlocking_script
-            elif sign_id == i.tid:
-                r += int_to_varbyteint(len(i.unlocking_script_unsigned)) + i.unlocking_script_unsigned
-            else:
-                r += b'\0'
-            r += i.sequence
-
-        r += int_to_varbyteint(len(self.outputs))
-        for o in self.outputs:
-            if o.amount < 0:
-                raise TransactionError("Output amount <0 not allowed")
-            r += struct.pack('<Q', o.amount)
-            r += int_to_varbyteint(len(o.lock_script)) + o.lock_script
-        r += struct.pack('<L', self.locktime)
         if sign_id is not None:
-            r += struct.pack('<L', hash_type)
-        return r
+            if self._sighash is None:
+                self._sighash = SignatureHash(self)
+            return self._sighash.preimage(sign_id, hash_type)
+        if self._raw is not None:
+            return self._raw
+        r = [self.version[::-1], int_to_varbyteint(len(self.inputs))]
+        for i in self.inputs:
+            r += [i.prev_hash[::-1], i.output_index[::-1], int_to_varbyteint(len(i.unlocking_script)),
+                  i.unlocking_script, i.sequence]
+        r.append(self._raw_outputs())
+        self._raw = b''.join(r)
+        return self._raw
 
     def raw_hex(self, sign_id=None):
         """
@@ -839,41 +2288,181 @@ class Transaction:
         """
         return to_hexstring(self.raw(sign_id))
 
-    def verify(self):
+    def verify(self, processes=None, stop_on_failure=False):
         """
         Verify all inputs of a transaction, check if signatures match public key.
         
-        Does not check if UTXO is valid or has already been spent
-        
+        Does not check if UTXO is valid or has already been spent. Coinbase inputs have no signatures and are skipped.
+
+        All signatures are verified in one batch with the verify_batch method. Use verify_inputs to get the result
+        per input.
+
+        :param processes: Number of worker processes to verify signatures. Leave empty to verify in current process
+        :type processes: int
+        :param stop_on_failure: Verify inputs one by one and stop at the first input which can not be verified
+        :type stop_on_failure: bool
+
         :return bool: True if enough signatures provided and if all signatures are valid
         """
+        if stop_on_failure:
+            return all(res['valid'] for res in self.verify_inputs(stop_on_failure=True))
+        items, owners, results = self._verify_items()
+        for tid, valid in zip(owners, verify_batch(items, processes)):
+            if not valid:
+                _logger.info("Invalid signature found for transaction input %d" % tid)
+                results[tid] = False
+        return all(results.values())
+
+    def verify_inputs(self, stop_on_failure=False):
+        """
+        Verify the inputs of a transaction one by one and return the result, an error message and the time used
+        for every input. Coinbase inputs have no signatures and are always valid.
+
+        :param stop_on_failure: Stop after the first input which can not be verified
+        :type stop_on_failure: bool
+
+        :return list: List of dictionaries with tid, valid, error and time per verified input
+        """
+        results = []
         for i in self.inputs:
-            if i.script_type == 'coinbase':
-                return True
-            if not i.signatures:
-                _logger.info("No signatures found for transaction input %d" % i.tid)
-                return False
-            if len(i.signatures) < i.sigs_required:
-                _logger.info("Not enough signatures provided. Found %d signatures but %d needed" %
-                             (len(i.signatures), i.sigs_required))
-                return False
-            t_to_sign = self.raw(i.tid)
-            transaction_hash_to_sign = hashlib.sha256(hashlib.sha256(t_to_sign).digest()).digest()
-            sig_id = 0
-            for key in i.keys:
-                if sig_id > i.sigs_required-1:
+            start = time.time()
+            items, error = self._input_verify_items(i)
+            if not error and items and not all(verify_batch(items)):
+                error = "Invalid signature found"
+            results.append({
+                'tid': i.tid,
+                'valid': not error,
+                'error': error,
+                'time': time.time() - start,
+            })
+            if error:
+                _logger.info("Transaction input %d not verified: %s" % (i.tid, error))
+                if stop_on_failure:
                     break
-                if sig_id >= len(i.signatures):
-                    _logger.info("No valid signatures found")
-                    return False
-                verify_signature(transaction_hash_to_sign,
-                                 i.signatures[sig_id]['signature'], key.public_uncompressed_byte[1:])
-                sig_id += 1
-            if sig_id < i.sigs_required:
-                _logger.info("Not enough valid signatures provided. Found %d signatures but %d needed" %
-                             (sig_id, i.sigs_required))
-                return False
-        return True
+        return results
+
+    def verify_scripts(self, utxos, stop_on_failure=False, batch=True, max_steps=None, trace=None):
+        """
+        Verify the inputs of this transaction by evaluating the unlocking script of every input together with the
+        locking script of the output it spends.
+
+        Signatures are checked with cached signature hashes. With batch=True the OP_CHECKSIG signatures of an input
+        are collected during evaluation and verified afterwards in one batch. Inputs of which the script result
+        depends on an OP_CHECKSIG result in another way, for instance OP_CHECKSIG OP_NOT, are evaluated again with
+        direct signature checks.
+
+        :param utxos: Dictionary with (previous transaction hash, output index) tuples as key and the locking script or Output object of the spent output as value. The hash is a hexstring in the usual display order.
+        :type utxos: dict
+        :param stop_on_failure: Stop after the first input which can not be verified
+        :type stop_on_failure: bool
+        :param batch: Verify OP_CHECKSIG signatures of an input in one batch after evaluating the scripts
+        :type batch: bool
+        :param max_steps: Maximum number of opcodes to execute per input. Leave empty for no limit
+        :type max_steps: int
+        :param trace: Method called before every executed opcode with step number, opcode name and stack
+        :type trace: function
+
+        :return list: List of dictionaries with tid, valid, error, steps and time per verified input
+        """
+        results = []
+        for i in self.inputs:
+            start = time.time()
+            checker = (BatchSignatureChecker if batch else SignatureChecker)(self, i.tid)
+            interpreter = ScriptInterpreter(checker, max_steps=max_steps, trace=trace)
+            lock_script = utxos.get((to_hexstring(i.prev_hash), struct.unpack('>I', i.output_index)[0]))
+            if isinstance(lock_script, Output):
+                lock_script = lock_script.lock_script
+            if lock_script is None:
+                error = "Spent output not found in UTXO set"
+            else:
+                valid = interpreter.verify(i.unlocking_script, lock_script)
+                if batch and interpreter.check_dependent:
+                    checker = SignatureChecker(self, i.tid)
+                    interpreter = ScriptInterpreter(checker, max_steps=max_steps, trace=trace)
+                    valid = interpreter.verify(i.unlocking_script, lock_script)
+                if not valid:
+                    error = interpreter.error
+                elif isinstance(checker, BatchSignatureChecker) and not checker.verify():
+                    error = "Invalid signature found"
+                else:
+                    error = ''
+            results.append({
+                'tid': i.tid,
+                'valid': not error,
+                'error': error,
+                'steps': interpreter.steps,
+                'time': time.time() - start,
+            })
+            if error:
+                _logger.info("Transaction input %d script not verified: %s" % (i.tid, error))
+                if stop_on_failure:
+                    break
+        return results
+
+    def _verify_items(self):
+        """
+        Collect the signatures of all inputs to verify
+
+        :return tuple: List of (hash, signature, public_key) tuples to verify, list with the input index of each tuple and a dictionary with the result per input index
+        """
+        items = []
+        owners = []
+        results = {}
+        for i in self.inputs:
+            i_items, error = self._input_verify_items(i)
+            if error:
+                _logger.info("Transaction input %d not verified: %s" % (i.tid, error))
+            results[i.tid] = not error
+            items += i_items
+            owners += [i.tid] * len(i_items)
+        return items, owners, results
+
+    def _input_verify_items(self, i):
+        """
+        Collect the signatures of an input to verify
+
+        Signatures of which the public key is not known are matched with the keys of the input and verified
+        directly, in the same way as OP_CHECKMULTISIG: every signature must match a key after the key of the
+        previous signature. If all public keys are known they must be keys of the input, in the same order.
+        Inputs with an unsupported unlocking script or of which the signature hash can not be created are not valid.
+
+        :return tuple: List of (hash, signature, public_key) tuples to verify and an error message if the input is not valid
+        """
+        if i.script_type == 'coinbase':
+            return [], ''
+        if i.script_type == 'unknown':
+            return [], "Unsupported unlocking script %s" % to_hexstring(i.unlocking_script)
+        if not i.signatures:
+            return [], "No signatures found"
+        if len(i.signatures) < i.sigs_required:
+            return [], "Not enough signatures provided. Found %d signatures but %d needed" % \
+                   (len(i.signatures), i.sigs_required)
+        try:
+            tsig = self.signature_hash(i.tid)
+        except TransactionError as err:
+            return [], str(err)
+        signatures = i.signatures[:i.sigs_required]
+        if len(i.public_keys) == 1:
+            return [(tsig, signatures[0]['signature'], i.public_keys[0])], ''
+        if all(sig['pub_key'] for sig in signatures):
+            key_positions = _key_positions(i)
+            pos = -1
+            for sig in signatures:
+                if sig['pub_key'] not in key_positions:
+                    return [], "Public key %s of signature is not a key of this input" % \
+                           to_hexstring(sig['pub_key'])
+                if key_positions[sig['pub_key']] <= pos:
+                    return [], "Signatures are not ordered like the public keys or sign the same key twice"
+                pos = key_positions[sig['pub_key']]
+            return [(tsig, sig['signature'], sig['pub_key']) for sig in signatures], ''
+        pos = 0
+        for sig in signatures:
+            while pos < len(i.public_keys) and not self._signature_verify(tsig, sig['signature'], i.public_keys[pos]):
+                pos += 1
+            if pos == len(i.public_keys):
+                return [], "Not enough valid signatures provided"
+            pos += 1
+        return [], ''
 
     def sign(self, keys, tid=0, hash_type=SIGHASH_ALL):
         """
@@ -895,89 +2484,147 @@ class Transaction:
 
         if self.inputs[tid].script_type == 'coinbase':
             raise TransactionError("Can not sign coinbase transactions")
-        tsig = hashlib.sha256(hashlib.sha256(self.raw(tid)).digest()).digest()
+        tsig = self.signature_hash(tid, hash_type)
 
         for key in keys:
-            if isinstance(key, (HDKey, Key)):
-                priv_key = key.private_byte
-                pub_key = key.public_byte
-            else:
-                ko = Key(key)
-                priv_key = ko.private_byte
-                pub_key = ko.public_byte
-            if not priv_key:
-                raise TransactionError("Please provide a valid private key to sign the transaction. "
-                                       "%s is not a private key" % priv_key)
-            sk = ecdsa.SigningKey.from_string(priv_key, curve=ecdsa.SECP256k1)
-            while True:
-                sig_der = sk.sign_digest(tsig, sigencode=ecdsa.util.sigencode_der)
-                # Test if signature has low S value, to prevent 'Non-canonical signature: High S Value' errors
-                # TODO: Recalc 's' instead, see:
-                #       https://github.com/richardkiss/pycoin/pull/24/files#diff-12d8832e97767321d1f3c40909be8b23
-                signature = convert_der_sig(sig_der)
-                s = int(signature[64:], 16)
-                if s < ecdsa.SECP256k1.order / 2:
-                    break
-            newsig = {
-                    'sig_der': to_bytes(sig_der),
-                    'signature': to_bytes(signature),
-                    'priv_key': priv_key,
-                    'pub_key': pub_key,
-                    'transaction_id': tid
-                }
-
+            priv_key, pub_key, pub_key_uncompressed = _signing_key(key)
             # Check if signature signs known key and is not already in list
-            pub_key_list = [x.public_byte for x in self.inputs[tid].keys]
-            pub_key_list_uncompressed = [x.public_uncompressed_byte for x in self.inputs[tid].keys]
-            if pub_key not in pub_key_list:
-                raise TransactionError("This key does not sign any known key: %s" % pub_key)
+            if pub_key not in self.inputs[tid].public_keys:
+                if pub_key_uncompressed not in self.inputs[tid].public_keys:
+                    raise TransactionError("This key does not sign any known key: %s" % pub_key)
+                pub_key = pub_key_uncompressed
             if pub_key in [x['pub_key'] for x in self.inputs[tid].signatures]:
                 _logger.warning("Key %s already signed" % pub_key)
                 break
+            r, s = _sign_digest((tsig, int(binascii.hexlify(priv_key), 16)))
+            if self._signature_add(tid, tsig, r, s, priv_key, pub_key):
+                n_signs += 1
 
-            n_signs += 1
-            # Insert newsig in correct place in list
-            if self.inputs[tid].signatures:
-                # 1. determine position for newsig according to key list
-                newsig_pos = pub_key_list.index(pub_key)
-                n_total_sigs = len(pub_key_list)
-
-                # 2. assume signature list is in correct order then determine possible position of newsig
-                sig_start_domain = [''] * n_total_sigs
-                sig_start_domain[newsig_pos] = newsig
-                sig_domains = []
-                empty_slots = [i for i, j in enumerate(sig_start_domain) if j == '']
-                possible_sig_positions = combinations(empty_slots, len(self.inputs[tid].signatures))
-                for pp in possible_sig_positions:
-                    sig_domain = deepcopy(sig_start_domain)
-                    signatures = deepcopy(self.inputs[tid].signatures)[::-1]
-                    for sig_pos in pp:
-                        sig_domain[sig_pos] = signatures.pop()
-                    sig_domains.append(sig_domain)
-
-                # Verify sig domains
-                for sig_domain in sig_domains:
-                    signature_list = [s for s in sig_domain if s != '']
-                    for sig in signature_list:
-                        pos = sig_domain.index(sig)
-                        if not verify_signature(tsig, sig['signature'], pub_key_list_uncompressed[pos]):
-                            sig_domains.remove(sig_domain)
-                            break
-                            # TODO: Remove all domains with signature on this position
-                if len(sig_domains):
-                    self.inputs[tid].signatures = [s for s in sig_domains[0] if s != '']
-                else:
-                    raise TransactionError("Invalid signatures found")
-                # TODO: Think about what will happen when 2 or more identical private keys are used
+        self._unlocking_script_update(tid, hash_type)
+        return n_signs
+
+    def sign_all(self, keys, hash_type=SIGHASH_ALL, processes=None):
+        """
+        Sign all inputs of this transaction with the provided private keys
+
+        Each key is converted and mapped to its public key once, and only used for the inputs which contain this
+        public key. Keys which do not belong to an input are ignored. All signature hashes are calculated with one
+        SignatureHash object.
+
+        Signatures are created in a single batch. For transactions with hundreds of inputs specify processes to
+        create the signatures in a pool of worker processes.
+
+        :param keys: A private key or list of private keys
+        :type keys: HDKey, Key, bytes, list
+        :param hash_type: Specific hash type, default is SIGHASH_ALL
+        :type hash_type: int
+        :param processes: Number of worker processes to create signatures. Leave empty to sign in current process
+        :type processes: int
+
+        :return int: Return int with number of signatures added
+        """
+        if not isinstance(keys, list):
+            keys = [keys]
+        key_map = {}
+        for key in keys:
+            priv_key, pub_key, pub_key_uncompressed = _signing_key(key)
+            key_map[pub_key] = priv_key
+            key_map[pub_key_uncompressed] = priv_key
+
+        tasks = []
+        for i in self.inputs:
+            if i.script_type == 'coinbase':
+                continue
+            signed = [x['pub_key'] for x in i.signatures]
+            pub_keys = [pk for pk in i.public_keys if pk in key_map and pk not in signed]
+            if pub_keys:
+                tsig = self.signature_hash(i.tid, hash_type)
+                tasks += [(i.tid, tsig, pub_key) for pub_key in pub_keys]
+        if not tasks:
+            return 0
+
+        args = [(tsig, int(binascii.hexlify(key_map[pub_key]), 16)) for _, tsig, pub_key in tasks]
+        if processes:
+            pool = multiprocessing.Pool(processes)
+            try:
+                signatures = pool.map(_sign_digest, args, chunksize=max(1, len(args) // (processes * 4)))
+            finally:
+                pool.terminate()
+        else:
+            signatures = [_sign_digest(a) for a in args]
+
+        n_signs = 0
+        signed_tids = []
+        for (tid, tsig, pub_key), (r, s) in zip(tasks, signatures):
+            if self._signature_add(tid, tsig, r, s, key_map[pub_key], pub_key):
+                n_signs += 1
+            if tid not in signed_tids:
+                signed_tids.append(tid)
+        for tid in signed_tids:
+            self._unlocking_script_update(tid, hash_type)
+        return n_signs
+
+    def _signature_add(self, tid, tsig, r, s, priv_key, pub_key):
+        """
+        Add a new signature to the signature list of an input, in the same order as the keys of the input
+
+        :return bool: False if the input already contains a signature for this key
+        """
+        sig_der = ecdsa.util.sigencode_der(r, s, secp256k1_n)
+        signature = '%064x%064x' % (r, s)
+        newsig = {
+                'sig_der': to_bytes(sig_der),
+                'signature': to_bytes(signature),
+                'priv_key': priv_key,
+                'pub_key': pub_key,
+                'transaction_id': tid
+            }
+        inp = self.inputs[tid]
+        if not inp.signatures:
+            inp.signatures.append(newsig)
+            return True
+
+        # Signatures are ordered like the keys of the input. Find the key position of every signature, verify each
+        # signature only against keys after the position of the previous signature.
+        key_positions = _key_positions(inp)
+        placed = []
+        pos = 0
+        for sig in inp.signatures:
+            if sig['pub_key'] in key_positions and key_positions[sig['pub_key']] >= pos:
+                pos = key_positions[sig['pub_key']]
             else:
-                self.inputs[tid].signatures.append(
-                   newsig
-                )
+                while pos < len(inp.public_keys) and \
+                        not self._signature_verify(tsig, sig['signature'], inp.public_keys[pos]):
+                    pos += 1
+                if pos == len(inp.public_keys):
+                    raise TransactionError("Invalid signatures found")
+                sig['pub_key'] = inp.public_keys[pos]
+            placed.append((pos, sig))
+            pos += 1
+        if key_positions[pub_key] in [p for p, _ in placed]:
+            _logger.warning("Key %s already signed" % pub_key)
+            return False
+        placed.append((key_positions[pub_key], newsig))
+        inp.signatures = [sig for _, sig in sorted(placed, key=lambda x: x[0])]
+        return True
+
+    def _signature_verify(self, tsig, signature, public_key):
+        """
+        Verify signature of a signature hash with a public key. Results are cached per transaction.
+        """
+        cache_key = (tsig, signature, public_key)
+        if cache_key not in self._verified:
+            self._verified[cache_key] = verify_signature(tsig, signature, public_key)
+        return self._verified[cache_key]
 
+    def _unlocking_script_update(self, tid, hash_type=SIGHASH_ALL):
+        """
+        Create the unlocking script of an input from its signatures and keys
+        """
         if self.inputs[tid].script_type == 'p2pkh':
             self.inputs[tid].unlocking_script = \
                 varstr(self.inputs[tid].signatures[0]['sig_der'] + struct.pack('B', hash_type)) + \
-                varstr(self.inputs[tid].keys[0].public_byte)
+                varstr(self.inputs[tid].public_keys[0])
         elif self.inputs[tid].script_type == 'p2sh_multisig':
             n_tag = self.inputs[tid].redeemscript[0]
             if not isinstance(n_tag, int):
@@ -991,7 +2638,6 @@ class Transaction:
                 _p2sh_multisig_unlocking_script(signatures, self.inputs[tid].redeemscript, hash_type)
         else:
             raise TransactionError("Script type %s not supported at the moment" % self.inputs[tid].script_type)
-        return n_signs
 
     def add_input(self, prev_hash, output_index, keys=None, unlocking_script=b'', script_type='p2pkh',
                   sequence=b'\xff\xff\xff\xff', compressed=True, sigs_required=None, sort=False):
@@ -1060,10 +2706,174 @@ class Transaction:
         self.outputs.append(Output(int(amount), address, public_key_hash, public_key, lock_script,
                                    self.network.network_name))
 
+    def estimate_size(self):
+        """
+        Estimate size of this transaction in bytes. The actual size is used for signed inputs. For other p2pkh and
+        p2sh_multisig inputs the size of the signatures is estimated with estimate_input_size, for other script types
+        the size of the current unlocking script is used.
+
+        :return int: Estimated size in bytes
+        """
+        estimator = SizeEstimator()
+        for i in self.inputs:
+            if i.script_type not in ('p2pkh', 'p2sh_multisig') or \
+                    (i.unlocking_script and len(i.signatures) >= i.sigs_required):
+                estimator.add_input(unlocking_script=i.unlocking_script)
+            else:
+                compressed = len(i.public_keys[0]) == 33 if i.public_keys else i.compressed
+                estimator.add_input(i.script_type, compressed, i.sigs_required, len(i.public_keys))
+        for o in self.outputs:
+            estimator.add_output(lock_script=o.lock_script)
+        return estimator.size
+
     def estimate_fee(self):
         """
         Get estimated fee for this transaction in smallest denominator (i.e. Satoshi)
 
         :return int: Estimated transaction fee
         """
-        return int(len(self.raw())/1024 * self.fee_per_kb)
+        return int(self.estimate_size() / 1024.0 * self.fee_per_kb)
+
+
+class Block(object):
+    """
+    Block with header information and a list of transactions
+
+    """
+
+    @staticmethod
+    def parse(rawblock, offset=0, network=DEFAULT_NETWORK):
+        """
+        Parse a raw block: the 80 byte block header, the number of transactions and the transactions.
+
+        Transactions are parsed with iter_transactions, so transaction ids are calculated from the raw data and
+        input and output objects are created on first use.
+
+        :param rawblock: Raw block as bytes-like object, open file in binary mode, filename or hexadecimal string
+        :type rawblock: bytes, bytearray, memoryview, mmap, file, str
+        :param offset: Position of the block header
+        :type offset: int
+        :param network: Network, leave empty for default
+        :type network: str
+
+        :return Block:
+        """
+        data, mm = _open_buffer(rawblock)
+        try:
+            view = memoryview(data)
+            if len(view) < offset + 81:
+                raise TransactionError("Error parsing block, data is truncated or malformed")
+            header = view[offset:offset + 80].tobytes()
+            version, time, bits, nonce = struct.unpack('<i', header[:4]) + struct.unpack('<III', header[68:80])
+            try:
+                tx_count, cursor = _read_varint(view, offset + 80)
+            except (struct.error, KeyError):
+                raise TransactionError("Error parsing block, data is truncated or malformed")
+            b = Block(version, to_hexstring(header[4:36][::-1]), to_hexstring(header[36:68][::-1]), time, bits, nonce,
+                      network=network)
+            b.block_hash = to_hexstring(hashlib.sha256(hashlib.sha256(header).digest()).digest()[::-1])
+            for txid, t, start, end in iter_transactions(view, cursor, tx_count, network):
+                b.txids.append(txid)
+                b.transactions.append(t)
+                b.offsets.append((start, end))
+            if len(b.transactions) != tx_count:
+                raise TransactionError("Error parsing block, expected %d transactions but found %d" %
+                                       (tx_count, len(b.transactions)))
+            return b
+        finally:
+            if mm is not None:
+                view = None
+                try:
+                    mm.close()
+                except BufferError:
+                    # Transactions still refer to the map, it is closed when they are garbage collected
+                    pass
+
+    def __init__(self, version=1, prev_block='', merkle_root='', time=0, bits=0, nonce=0, transactions=None,
+                 txids=None, network=DEFAULT_NETWORK):
+        """
+        Create a new block object. Use the parse method to create a Block from raw data.
+
+        :param version: Block version
+        :type version: int
+        :param prev_block: Hash of previous block as hexadecimal string
+        :type prev_block: str
+        :param merkle_root: Merkle root of transaction ids as hexadecimal string
+        :type merkle_root: str
+        :param time: Block timestamp
+        :type time: int
+        :param bits: Encoded difficulty target
+        :type bits: int
+        :param nonce: Nonce
+        :type nonce: int
+        :param transactions: List of Transaction objects
+        :type transactions: list
+        :param txids: List of transaction ids, in same order as transactions
+        :type txids: list
+        :param network: Network, leave empty for default
+        :type network: str
+        """
+        self.version = version
+        self.prev_block = prev_block
+        self.merkle_root = merkle_root
+        self.time = time
+        self.bits = bits
+        self.nonce = nonce
+        self.transactions = transactions or []
+        self.txids = txids or []
+        self.offsets = []
+        self.block_hash = None
+        self.network = network
+        if not isinstance(network, Network):
+            self.network = Network(network)
+
+    def __repr__(self):
+        return "<Block (block_hash=%s, transaction_count=%d, network=%s)>" % \
+               (self.block_hash, len(self.transactions), self.network.network_name)
+
+    def calculate_merkle_root(self):
+        """
+        Calculate merkle root of the transaction ids of this block
+
+        :return str: Merkle root as hexadecimal string
+        """
+        if not self.txids:
+            raise TransactionError("No transaction ids found to calculate merkle root")
+        hashes = [to_bytes(txid)[::-1] for txid in self.txids]
+        while len(hashes) > 1:
+            if len(hashes) % 2:
+                hashes.append(hashes[-1])
+            hashes = [hashlib.sha256(hashlib.sha256(hashes[i] + hashes[i + 1]).digest()).digest()
+                      for i in range(0, len(hashes), 2)]
+        return to_hexstring(hashes[0][::-1])
+
+    def verify(self, processes=None):
+        """
+        Verify the merkle root and the signatures of all transactions in this block
+
+        The signatures of all transactions are collected and verified in one batch with verify_batch. Only input
+        script types which are supported by the Transaction class can be verified.
+
+        :param processes: Number of worker processes to verify signatures. Leave empty to verify in current process
+        :type processes: int
+
+        :return bool: True if merkle root and all signatures are valid
+        """
+        if self.txids and self.merkle_root != self.calculate_merkle_root():
+            _logger.info("Merkle root of block %s does not match transactions" % self.block_hash)
+            return False
+        valid = True
+        items = []
+        owners = []
+        for n, t in enumerate(self.transactions):
+            t_items, _, results = t._verify_items()
+            if not all(results.values()):
+                _logger.info("Transaction %d of block %s has missing or invalid signatures" % (n, self.block_hash))
+                valid = False
+            items += t_items
+            owners += [n] * len(t_items)
+        for n, res in zip(owners, verify_batch(items, processes)):
+            if not res:
+                _logger.info("Invalid signature found in transaction %d of block %s" % (n, self.block_hash))
+                valid = False
+        return valid
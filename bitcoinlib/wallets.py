@@ -18,17 +18,18 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import copy
 import numbers
 from itertools import groupby
-from copy import deepcopy
 import struct
 from sqlalchemy import or_
 from bitcoinlib.db import *
 from bitcoinlib.encoding import pubkeyhash_to_addr, to_bytes, to_hexstring, script_to_pubkeyhash
-from bitcoinlib.keys import HDKey, check_network_and_key
+from bitcoinlib.keys import HDKey, check_network_and_key, deserialize_address
 from bitcoinlib.networks import Network, DEFAULT_NETWORK
 from bitcoinlib.services.services import Service
-from bitcoinlib.transactions import Transaction, serialize_multisig_redeemscript
+from bitcoinlib.transactions import Transaction, serialize_multisig_redeemscript, SizeEstimator, \
+    estimate_input_size
 from bitcoinlib.mnemonic import Mnemonic
 
 _logger = logging.getLogger(__name__)
@@ -261,7 +262,7 @@ class HDWalletKey:
 
         nk = DbKey(name=name, wallet_id=wallet_id, public=k.public_hex, private=k.private_hex, purpose=purpose,
                    account_id=account_id, depth=k.depth, change=change, address_index=k.child_index,
-                   wif=k.wif(), address=k.key.address(), parent_id=parent_id,
+                   wif=k.wif(), address=k.address(), parent_id=parent_id,
                    is_private=k.isprivate, path=path, key_type=key_type, network_name=network)
         session.add(nk)
         session.commit()
@@ -1657,11 +1658,28 @@ class HDWallet:
             res.append(u)
         return res
 
-    @staticmethod
-    def _select_inputs(amount, utxo_query=None):
+    def _input_script(self, key):
+        """
+        Get script type and number of keys of an input which spends an UTXO of given key. Used to estimate the size
+        of the input.
+
+        :param key: Key of UTXO
+        :type key: DbKey
+
+        :return dict: Keyword arguments for estimate_input_size
+        """
+        if key.key_type == 'multisig':
+            return {'script_type': 'p2sh_multisig', 'sigs_required': self.multisig_n_required,
+                    'n_keys': len(key.multisig_children)}
+        return {'script_type': 'p2pkh'}
+
+    def _select_inputs(self, amount, utxo_query=None, fee_per_kb=None, estimator=None):
         """
         Internal method used by create transaction to select best inputs (UTXO's) for a transaction. To get the
         least number of inputs
+
+        If a fee per kilobyte and a size estimator are provided the fee for the size of the transaction, including the
+        selected inputs, is added to the amount. The fee is updated for every selected input.
         
         Example of UTXO query:
             SELECT transactions.id AS transactions_id, transactions.key_id AS transactions_key_id, 
@@ -1678,31 +1696,45 @@ class HDWallet:
         :type amount: int
         :param utxo_query: List of outputs in SQLalchemy query format. Wallet and Account ID filter must be included already. 
         :type utxo_query: self._session.query
+        :param fee_per_kb: Fee per kilobyte transaction size. Leave empty if fee is included in amount
+        :type fee_per_kb: int
+        :param estimator: Size estimator with the outputs of the transaction. Is not changed by this method.
+        :type estimator: SizeEstimator
         
         :return list: List of selected UTXO 
         """
 
         if not utxo_query:
             return []
+        if fee_per_kb:
+            estimator = copy.copy(estimator)
+
+        def target(extra_size=0):
+            if not fee_per_kb:
+                return amount
+            return amount + estimator.fee(fee_per_kb, extra_size)
 
         # Try to find one utxo with exact amount or higher
-        one_utxo = utxo_query.\
-            filter(DbTransactionOutput.spend.op("IS")(False), DbTransactionOutput.value >= amount).\
-            order_by(DbTransactionOutput.value).first()
-        if one_utxo:
-            return [one_utxo]
+        for utxo in utxo_query.\
+                filter(DbTransactionOutput.spend.op("IS")(False), DbTransactionOutput.value >= target()).\
+                order_by(DbTransactionOutput.value):
+            if not fee_per_kb or utxo.value >= target(estimate_input_size(**self._input_script(utxo.key))):
+                return [utxo]
 
         # Otherwise compose of 2 or more lesser outputs
         lessers = utxo_query.\
-            filter(DbTransactionOutput.spend.op("IS")(False), DbTransactionOutput.value < amount).\
+            filter(DbTransactionOutput.spend.op("IS")(False)).\
             order_by(DbTransactionOutput.value.desc()).all()
         total_amount = 0
         selected_utxos = []
         for utxo in lessers:
-            if total_amount < amount:
-                selected_utxos.append(utxo)
-                total_amount += utxo.value
-        if total_amount < amount:
+            if total_amount >= target():
+                break
+            selected_utxos.append(utxo)
+            total_amount += utxo.value
+            if fee_per_kb:
+                estimator.add_input(**self._input_script(utxo.key))
+        if total_amount < target():
             return []
         return selected_utxos
 
@@ -1747,14 +1779,17 @@ class HDWallet:
         transaction.fee = transaction_fee
         transaction.fee_per_kb = None
         fee_per_output = None
-        tr_size = 100 + (1 * 150) + (len(output_arr) + 1 * 50)
+        estimator = SizeEstimator()
+        for o in transaction.outputs:
+            estimator.add_output(lock_script=o.lock_script)
         if transaction_fee is None:
             if not input_arr:
                 transaction.fee_per_kb = srv.estimatefee()
                 if transaction.fee_per_kb is False:
                     raise WalletError("Could not estimate transaction fees, please specify fees manually")
-                transaction.fee = int((tr_size / 1024.0) * transaction.fee_per_kb)
-                fee_per_output = int((50 / 1024) * transaction.fee_per_kb)
+                # Include change output in fee, it is removed later if the change is too small
+                change_size = estimator.add_output('p2sh' if self.scheme == 'multisig' else 'p2pkh')
+                fee_per_output = int((change_size / 1024.0) * transaction.fee_per_kb)
             else:
                 transaction.fee = 0
 
@@ -1770,12 +1805,16 @@ class HDWallet:
             if not utxos:
                 raise WalletError("Create transaction: No unspent transaction outputs found")
             input_arr = []
-            selected_utxos = self._select_inputs(amount_total_output + transaction.fee, utxo_query)
+            selected_utxos = self._select_inputs(amount_total_output + (transaction.fee or 0), utxo_query,
+                                                 transaction.fee_per_kb, estimator)
             if not selected_utxos:
                 raise WalletError("Not enough unspent transaction outputs found")
             for utxo in selected_utxos:
                 amount_total_input += utxo.value
                 input_arr.append((utxo.transaction.hash, utxo.output_n, utxo.key_id, utxo.value, []))
+                estimator.add_input(**self._input_script(utxo.key))
+            if transaction.fee_per_kb:
+                transaction.fee = estimator.fee(transaction.fee_per_kb)
         else:
             for i, inp in enumerate(input_arr):
                 # Get key_ids, value from Db if not specified
@@ -1812,7 +1851,7 @@ class HDWallet:
             amount_total_output += transaction.change
 
         # TODO: Extra check for ridiculous fees
-        # if (amount_total_input - amount_total_output) > tr_size * MAXIMUM_FEE_PER_KB
+        # if (amount_total_input - amount_total_output) > transaction.estimate_size() * MAXIMUM_FEE_PER_KB
 
         # Add inputs
         for inp in input_arr:
@@ -1871,29 +1910,35 @@ class HDWallet:
 
         :return Transaction: A transaction with one or more signed keys
         """
-        priv_key_list_arg = []
+        priv_key_list = []
         if private_keys:
             if not isinstance(private_keys, list):
                 private_keys = [private_keys]
             for priv_key in private_keys:
                 if isinstance(priv_key, HDKey):
-                    priv_key_list_arg.append(priv_key)
+                    priv_key_list.append(priv_key)
                 else:
-                    priv_key_list_arg.append(HDKey(priv_key, isprivate=True))
+                    priv_key_list.append(HDKey(priv_key, isprivate=True))
+        public_keys = set()
         for ti in transaction.inputs:
-            priv_key_list = deepcopy(priv_key_list_arg)
             for k in ti.keys:
                 if k.isprivate:
-                    if k not in priv_key_list:
-                        priv_key_list.append(k)
-                elif self.cosigner:
-                    # Check if private key is available in wallet
-                    cosign_wallet_ids = [w.wallet_id for w in self.cosigner]
-                    db_pk = self._session.query(DbKey).filter_by(public=k.public_hex, is_private=True).\
-                        filter(DbKey.wallet_id.in_(cosign_wallet_ids)).first()
-                    if db_pk:
-                        priv_key_list.append(HDKey(db_pk.wif))
-            transaction.sign(priv_key_list, ti.tid)
+                    priv_key_list.append(k)
+                else:
+                    public_keys.add(k.public_hex)
+        if public_keys and self.cosigner:
+            # Get private keys available in cosigner wallets with one query
+            cosign_wallet_ids = [w.wallet_id for w in self.cosigner]
+            db_pks = self._session.query(DbKey).filter(DbKey.public.in_(public_keys)).\
+                filter_by(is_private=True).filter(DbKey.wallet_id.in_(cosign_wallet_ids)).all()
+            priv_key_list += [HDKey(db_pk.wif) for db_pk in db_pks]
+        keys = []
+        private_bytes = set()
+        for k in priv_key_list:
+            if k.private_byte not in private_bytes:
+                private_bytes.add(k.private_byte)
+                keys.append(k)
+        transaction.sign_all(keys)
         return transaction
 
     def transaction_send(self, transaction):
@@ -1963,17 +2008,6 @@ class HDWallet:
         transaction = self.transaction_create(output_arr, input_arr, account_id, network, transaction_fee,
                                               min_confirms)
         transaction = self.transaction_sign(transaction, priv_keys)
-        # Calculate exact estimated fees and update change output if necessary
-        if transaction_fee is None and transaction.fee_per_kb and transaction.change:
-            fee_exact = transaction.estimate_fee()
-            # Recreate transaction if fee estimation more then 10% off
-            if fee_exact and abs((transaction.fee - fee_exact) / float(fee_exact)) > 0.10:
-                _logger.info("Transaction fee not correctly estimated (est.: %d, real: %d). "
-                             "Recreate transaction with correct fee" % (transaction.fee, fee_exact))
-                transaction = self.transaction_create(output_arr, input_arr, account_id, network, fee_exact,
-                                                      min_confirms)
-                transaction = self.transaction_sign(transaction, priv_keys)
-
         return self.transaction_send(transaction)
 
     def send_to(self, to_address, amount, account_id=None, network=None, transaction_fee=None, min_confirms=4,
@@ -2032,14 +2066,18 @@ class HDWallet:
         total_amount = 0
         if not utxos:
             return False
+        keys = dict((k.id, k) for k in self._session.query(DbKey).
+                    filter(DbKey.id.in_(set(utxo['key_id'] for utxo in utxos))))
+        estimator = SizeEstimator()
         for utxo in utxos:
             input_arr.append((utxo['tx_hash'], utxo['output_n'], utxo['key_id'], utxo['value']))
             total_amount += utxo['value']
+            estimator.add_input(**self._input_script(keys[utxo['key_id']]))
+        estimator.add_output(deserialize_address(to_address)['script_type'])
         srv = Service(network=network)
         if fee_per_kb is None:
             fee_per_kb = srv.estimatefee()
-        tr_size = 125 + (len(input_arr) * 125)
-        estimated_fee = int((tr_size / 1024.0) * fee_per_kb)
+        estimated_fee = estimator.fee(fee_per_kb)
         return self.send([(to_address, total_amount-estimated_fee)], input_arr, network=network,
                          transaction_fee=estimated_fee, min_confirms=min_confirms)
 
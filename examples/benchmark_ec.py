@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+#
+#    BitcoinLib - Python Cryptocurrency Library
+#
+#    EXAMPLES - Benchmark elliptic curve backends
+#
+#    © 2017 October - 1200 Web Development <http://1200wd.com/>
+#
+
+import os
+import time
+import random
+import tempfile
+from bitcoinlib.config.secp256k1 import secp256k1_n, secp256k1_Gx, secp256k1_Gy
+from bitcoinlib import ecbackends
+from bitcoinlib.keys import Key, HDKey
+
+COUNT = 200
+
+
+def timed(name, method, count=COUNT):
+    start = time.time()
+    for _ in range(count):
+        method()
+    print("%-45s %8.3f ms" % (name, (time.time() - start) * 1000 / count))
+
+
+secrets = [random.randint(1, secp256k1_n - 1) for _ in range(COUNT)]
+
+#
+# Generator table cost
+#
+print("\n=== Precomputed generator table ===")
+tablefile = os.path.join(tempfile.mkdtemp(), 'gtable.bin')
+timed("Build table", ecbackends.GeneratorTable.build, 1)
+ecbackends.GeneratorTable.build().save(tablefile)
+timed("Load memory-mapped table from file", lambda: ecbackends.GeneratorTable.load(tablefile), 10)
+print("Table file size: %d bytes" % os.path.getsize(tablefile))
+os.remove(tablefile)
+
+#
+# Multiply generator point with secret: G * secret
+#
+print("\n=== Generator point multiplication ===")
+ecbackends.generator_table()
+for name in ecbackends.EC_BACKENDS:
+    try:
+        backend = ecbackends.get_backend(name)
+    except ecbackends.EcBackendError:
+        print("%-45s not available" % name)
+        continue
+    it = iter(secrets * 2)
+    timed("%s ec_point" % name, lambda: backend.ec_point(next(it)))
+python_backend = ecbackends.get_backend('python')
+it = iter(secrets)
+timed("python point_multiply(G) without table",
+      lambda: python_backend.point_multiply((secp256k1_Gx, secp256k1_Gy), next(it)))
+
+#
+# Key methods which use the active backend
+#
+print("\n=== Key methods with '%s' backend ===" % ecbackends.backend.name)
+it = iter(secrets)
+timed("Key from private key", lambda: Key(next(it)))
+k = HDKey()
+it = iter(range(COUNT))
+timed("HDKey.child_public", lambda: k.public().child_public(next(it)))
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+#    BitcoinLib - Python Cryptocurrency Library
+#
+#    EXAMPLES - Benchmark HD key derivation and memory usage
+#
+#    © 2017 October - 1200 Web Development <http://1200wd.com/>
+#
+
+import time
+import tracemalloc
+from bitcoinlib.keys import HDKey
+
+COUNT = 1000
+
+masterkey = HDKey('xprv9s21ZrQH143K3QTDL4LXw2F7HEK3wJUD2nW2nRk4stbPy6cq3jPPqjiChkVvvNKmPGJxWUtg6LnF5kejMRNNU3TGtRBeJgk'
+                  '33yuGBxrMPHi')
+account = masterkey.subkey_for_path("m/44'/0'/0'/0")
+
+#
+# Memory usage of derived keys
+#
+print("\n=== Memory usage of %d derived keys ===" % COUNT)
+tracemalloc.start()
+start_size = tracemalloc.get_traced_memory()[0]
+start = time.time()
+keys = [account.child_private(i) for i in range(COUNT)]
+duration = time.time() - start
+size = tracemalloc.get_traced_memory()[0] - start_size
+print("Private keys                     %8.0f bytes per key, %6.3f ms per key" %
+      (size / COUNT, duration * 1000 / COUNT))
+for k in keys:
+    k.wif()
+    k.address()
+size = tracemalloc.get_traced_memory()[0] - start_size
+print("After wif() and address() calls  %8.0f bytes per key" % (size / COUNT))
+del keys
+
+account_public = account.public()
+start_size = tracemalloc.get_traced_memory()[0]
+start = time.time()
+keys = [account_public.child_public(i) for i in range(COUNT)]
+duration = time.time() - start
+size = tracemalloc.get_traced_memory()[0] - start_size
+print("Public keys                      %8.0f bytes per key, %6.3f ms per key" %
+      (size / COUNT, duration * 1000 / COUNT))
+tracemalloc.stop()
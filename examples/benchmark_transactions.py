@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+#    BitcoinLib - Python Cryptocurrency Library
+#
+#    EXAMPLES - Benchmark signing of transactions with many inputs
+#
+#    © 2017 October - 1200 Web Development <http://1200wd.com/>
+#
+
+import time
+import struct
+import hashlib
+from bitcoinlib.encoding import int_to_varbyteint
+from bitcoinlib.keys import Key
+from bitcoinlib.transactions import Transaction, SIGHASH_ALL
+
+
+def sighash_serialize_all(t, sign_id, hash_type=SIGHASH_ALL):
+    # Serialize complete transaction for every input, as done before the SignatureHash class was introduced
+    r = t.version[::-1]
+    r += int_to_varbyteint(len(t.inputs))
+    for i in t.inputs:
+        r += i.prev_hash[::-1] + i.output_index[::-1]
+        if sign_id == i.tid:
+            r += int_to_varbyteint(len(i.unlocking_script_unsigned)) + i.unlocking_script_unsigned
+        else:
+            r += b'\0'
+        r += i.sequence
+    r += int_to_varbyteint(len(t.outputs))
+    for o in t.outputs:
+        r += struct.pack('<Q', o.amount)
+        r += int_to_varbyteint(len(o.lock_script)) + o.lock_script
+    r += struct.pack('<L', t.locktime)
+    r += struct.pack('<L', hash_type)
+    return hashlib.sha256(hashlib.sha256(r).digest()).digest()
+
+
+def create_transaction(key, n_inputs):
+    t = Transaction()
+    for n in range(n_inputs):
+        t.add_input(hashlib.sha256(struct.pack('<L', n)).digest(), n % 4, key)
+    t.add_output(100000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+    return t
+
+
+k = Key()
+print("%8s %20s %20s" % ("Inputs", "Serialize all (s)", "SignatureHash (s)"))
+for n_inputs in [100, 250, 500, 1000]:
+    t = create_transaction(k, n_inputs)
+    start = time.time()
+    old = [sighash_serialize_all(t, tid) for tid in range(n_inputs)]
+    time_old = time.time() - start
+    start = time.time()
+    new = [t.signature_hash(tid) for tid in range(n_inputs)]
+    time_new = time.time() - start
+    assert old == new
+    print("%8d %20.3f %20.3f" % (n_inputs, time_old, time_new))
+
+t = create_transaction(k, 1000)
+start = time.time()
+for tid in range(1000):
+    t.sign(k, tid)
+print("\nSign transaction with 1000 inputs: %.3f seconds" % (time.time() - start))
+
+t = create_transaction(k, 1000)
+start = time.time()
+t.sign_all(k)
+print("Sign all inputs with sign_all: %.3f seconds" % (time.time() - start))
+
+t = create_transaction(k, 1000)
+start = time.time()
+t.sign_all(k, processes=4)
+print("Sign all inputs with sign_all in 4 processes: %.3f seconds" % (time.time() - start))
+
+#
+# Verify signatures of a transaction with 1000 inputs, one by one and in one batch for every backend
+#
+from bitcoinlib import ecbackends
+from bitcoinlib.transactions import verify_signature, verify_batch
+items = [(t.signature_hash(i.tid), i.signatures[0]['signature'], i.keys[0].public_byte) for i in t.inputs]
+print("\n%-12s %20s %20s" % ("Backend", "verify_signature (s)", "verify_batch (s)"))
+for name in ecbackends.EC_BACKENDS:
+    try:
+        ecbackends.set_backend(name)
+    except ecbackends.EcBackendError:
+        continue
+    start = time.time()
+    assert all([verify_signature(*item) for item in items])
+    time_single = time.time() - start
+    start = time.time()
+    assert all(verify_batch(items))
+    print("%-12s %20.3f %20.3f" % (name, time_single, time.time() - start))
+ecbackends.set_backend()
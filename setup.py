@@ -34,6 +34,7 @@ install_requires = ['requests', 'ecdsa', 'pbkdf2', 'pycrypto', 'scrypt', 'sqlalc
 if sys.version_info < (3, 4):
     install_requires.append('enum34')
 kwargs['install_requires'] = install_requires
+kwargs['extras_require'] = {'secp256k1': ['coincurve']}
 
 setup(
       name='bitcoinlib',
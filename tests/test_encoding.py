@@ -130,9 +130,45 @@ class TestEncodingMethodsAddressConversion(unittest.TestCase):
                          pubkeyhash_to_addr('13d215d212cd5188ae02c5635faabdc4d7d4ec91'))
 
     def test_pkh_to_addr_conversion_2(self):
-        self.assertEqual('11111111111111111111111111114oLvT2',
+        self.assertEqual('1111111111111111111114oLvT2',
                          pubkeyhash_to_addr('00' * 20))
 
+    def test_address_to_pkh_conversion_invalid_checksum(self):
+        self.assertRaisesRegexp(EncodingError, "Invalid checksum", addr_to_pubkeyhash,
+                                '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSJ')
+
+
+class TestEncodingMethodsBase58(unittest.TestCase):
+
+    def test_b58encode(self):
+        self.assertEqual('16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM',
+                         b58encode(b"\x00\x01\tfw`\x06\x95=UgC\x9e^9\xf8j\r';\xee\xd6\x19g\xf6"))
+
+    def test_b58decode(self):
+        self.assertEqual(b'\x00\xd7{\xf7b\x8c\x19\xe6\x99\x01\r)xz)\xaf\xcf\x8e\x92\xadZ\x05=U\xd7',
+                         b58decode('1LeNnaRtV52nNtZXvtw6PaGKpk46hU1Xmx'))
+
+    def test_b58_leading_zeros(self):
+        self.assertEqual('1112', b58encode(b'\0\0\0\x01'))
+        self.assertEqual(b'\0\0\0\x01', b58decode('1112'))
+        self.assertEqual(b'\0\0', b58decode('11'))
+        self.assertEqual('', b58encode(b''))
+
+    def test_b58decode_invalid_character(self):
+        self.assertRaisesRegexp(EncodingError, "Unknown character '0'", b58decode, '1LeNnaRtV52nNtZXvtw60aGKp')
+
+    def test_b58check_encode(self):
+        self.assertEqual('12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH',
+                         b58check_encode(b'\x00' + to_bytes('13d215d212cd5188ae02c5635faabdc4d7d4ec91')))
+
+    def test_b58check_decode(self):
+        self.assertEqual('0013d215d212cd5188ae02c5635faabdc4d7d4ec91',
+                         to_hexstring(b58check_decode('12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')))
+
+    def test_b58check_decode_invalid_checksum(self):
+        self.assertRaisesRegexp(EncodingError, "Invalid checksum", b58check_decode,
+                                '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSJ')
+
 
 class TestEncodingMethodsStructures(unittest.TestCase):
 
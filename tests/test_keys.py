@@ -23,6 +23,7 @@ import unittest
 import json
 
 from bitcoinlib.keys import *
+from bitcoinlib.encoding import EncodingError
 
 # Number of bulktests for generation of private, public keys and hdkeys. Set to 0 to disable
 # WARNING: Can be slow for a larger number of tests
@@ -71,6 +72,47 @@ class TestGetKeyFormat(unittest.TestCase):
         self.assertEqual(['dash'], get_key_format(key)['networks'])
 
 
+class TestNetworks(unittest.TestCase):
+
+    def test_network_by_value_formats(self):
+        self.assertEqual(['litecoin'], network_by_value('prefix_wif', 'B0'))
+        self.assertEqual(['litecoin'], network_by_value('prefix_wif', 'b0'))
+        self.assertEqual(['litecoin'], network_by_value('prefix_wif', b'\xb0'))
+        self.assertEqual(['bitcoin', 'litecoin'], network_by_value('prefix_address_p2sh', b'\x05'))
+        self.assertEqual([], network_by_value('prefix_hdkey_public', 'FFFFFFFF'))
+        self.assertEqual(['testnet'], network_by_value('prefix_hdkey_private', '04358394'))
+
+    def test_network_values_for(self):
+        self.assertIn(b'\x80', network_values_for('prefix_wif'))
+        self.assertIn('0488ade4', network_values_for('prefix_hdkey_private', output_as='hex'))
+
+    def test_network_interned(self):
+        network = Network('testnet')
+        self.assertIs(network, Network('testnet'))
+        self.assertIs(network, Network.get('testnet'))
+        self.assertIs(network, Network(network))
+        self.assertIs(network, Key(network='testnet').network)
+        self.assertIsNot(network, Network('bitcoin'))
+
+    def test_network_immutable(self):
+        from bitcoinlib.networks import NetworkError
+        network = Network('bitcoin')
+        self.assertRaises(NetworkError, setattr, network, 'prefix_wif', b'\x99')
+        self.assertEqual(b'\x80', network.prefix_wif)
+
+    def test_network_copy_pickle(self):
+        import pickle
+        from copy import deepcopy
+        network = Network('litecoin')
+        self.assertIs(network, deepcopy(network))
+        self.assertIs(network, pickle.loads(pickle.dumps(network)))
+
+    def test_network_reload_definitions(self):
+        from bitcoinlib.networks import reload_network_definitions
+        reload_network_definitions()
+        self.assertEqual(['bitcoin'], network_by_value('prefix_hdkey_private', '0488ADE4'))
+
+
 class TestPrivateKeyConversions(unittest.TestCase):
 
     def setUp(self):
@@ -98,6 +140,15 @@ class TestPrivateKeyConversions(unittest.TestCase):
         self.assertEqual('044781e448a7ff0e1b66f1a249b4c952dae33326cf57c0a643738886f4efcd14d57a380bc32c26f46e733c'
                          'd991064c2e7f7d532b9c9ca825671a8809ab6876c78b', self.ku.public_uncompressed_hex)
 
+    def test_private_key_lazy_public_key(self):
+        k = Key(self.privatekey_hex)
+        self.assertEqual('L3RyKcjp8kzdJ6rhGhTC5bXWEYnC2eL3b1vrZoduXMht6m9MQeHy', k.wif())
+        self.assertEqual(self.privatekey_hex, k.private_hex)
+        self.assertIsNone(k._point)
+        self.assertEqual('4781e448a7ff0e1b66f1a249b4c952dae33326cf57c0a643738886f4efcd14d5', k._x)
+        self.assertEqual(b'\x03', k.public_byte[:1])
+        self.assertIsNotNone(k._point)
+
 
 class TestPrivateKeyImport(unittest.TestCase):
 
@@ -249,6 +300,15 @@ class TestHDKeysImport(unittest.TestCase):
             'xprv9s21ZrQH143K24Mfq5zL5MhWK9hUhhGbd45hLXo2Pq2oqzMMo63oStZzFAbeoRRpMHE67jGmBQKCr2YovK2G23x5uzaztRbEW9pc'
             'j6SqMFd', self.k.wif())
 
+    def test_hdkey_import_uncompressed_wif(self):
+        k = HDKey('5KJvsngHeMpm884wtkJNzQGaCErckhHJBGFsvd3VyK5qMZXj3hS')
+        self.assertFalse(k.compressed)
+        self.assertEqual('1JwSSubhmg6iPtRjtyqhUYYH7bZg3Lfy1T', k.address())
+        self.assertEqual(k.key.address(), k.address())
+        k.network_change('testnet')
+        self.assertEqual('myTPjxggahXyAzuMcYp5JTkbybANyLsYBW', k.address())
+        self.assertFalse(k.key.compressed)
+
     def test_hdkey_import_bip38_key(self):
         self.k = HDKey('6PYNKZ1EAgYgmQfmNVamxyXVWHzK5s6DGhwP4J5o44cvXdoY7sRzhtpUeo',
                        passphrase='TestingOneTwoThree')
@@ -269,6 +329,30 @@ class TestHDKeysImport(unittest.TestCase):
         except KeyError as e:
             self.assertEqual('WIF format not supported for public key', e.args[0])
 
+    def test_hdkey_compact_representation(self):
+        self.assertFalse(hasattr(self.k, '__dict__'))
+        self.assertEqual('e8f32e723decf4051aefac8e2c93c9c5b214313817cdb01a1494b917c8436b35', self.k.private_hex)
+        self.assertEqual(self.k.private_hex, self.k.key_hex)
+        self.assertEqual('0339a36013301597daef41fbe593a02cc513d0b55527ec2df1050e2e8ff49c85c2', self.k.public_hex)
+        self.assertEqual('15mKKb2eos1hWa6tisdPwwDC1a5J1y9nma', self.k.address())
+        self.assertEqual(self.k.key.address(), self.k.address())
+        self.assertIsNone(self.xpub.private_byte)
+        self.assertEqual(self.xpub.public_hex, self.xpub.key_hex)
+        self.assertEqual(self.k.address(), self.xpub.address())
+
+    def test_hdkey_hash160_cached(self):
+        hash160 = self.k.hash160()
+        self.assertEqual('3442193e1bb70916e914552172cd4e2dbc9df811', to_hexstring(hash160))
+        children = [self.k.child_private(i) for i in range(3)] + [self.xpub.child_public(i) for i in range(3)]
+        self.assertIs(hash160, self.k.hash160())
+        for child in children:
+            self.assertEqual(hash160[:4], child.parent_fingerprint)
+        key = self.k.key
+        self.assertIs(key.hash160(), key.hash160())
+        self.assertEqual('15mKKb2eos1hWa6tisdPwwDC1a5J1y9nma', key.address())
+        self.assertEqual('1ASH7cP56e26xBgdAjTerNzdD6VQHSfq1N', key.address_uncompressed())
+        self.assertEqual('15mKKb2eos1hWa6tisdPwwDC1a5J1y9nma', key.address())
+
 
 class TestHDKeysChildKeyDerivation(unittest.TestCase):
 
@@ -315,6 +399,36 @@ class TestHDKeysChildKeyDerivation(unittest.TestCase):
                          '9rXpVGyy3bdW6EEgAtqt',
                          sk.wif_public())
 
+    def test_hdkey_path_derivation_cache(self):
+        from bitcoinlib.keys import derivation_cache
+        derivation_cache.clear()
+        sk = self.k.subkey_for_path("m/44'/0'/0'/0/5")
+        self.assertEqual(0, derivation_cache.hits)
+        self.assertEqual(5, len(derivation_cache))
+        sk2 = self.k.subkey_for_path("m/44'/0'/0'/0/6")
+        self.assertEqual(1, derivation_cache.hits)
+        self.assertEqual(sk.parent_fingerprint, sk2.parent_fingerprint)
+        self.assertEqual(self.k.child_private(44, True).child_private(0, True).child_private(0, True).child_private(0).
+                         child_private(6).wif(), sk2.wif())
+        self.assertEqual(sk.wif(), self.k.subkey_for_path("m/44'/0'/0'/0/5").wif())
+        self.assertEqual(2, derivation_cache.hits)
+        self.assertNotEqual(sk.wif(), self.k.subkey_for_path("m/44/0'/0'/0/5").wif())
+        self.assertNotEqual(sk.wif(), self.k2.subkey_for_path("m/44'/0'/0'/0/5").wif())
+        self.assertFalse([key for key in derivation_cache._items if self.k.private_byte in key])
+        self.assertIsNot(sk.key, self.k.subkey_for_path("m/44'/0'/0'/0/5").key)
+        derivation_cache.resize(0)
+        self.assertEqual(0, len(derivation_cache))
+        self.assertEqual(sk.wif(), self.k.subkey_for_path("m/44'/0'/0'/0/5").wif())
+        self.assertEqual(0, len(derivation_cache))
+        derivation_cache.resize(DEFAULT_DERIVATION_CACHE_SIZE)
+
+    def test_hdkey_path_public_hardened(self):
+        pk = self.k.public()
+        self.assertRaisesRegexp(BKeyError, "Hardened derivation", pk.subkey_for_path, "m/44'/0")
+        self.assertRaisesRegexp(BKeyError, "Hardened derivation", self.k.subkey_for_path, "M/0/1h")
+        self.assertEqual(self.k.subkey_for_path("m/0/1").public().wif(), pk.subkey_for_path("m/0/1").wif())
+        self.assertEqual(pk.subkey_for_path("m/0/1").wif(), self.k.subkey_for_path("M/0/1").wif())
+
     def test_hdkey_path_invalid(self):
         with self.assertRaises(BKeyError):
             self.k2.subkey_for_path('m/0/').wif()
@@ -369,6 +483,28 @@ class TestHDKeysPublicChildKeyDerivation(unittest.TestCase):
         self.assertEqual('xprv9wTErTSu5AWGkDeUPmqBcbZWX1xq85ZNX9iQRQW9DXwygFp7iRGJo79dsVctcsCHsnZ3XU3DhsuaGZbDh8iDkB'
                          'N45k67UKsJUXM1JfRCdn1', str(self.k2.subkey_for_path('3/2H').wif()))
 
+    def test_hdkey_derive_children(self):
+        addresses = self.K.derive_children(0, 10, output='address')
+        self.assertEqual('1BvgsfsZQVtkLS69NvGF8rw6NZW2ShJQHr', addresses[0])
+        self.assertEqual('17JbSP83rPWmbdcdtiiTNqBE8MgGN8kmUk', addresses[8])
+        self.assertEqual(addresses, self.k.derive_children(0, 10, output='address'))
+        self.assertEqual(addresses, self.k.derive_children(0, 10, public_only=True, output='address'))
+        self.assertEqual([self.K.child_public(i).hash160() for i in range(3, 6)],
+                         self.K.derive_children(3, 3, output='hash160'))
+        keys = self.k.derive_children(5, 3)
+        self.assertEqual('KxABnXp7SiuWi218c14KkjEMV7SjcfXnvsWaveNVxWZU1Rwi8zNQ', keys[2].key.wif())
+        self.assertEqual([self.k.child_private(i).wif() for i in range(5, 8)], [k.wif() for k in keys])
+        self.assertEqual([self.K.child_public(i).wif() for i in range(5, 8)],
+                         [k.wif() for k in self.K.derive_children(5, 3)])
+
+    def test_hdkey_derive_children_hardened_public(self):
+        self.assertRaisesRegexp(BKeyError, "Cannot derive hardened key from public private key",
+                                self.K.derive_children, 0x80000000, 2)
+
+    def test_hdkey_derive_children_processes(self):
+        self.assertEqual(self.K.derive_children(0, 25, output='address'),
+                         self.K.derive_children(0, 25, output='address', processes=2, chunksize=10))
+
 
 class TestHDKeysTestnet(unittest.TestCase):
 
@@ -414,6 +550,148 @@ class TestBip38(unittest.TestCase):
             self.assertRaisesRegexp(BKeyError, "Unrecognised key format", Key, [str(v['base58'])])
 
 
+class TestDeserializeAddress(unittest.TestCase):
+
+    def test_deserialize_address(self):
+        addr_dict = deserialize_address('12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        self.assertEqual('13d215d212cd5188ae02c5635faabdc4d7d4ec91', addr_dict['public_key_hash'])
+        self.assertEqual('bitcoin', addr_dict['network'])
+        self.assertEqual('p2pkh', addr_dict['script_type'])
+
+    def test_deserialize_address_invalid_checksum(self):
+        self.assertRaisesRegexp(EncodingError, "Invalid checksum", deserialize_address,
+                                '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSJ')
+
+    def test_deserialize_addresses(self):
+        addresses = ['12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH', '3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy',
+                     'mipcBbFg9gMiCh81Kj8tqqdgoZub1ZJRfn']
+        res = list(deserialize_addresses(addresses))
+        self.assertEqual(addresses, [r['address'] for r in res])
+        self.assertEqual(['', '', ''], [r['error'] for r in res])
+        self.assertEqual(['p2pkh', 'p2sh', 'p2pkh'], [r['script_type'] for r in res])
+        self.assertEqual(['bitcoin', '', ''], [r['network'] for r in res])
+        self.assertIn('litecoin', res[1]['networks_p2sh'])
+        self.assertEqual(['testnet', 'litecoin_testnet'], res[2]['networks_p2pkh'])
+
+    def test_deserialize_addresses_errors(self):
+        res = list(deserialize_addresses(['12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSJ', '1LeNnaRtV52nNtZXvtw60aGKp',
+                                          '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH']))
+        self.assertIn('Invalid checksum', res[0]['error'])
+        self.assertIn("Unknown character '0'", res[1]['error'])
+        self.assertEqual('', res[2]['error'])
+
+    def test_deserialize_addresses_processes(self):
+        addresses = ['12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH', '3J98t1WpEZ73CNmQviecrnyiWrnqRhWNLy', 'invalid'] * 5
+        self.assertEqual(list(deserialize_addresses(addresses)),
+                         list(deserialize_addresses(addresses, processes=2, chunksize=4)))
+
+
+class TestEcBackends(unittest.TestCase):
+
+    def setUp(self):
+        from bitcoinlib import ecbackends
+        self.backends = [ecbackends.get_backend('ecdsa'), ecbackends.get_backend('python')]
+        if ecbackends.coincurve is not None:
+            self.backends.append(ecbackends.get_backend('secp256k1'))
+        self.secret = 0x2c47c8b7f7ab6ff0cf4e2a1bc3a9a4a5d0ca0f4db9fdf4e0f0a5a6b2d7f1bdb1
+        self.digest = hashlib.sha256(b'bitcoinlib ec backend test').digest()
+
+    def test_ec_backends_ec_point(self):
+        point = Key(self.secret).public_point()
+        for backend in self.backends:
+            self.assertEqual(point, backend.ec_point(self.secret), backend.name)
+
+    def test_ec_backends_point_add_multiply(self):
+        p1 = self.backends[0].ec_point(self.secret)
+        p2 = self.backends[0].ec_point(3)
+        expected_sum = self.backends[0].ec_point(self.secret + 3)
+        expected_product = self.backends[0].ec_point(self.secret * 3 % secp256k1_n)
+        for backend in self.backends:
+            self.assertEqual(expected_sum, backend.point_add(p1, p2), backend.name)
+            self.assertEqual(expected_product, backend.point_multiply(p1, 3), backend.name)
+            self.assertEqual([expected_sum, self.backends[0].ec_point(self.secret + 5)],
+                             backend.ec_points_add([3, 5], p1), backend.name)
+
+    def test_ec_backends_sign_verify(self):
+        point = self.backends[0].ec_point(self.secret)
+        for signer in self.backends:
+            r, s = signer.sign(self.digest, self.secret)
+            for verifier in self.backends:
+                self.assertTrue(verifier.verify(self.digest, (r, s), point), (signer.name, verifier.name))
+                self.assertTrue(verifier.verify(self.digest, (r, secp256k1_n - s), point))
+                self.assertFalse(verifier.verify(self.digest, (r, s + 1), point))
+
+    def test_ec_backends_verify_off_curve(self):
+        # Point with y = 0 is not on the curve, without a check the signature (r, s) = ((2G).x, z / 2) is accepted
+        from bitcoinlib.ecbackends import point_on_curve
+        z = int(binascii.hexlify(self.digest), 16)
+        signature = (self.backends[0].ec_point(2)[0], z * pow(2, secp256k1_n - 2, secp256k1_n) % secp256k1_n)
+        point = self.backends[0].ec_point(self.secret)
+        self.assertTrue(point_on_curve(point))
+        for invalid_point in [(5, 0), (point[0], point[1] + 1), (point[0], point[1] + secp256k1_p)]:
+            self.assertFalse(point_on_curve(invalid_point))
+            for backend in self.backends:
+                self.assertFalse(backend.verify(self.digest, signature, invalid_point), backend.name)
+                self.assertEqual([False, False], backend.verify_batch([(self.digest, signature, invalid_point)] * 2),
+                                 backend.name)
+
+    def test_ec_backends_sign_rfc6979(self):
+        # Deterministic signatures for secret 1 and n - 1 of SHA256 hash of 'Satoshi Nakamoto'
+        from bitcoinlib.ecbackends import rfc6979_nonces
+        digest = hashlib.sha256(b'Satoshi Nakamoto').digest()
+        self.assertEqual(0x8f8a276c19f4149656b280621e358cce24f5f52542772691ee69063b74f15d15,
+                         next(rfc6979_nonces(digest, 1)))
+        vectors = [
+            (1, (0x934b1ea10a4b3c1757e2b0c017d0b6143ce3c9a7e6a4a49860d7a6ab210ee3d8,
+                 0x2442ce9d2b916064108014783e923ec36b49743e2ffa1c4496f01a512aafd9e5)),
+            (secp256k1_n - 1, (0xfd567d121db66e382991534ada77a6bd3106f0a1098c231e47993447cd6af2d0,
+                               0x6b39cd0eb1bc8603e159ef5c20a5c8ad685a45b06ce9bebed3f153d10d93bed5)),
+        ]
+        for backend in self.backends:
+            for secret, signature in vectors:
+                self.assertEqual(signature, backend.sign(digest, secret), backend.name)
+            r, s = backend.sign(self.digest, self.secret)
+            self.assertLessEqual(s, secp256k1_n // 2)
+            self.assertEqual((r, s), backend.sign(self.digest, self.secret))
+
+    def test_ec_backends_unknown(self):
+        from bitcoinlib.ecbackends import get_backend, EcBackendError
+        self.assertRaisesRegexp(EcBackendError, "Unknown elliptic curve backend", get_backend, 'openssl')
+
+    def test_ec_backends_generator_table(self):
+        from bitcoinlib.ecbackends import GeneratorTable, _jacobian_to_affine
+        filename = os.path.join(DEFAULT_DOCDIR, 'test_gtable.bin')
+        table = GeneratorTable.build()
+        self.assertTrue(table.save(filename))
+        loaded = GeneratorTable.load(filename)
+        for k in [1, 255, 256, self.secret, secp256k1_n - 1]:
+            self.assertEqual(self.backends[0].ec_point(k), _jacobian_to_affine(loaded.multiply(k)))
+        loaded._data.close()
+        with open(filename, 'r+b') as f:
+            f.seek(1000)
+            f.write(b'\0')
+        self.assertIsNone(GeneratorTable.load(filename))
+        GeneratorTable.load(filename, verify=False)._data.close()
+        # A corrupted table file is replaced by a new table
+        from bitcoinlib import ecbackends
+        saved_table = ecbackends._G_TABLE
+        try:
+            ecbackends._G_TABLE = None
+            table = ecbackends.generator_table(filename)
+            self.assertEqual(self.backends[0].ec_point(self.secret), _jacobian_to_affine(table.multiply(self.secret)))
+            loaded = GeneratorTable.load(filename)
+            self.assertIsNotNone(loaded)
+            loaded._data.close()
+        finally:
+            ecbackends._G_TABLE = saved_table
+        with open(filename, 'r+b') as f:
+            f.seek(4)
+            f.write(b'\x01')
+        self.assertIsNone(GeneratorTable.load(filename))
+        os.remove(filename)
+        self.assertIsNone(GeneratorTable.load(filename))
+
+
 class TestKeysBulk(unittest.TestCase):
     """
     Test Child Key Derivation
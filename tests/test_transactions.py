@@ -18,8 +18,10 @@
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import copy
 import unittest
 import json
+import tempfile
 from bitcoinlib.transactions import *
 from bitcoinlib.keys import HDKey
 
@@ -75,6 +77,50 @@ class TestTransactionInputs(unittest.TestCase):
         ti = Input(prev_hash=ph, output_index=1, keys=k.public())
         self.assertEqual('16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM', ti.keys[0].address())
 
+    def test_transaction_input_lazy_keys(self):
+        ph = 'f2b3eb2deb76566e7324307cd47c35eeb88413f971d88519859b1834307ecfec'
+        pk = '0450863ad64a87ae8a2fe83c1af1a8403cb53f53e486d8511dad8a04887e5b23522cd470243453a299fa9e77237716103abc' \
+             '11a1df38855ed6f2ee187e9c582ba6'
+        ti = Input(prev_hash=ph, output_index=1, keys=[pk, to_bytes(pk)])
+        self.assertEqual([to_bytes(pk)], ti.public_keys)
+        self.assertIsNone(ti._keys)
+        self.assertEqual('16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM', ti.address)
+        self.assertEqual(pk, ti.json()['public_key'])
+        self.assertIsNone(ti._keys)
+        self.assertEqual('16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM', ti.keys[0].address())
+
+    def test_transaction_input_uncompressed_key(self):
+        ph = 'f2b3eb2deb76566e7324307cd47c35eeb88413f971d88519859b1834307ecfec'
+        k = Key(0x18E14A7B6A307F426A94F8114701E7C8E774E7F9A47E2C2035DB29A206321725, compressed=False)
+        ti = Input(prev_hash=ph, output_index=1, keys=k)
+        self.assertEqual([k.public_uncompressed_byte], ti.public_keys)
+        self.assertEqual(k.address(), ti.address)
+        self.assertEqual('16UwLL9Risc3QfPqBUvKofHmBQ7wMtjvM', ti.address)
+        self.assertEqual(b'\x76\xa9\x14' + k.hash160() + b'\x88\xac', ti.unlocking_script_unsigned)
+
+    def test_transaction_input_reset_cached_keys(self):
+        ph = 'f2b3eb2deb76566e7324307cd47c35eeb88413f971d88519859b1834307ecfec'
+        k1 = Key()
+        k2 = Key()
+        ti = Input(prev_hash=ph, output_index=1, keys=k1)
+        self.assertEqual(k1.address(), ti.address)
+        self.assertEqual(k1.public_byte, ti.keys[0].public_byte)
+        unsigned = ti.unlocking_script_unsigned
+        ti.public_keys = [k2.public_byte]
+        self.assertEqual(k2.address(), ti.address)
+        self.assertEqual(k2.public_byte, ti.keys[0].public_byte)
+        self.assertNotEqual(unsigned, ti.unlocking_script_unsigned)
+        ti.script_type = 'nulldata'
+        self.assertEqual('', ti.address)
+        self.assertEqual(b'', ti.unlocking_script_unsigned)
+
+    def test_transaction_input_private_key(self):
+        ph = 'f2b3eb2deb76566e7324307cd47c35eeb88413f971d88519859b1834307ecfec'
+        k = Key()
+        ti = Input(prev_hash=ph, output_index=1, keys=[k.wif(), k.public_hex])
+        self.assertEqual([k.public_byte], ti.public_keys)
+        self.assertTrue(ti.keys[0].isprivate)
+
 
 class TestTransactionOutputs(unittest.TestCase):
 
@@ -103,6 +149,25 @@ class TestTransactionOutputs(unittest.TestCase):
         to = Output(1000, lock_script='76a91423e102597c4a99516f851406f935a6e634dbccec88ac')
         self.assertEqual('14GiCdJHj3bznWpcocjcu9ByCmDPEhEoP8', to.address)
 
+    def test_transaction_output_lazy_address(self):
+        to = Output(1000, lock_script='a914867f84607587f7c2054740c6cae09298ccbcd52887', network='testnet')
+        self.assertEqual('', to._address)
+        self.assertEqual('p2sh', to.script_type)
+        self.assertEqual('2N5WPJ2qPzVpy5LeE576JCwZfWg1ikjUxdK', to.address)
+        self.assertIsNone(to.k)
+
+    def test_transaction_output_from_hash160(self):
+        to = Output.from_hash160(1000, to_bytes('23e102597c4a99516f851406f935a6e634dbccec'))
+        self.assertEqual(to_bytes('76a91423e102597c4a99516f851406f935a6e634dbccec88ac'), to.lock_script)
+        self.assertEqual('14GiCdJHj3bznWpcocjcu9ByCmDPEhEoP8', to.address)
+        to = Output.from_hash160(1000, to_bytes('867f84607587f7c2054740c6cae09298ccbcd528'), 'p2sh', 'testnet')
+        self.assertEqual('2N5WPJ2qPzVpy5LeE576JCwZfWg1ikjUxdK', to.address)
+        self.assertRaisesRegexp(TransactionError, "Unknown output script type", Output.from_hash160, 1000,
+                               to_bytes('867f84607587f7c2054740c6cae09298ccbcd528'), 'multisig')
+
+    def test_transaction_output_invalid_public_key(self):
+        self.assertRaisesRegexp(TransactionError, "Invalid public key", Output, 1000, public_key='0550863ad64a87ae')
+
 
 class TestTransactions(unittest.TestCase):
 
@@ -153,6 +218,114 @@ class TestTransactions(unittest.TestCase):
         self.assertEqual(dt[1][0].address, '2NEgmZU64NjiZsxPULekrFcqdS7YwvYh24r')
         self.assertEqual(dt[1][1].address, '2N1XCxDRsyi8so3wr6C5xj5Arcv2wej7znf')
 
+    def test_transactions_parse_records(self):
+        rawtx = binascii.unhexlify(self.rawtxs[0][1])
+        version, inputs, outputs, locktime, end = transaction_parse(b'junk' + rawtx + b'junk', offset=4)
+        self.assertEqual(len(rawtx) + 4, end)
+        self.assertEqual(self.rawtxs[0][2], len(inputs))
+        self.assertEqual(self.rawtxs[0][3], len(outputs))
+        self.assertIsInstance(inputs[0][2], memoryview)
+        t = Transaction.import_raw(rawtx, self.rawtxs[0][4])
+        self.assertIsNone(t._inputs)
+        self.assertEqual(inputs[0][0], t.inputs[0].prev_hash)
+        self.assertEqual(outputs[0][0], t.outputs[0].amount)
+        self.assertEqual(inputs[0][2].tobytes(), t.inputs[0].unlocking_script)
+        self.assertEqual(binascii.hexlify(t.raw()).decode(), self.rawtxs[0][1])
+        self.assertRaisesRegexp(TransactionError, "data is truncated or malformed", transaction_parse, rawtx[:-1])
+
+    def test_transactions_txid_cached_raw(self):
+        rawtx = binascii.unhexlify(self.rawtxs[0][1])
+        txid = to_hexstring(hashlib.sha256(hashlib.sha256(rawtx).digest()).digest()[::-1])
+        t = Transaction.import_raw(rawtx, self.rawtxs[0][4])
+        self.assertEqual(txid, t.txid)
+        self.assertEqual(txid, to_hexstring(t.hash))
+        self.assertIs(t.raw(), t.raw())
+        self.assertIsNone(t._inputs)
+        locktime = t.locktime
+        t.locktime = 1
+        self.assertNotEqual(txid, t.txid)
+        t.locktime = locktime
+        self.assertEqual(rawtx, t.raw())
+        self.assertEqual(txid, t.txid)
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        self.assertEqual(self.rawtxs[0][3] + 1, len(Transaction.import_raw(t.raw()).outputs))
+        self.assertNotEqual(txid, t.txid)
+
+    def test_transactions_txid_cached_changed_in_place(self):
+        rawtx = binascii.unhexlify(self.rawtxs[0][1])
+        t = Transaction.import_raw(rawtx, self.rawtxs[0][4])
+        txid = t.txid
+        sighash = t.signature_hash(0)
+        amount = t.outputs[0].amount
+        t.outputs[0].amount = 5
+        self.assertNotEqual(txid, t.txid)
+        self.assertNotEqual(sighash, t.signature_hash(0))
+        t.outputs[0].amount = amount
+        self.assertEqual(txid, t.txid)
+        self.assertEqual(sighash, t.signature_hash(0))
+        sequence = t.inputs[0].sequence
+        t.inputs[0].sequence = b'\x01\x00\x00\x00'
+        self.assertNotEqual(txid, t.txid)
+        self.assertEqual(hashlib.sha256(hashlib.sha256(t.raw(0)).digest()).digest(), t.signature_hash(0))
+        t.inputs[0].sequence = sequence
+        self.assertEqual(txid, t.txid)
+        output = t.outputs.pop()
+        self.assertNotEqual(txid, t.txid)
+        t.outputs.append(output)
+        self.assertEqual(txid, t.txid)
+        self.assertEqual(rawtx, t.raw())
+        t2 = copy.deepcopy(t)
+        t2.outputs[0].amount = 5
+        self.assertEqual(txid, t.txid)
+        self.assertNotEqual(txid, t2.txid)
+
+    def test_transactions_iter_file(self):
+        rawtxs = [binascii.unhexlify(r[1]) for r in self.rawtxs]
+        with tempfile.TemporaryFile() as f:
+            f.write(b''.join(rawtxs))
+            f.flush()
+            f.seek(0)
+            res = list(iter_transactions(f))
+        self.assertEqual(len(rawtxs), len(res))
+        start = 0
+        for rawtx, r, (txid, t, tx_start, tx_end) in zip(rawtxs, self.rawtxs, res):
+            self.assertEqual((start, start + len(rawtx)), (tx_start, tx_end))
+            self.assertEqual(to_hexstring(hashlib.sha256(hashlib.sha256(rawtx).digest()).digest()[::-1]), txid)
+            self.assertEqual(r[3], len(t._records[1]))
+            start = tx_end
+        self.assertEqual(res[2][1].outputs[0].amount,
+                         list(iter_transactions(b''.join(rawtxs), offset=res[2][2], count=1))[0][1].outputs[0].amount)
+        self.assertEqual([], list(iter_transactions(b'')))
+
+    def test_transactions_block_parse(self):
+        rawblock = binascii.unhexlify(
+            '01000000' + '00' * 32 + '3ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa4b1e5e4a29ab5f49ffff00'
+            '1d1dac2b7c0101000000010000000000000000000000000000000000000000000000000000000000000000ffffffff4d04ffff'
+            '001d0104455468652054696d65732030332f4a616e2f32303039204368616e63656c6c6f72206f6e206272696e6b206f662073'
+            '65636f6e64206261696c6f757420666f722062616e6b73ffffffff0100f2052a01000000434104678afdb0fe5548271967f1a6'
+            '7130b7105cd6a828e03909a67962e0ea1f61deb649f6bc3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d'
+            '5fac00000000')
+        b = Block.parse(rawblock)
+        self.assertEqual('000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f', b.block_hash)
+        self.assertEqual(['4a5e1e4baab89f3a32518a88c31bc87f618f76673e2cc77ab2127b7afdeda33b'], b.txids)
+        self.assertEqual(b.merkle_root, b.calculate_merkle_root())
+        self.assertEqual((1231006505, 0x1d00ffff, 2083236893), (b.time, b.bits, b.nonce))
+        self.assertEqual([(81, len(rawblock))], b.offsets)
+        self.assertTrue(b.verify())
+        self.assertRaisesRegexp(TransactionError, "data is truncated or malformed", Block.parse, rawblock[:-1])
+        self.assertEqual(b.block_hash, Block.parse(to_hexstring(rawblock)).block_hash)
+        self.assertRaisesRegexp(TransactionError, "not an existing filename or a hexadecimal string", Block.parse,
+                                'nonexistent_block.dat')
+        f = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            f.write(rawblock)
+            f.close()
+            b = Block.parse(f.name)
+            self.assertEqual(b.txids, Block.parse(f.name).txids)
+            self.assertEqual(len(rawblock) - 81, len(b.transactions[0].raw()))
+        finally:
+            os.remove(f.name)
+
     def test_transactions_verify_signature(self):
         for r in self.rawtxs:
             print("Verify %s" % r[0])
@@ -160,6 +333,283 @@ class TestTransactions(unittest.TestCase):
             if len(t.inputs) < 5:
                 self.assertTrue(t.verify(), msg="Can not verify transaction '%s'" % r[0])
 
+    def test_transactions_verify_signature_der(self):
+        k = Key()
+        digest = hashlib.sha256(b'der signature').digest()
+        r, s = ecbackends.backend.sign(digest, k.secret)
+        sig_der = ecdsa.util.sigencode_der(r, s, secp256k1_n)
+        sig_raw = binascii.unhexlify('%064x%064x' % (r, s))
+        self.assertTrue(verify_signature(digest, sig_raw, k.public_byte))
+        self.assertTrue(verify_signature(digest, sig_der, k.public_byte))
+        self.assertTrue(verify_signature(digest, sig_der + b'\x01', k.public_byte))
+        self.assertFalse(verify_signature(digest, sig_der + b'\x01\x01', k.public_byte))
+        self.assertFalse(verify_signature(digest, sig_der[:-1], k.public_byte))
+
+    def test_transactions_signature_hash(self):
+        t = Transaction.import_raw(self.rawtxs[4][1], self.rawtxs[4][4])
+        for i in t.inputs:
+            self.assertEqual(hashlib.sha256(hashlib.sha256(t.raw(i.tid)).digest()).digest(), t.signature_hash(i.tid))
+            self.assertTrue(verify_signature(t.signature_hash(i.tid), i.signatures[0]['signature'],
+                                             i.keys[0].public_byte))
+        t.add_output(1000, 'mkzpsGwaUU7rYzrDZZVXFne7dXEeo6Zpw2')
+        self.assertIsNone(t._sighash)
+
+        keys = [Key(), Key()]
+        t = Transaction()
+        for n, k in enumerate(keys):
+            t.add_input(hashlib.sha256(k.private_byte).digest(), n, k)
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        sighash = t.signature_hash(1)
+        engine = t._sighash
+        t.sign(keys[0], 0)
+        self.assertIs(engine, t._sighash)
+        self.assertEqual(sighash, t.signature_hash(1))
+        t.sign(keys[1], 1)
+        self.assertTrue(verify_signature(sighash, t.inputs[1].signatures[0]['signature'], keys[1].public_byte))
+
+        engine = SignatureHash(t)
+        t.add_input(hashlib.sha256(b'extra').digest(), 2, keys[0])
+        t.outputs.pop()
+        t.add_output(2000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        for tid in (2, 0, 1):
+            self.assertEqual(hashlib.sha256(hashlib.sha256(t.raw(tid)).digest()).digest(), engine.hash(tid))
+            self.assertEqual(t.raw(tid)[:-4], engine.preimage(tid)[:-4])
+        self.assertEqual(3, len(engine.positions) - 1)
+
+    def test_transactions_sign_all(self):
+        keys = [Key(), Key(), Key()]
+        t = Transaction()
+        for n in range(6):
+            t.add_input(hashlib.sha256(b'%d' % n).digest(), n, keys[n % 2])
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        t2 = copy.deepcopy(t)
+        self.assertEqual(6, t.sign_all(keys))
+        self.assertEqual(0, t.sign_all(keys))
+        for i in t.inputs:
+            self.assertTrue(verify_signature(t.signature_hash(i.tid), i.signatures[0]['signature'],
+                                             i.keys[0].public_byte))
+        self.assertEqual(6, t2.sign_all([k.wif() for k in keys], processes=2))
+        self.assertEqual(t.raw(), t2.raw())
+        self.assertTrue(all(verify_signature(t2.signature_hash(i.tid), i.signatures[0]['signature'],
+                                             i.keys[0].public_byte) for i in t2.inputs))
+
+    def test_transactions_sign_uncompressed_key(self):
+        k = Key('5KJvsngHeMpm884wtkJNzQGaCErckhHJBGFsvd3VyK5qMZXj3hS')
+        t = Transaction()
+        t.add_input(hashlib.sha256(k.private_byte).digest(), 0, k)
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        self.assertEqual('1JwSSubhmg6iPtRjtyqhUYYH7bZg3Lfy1T', t.inputs[0].address)
+        self.assertEqual(1, t.sign(k))
+        self.assertTrue(t.verify())
+        utxos = {(to_hexstring(t.inputs[0].prev_hash), 0): b'\x76\xa9\x14' + k.hash160() + b'\x88\xac'}
+        self.assertTrue(t.verify_scripts(utxos)[0]['valid'])
+        self.assertEqual('1JwSSubhmg6iPtRjtyqhUYYH7bZg3Lfy1T', Transaction.import_raw(t.raw()).inputs[0].address)
+
+    def test_transactions_verify_batch(self):
+        t = Transaction.import_raw(self.rawtxs[5][1], self.rawtxs[5][4])
+        items = [(t.signature_hash(i.tid), i.signatures[0]['signature'], i.keys[0].public_byte) for i in t.inputs]
+        items[3] = (items[4][0], items[3][1], items[3][2])
+        items.append((items[0][0], b'\x30\x01', items[0][2]))
+        expected = [True] * len(t.inputs) + [False]
+        expected[3] = False
+        self.assertEqual(expected, verify_batch(items))
+        self.assertEqual(expected, verify_batch(items, processes=2, chunksize=50))
+        self.assertTrue(t.verify())
+        t.inputs[3].signatures[0]['signature'] = items[1][1]
+        self.assertFalse(t.verify())
+
+    def test_transactions_verify_off_curve_public_key(self):
+        # Public key with y = 0 is not on the curve, signature (r, s) = ((2G).x, z / 2) must not be accepted
+        digest = hashlib.sha256(b'off curve').digest()
+        z = int(binascii.hexlify(digest), 16)
+        r = Key(2).public_point()[0]
+        s = z * pow(2, secp256k1_n - 2, secp256k1_n) % secp256k1_n
+        signature = binascii.unhexlify('%064x%064x' % (r, s))
+        public_key = b'\x04' + binascii.unhexlify('%064x' % 5) + b'\0' * 32
+        backend = ecbackends.backend.name
+        try:
+            for name in ['ecdsa', 'python']:
+                ecbackends.set_backend(name)
+                self.assertFalse(verify_signature(digest, signature, public_key))
+                self.assertEqual([False, False], verify_batch([(digest, signature, public_key),
+                                                               (digest, signature, b'\x02' + b'\xff' * 32)]))
+        finally:
+            ecbackends.set_backend(backend)
+
+    def test_transactions_verify_inputs(self):
+        t = Transaction.import_raw(self.rawtxs[2][1], self.rawtxs[2][4])
+        results = t.verify_inputs()
+        self.assertEqual([0, 1, 2, 3], [res['tid'] for res in results])
+        self.assertTrue(all(res['valid'] and not res['error'] and res['time'] >= 0 for res in results))
+        t.inputs[1].signatures[0]['signature'] = t.inputs[0].signatures[0]['signature']
+        t.inputs[2].signatures = []
+        self.assertEqual([True, False, False, True], [res['valid'] for res in t.verify_inputs()])
+        results = t.verify_inputs(stop_on_failure=True)
+        self.assertEqual(2, len(results))
+        self.assertEqual("Invalid signature found", results[1]['error'])
+        self.assertFalse(t.verify())
+        self.assertFalse(t.verify(stop_on_failure=True))
+
+    def test_transactions_block_verify(self):
+        transactions = [Transaction.import_raw(r[1], r[4]) for r in self.rawtxs if r[4] == 'bitcoin']
+        self.assertTrue(Block(transactions=transactions).verify())
+        transactions[1].inputs[0].signatures[0]['signature'] = transactions[0].inputs[0].signatures[0]['signature']
+        self.assertFalse(Block(transactions=transactions).verify())
+
+    def test_transactions_verify_unsupported_script(self):
+        k = Key()
+        t = Transaction()
+        t.add_input(hashlib.sha256(b'input 1').digest(), 0, k)
+        t.add_input(hashlib.sha256(b'input 2').digest(), 0, k)
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        t.sign(k)
+        t.inputs[1].unlocking_script = b'\x51'
+        rawtx = t.raw()
+        t2 = Transaction.import_raw(rawtx)
+        self.assertEqual('unknown', t2.inputs[1].script_type)
+        self.assertEqual(rawtx, t2.raw())
+        results = t2.verify_inputs()
+        self.assertEqual([True, False], [res['valid'] for res in results])
+        self.assertEqual("Unsupported unlocking script 51", results[1]['error'])
+        self.assertFalse(t2.verify())
+        transactions = [Transaction.import_raw(r[1], r[4]) for r in self.rawtxs if r[4] == 'bitcoin']
+        self.assertFalse(Block(transactions=transactions + [Transaction.import_raw(rawtx)]).verify())
+
+    def test_transactions_verify_scripts(self):
+        t = Transaction.import_raw(self.rawtxs[2][1], self.rawtxs[2][4])
+        utxos = {}
+        for i in t.inputs:
+            utxos[(to_hexstring(i.prev_hash), struct.unpack('>I', i.output_index)[0])] = \
+                b'\x76\xa9\x14' + i.keys[0].hash160() + b'\x88\xac'
+        for batch in [True, False]:
+            results = t.verify_scripts(utxos, batch=batch)
+            self.assertEqual([0, 1, 2, 3], [res['tid'] for res in results])
+            self.assertTrue(all(res['valid'] and res['steps'] == 7 for res in results))
+        utxo_keys = list(utxos.keys())
+        utxos[utxo_keys[1]] = Output(1000, lock_script=utxos[utxo_keys[1]])
+        utxos[utxo_keys[2]] = utxos[utxo_keys[0]]
+        del utxos[utxo_keys[3]]
+        results = t.verify_scripts(utxos)
+        self.assertEqual([True, True, False, False], [res['valid'] for res in results])
+        self.assertEqual("OP_EQUALVERIFY failed", results[2]['error'])
+        self.assertEqual("Spent output not found in UTXO set", results[3]['error'])
+        self.assertEqual(3, len(t.verify_scripts(utxos, stop_on_failure=True)))
+
+        utxos[utxo_keys[2]] = b'\x76\xa9\x14' + t.inputs[2].keys[0].hash160() + b'\x88\xac'
+        utxos[utxo_keys[3]] = b'\x76\xa9\x14' + t.inputs[3].keys[0].hash160() + b'\x88\xac'
+        t.inputs[0].unlocking_script = t.inputs[1].unlocking_script
+        utxos[utxo_keys[0]] = utxos[utxo_keys[1]]
+        for batch in [True, False]:
+            results = t.verify_scripts(utxos, batch=batch)
+            self.assertEqual([False, True, True, True], [res['valid'] for res in results])
+
+    def test_transactions_verify_scripts_check_dependent(self):
+        # Script succeeds if the signature is invalid, the batch checker can not assume OP_CHECKSIG succeeds
+        import ecdsa
+        from bitcoinlib import ecbackends
+        k = Key()
+        t = Transaction()
+        t.add_input(hashlib.sha256(k.private_byte).digest(), 0, k)
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        lock_script = struct.pack('B', len(k.public_byte)) + k.public_byte + b'\xac\x91'
+        utxos = {(to_hexstring(t.inputs[0].prev_hash), 0): lock_script}
+        r, s = ecbackends.backend.sign(t.signature_hash(0, SIGHASH_ALL, lock_script), k.secret)
+        signature = ecdsa.util.sigencode_der(r, s, secp256k1_n) + b'\x01'
+        invalid_signature = ecdsa.util.sigencode_der(r, s - 1, secp256k1_n) + b'\x01'
+        for sig, valid in [(invalid_signature, True), (signature, False)]:
+            t.inputs[0].unlocking_script = struct.pack('B', len(sig)) + sig
+            for batch in [True, False]:
+                self.assertEqual(valid, t.verify_scripts(utxos, batch=batch)[0]['valid'])
+            interpreter = ScriptInterpreter(BatchSignatureChecker(t, 0))
+            interpreter.verify(t.inputs[0].unlocking_script, lock_script)
+            self.assertTrue(interpreter.check_dependent)
+        t.sign(k)
+        interpreter = ScriptInterpreter(BatchSignatureChecker(t, 0))
+        self.assertTrue(interpreter.verify(t.inputs[0].unlocking_script, t.inputs[0].unlocking_script_unsigned))
+        self.assertFalse(interpreter.check_dependent)
+
+    def test_transactions_verify_scripts_multisig(self):
+        keys = [HDKey(network='testnet') for _ in range(3)]
+        prev_hash = 'f4b7ed3ff4fb1a1fa95e7a2a6e0a8a8eae0a3b0c6c1e0a7f4e1c4a4b0c0d0e0f'
+        t = Transaction(network='testnet')
+        t.add_input(prev_hash, 1, [k.public_byte for k in keys], script_type='p2sh_multisig', sigs_required=2)
+        t.add_output(100000, 'mi1Lxs5boL6nDM3teraP3moVfLXJXWrWSK')
+        utxos = {(prev_hash, 1): b'\xa9\x14' + script_to_pubkeyhash(t.inputs[0].redeemscript) + b'\x87'}
+        t.sign(keys[2].private_byte)
+        self.assertFalse(t.verify_scripts(utxos)[0]['valid'])
+        t.sign(keys[0].private_byte)
+        trace = []
+        self.assertTrue(t.verify_scripts(utxos, trace=lambda step, op, stack: trace.append(op))[0]['valid'])
+        self.assertEqual(13, len(trace))
+        self.assertEqual(['OP_0', 'OP_HASH160'], [trace[0], trace[4]])
+        self.assertEqual(['OP_PUSHBYTES_20', 'OP_EQUAL', 'OP_2'], trace[5:8])
+        self.assertEqual(['OP_PUSHBYTES_33'] * 3 + ['OP_3', 'OP_CHECKMULTISIG'], trace[8:])
+        result = t.verify_scripts(utxos, max_steps=10)[0]
+        self.assertFalse(result['valid'])
+        self.assertEqual("Script evaluation exceeds step limit of 10 opcodes", result['error'])
+
+    def test_transactions_script_interpreter(self):
+        si = ScriptInterpreter()
+        self.assertEqual([b'\x01'], si.evaluate(b'\x52\x53\x93\x55\x87'))
+        self.assertEqual([b'\x03'], si.evaluate(b'\x00\x63\x52\x67\x53\x68'))
+        self.assertEqual([b'\x02', b'\x03', b'\x01'], si.evaluate(b'\x51\x52\x53\x7b'))
+        self.assertEqual([b'\x81', b'\x80\x00'], si.evaluate(b'\x4f\x02\x7f\x00\x8b'))
+        self.assertTrue(si.verify(b'\x04test', b'\xa8\x20' + hashlib.sha256(b'test').digest() + b'\x87'))
+        self.assertFalse(si.verify(b'', b'\x51\x7d'))
+        self.assertEqual("Not enough items on stack for OP_TUCK", si.error)
+        self.assertFalse(si.verify(b'', b'\x00\x63\x7e\x68\x51'))
+        self.assertEqual("Disabled opcode OP_CAT found", si.error)
+        self.assertFalse(si.verify(b'\x51', b'\x6a'))
+        self.assertFalse(si.verify(b'\x51', b'\x63'))
+        self.assertFalse(si.verify(b'\x51', b'\x4c\x05\x00'))
+        # Without a signature checker all signatures are invalid
+        self.assertFalse(si.verify(b'\x01\x01', b'\x21' + b'\x02' * 33 + b'\xac'))
+
+    def test_transactions_estimate_size(self):
+        for r in self.rawtxs:
+            t = Transaction.import_raw(r[1], r[4])
+            self.assertEqual(len(t.raw()), t.estimate_size())
+
+        keys = [Key(), Key()]
+        t = Transaction()
+        for n, k in enumerate(keys):
+            t.add_input(hashlib.sha256(k.private_byte).digest(), n, k.public_byte)
+        t.add_output(1000, '12ooWd8Xag7hsgP9PBPnmyGe36VeUrpMSH')
+        t.add_output(1000, lock_script=b'\xa9\x14' + b'\x01' * 20 + b'\x87')
+        estimated = t.estimate_size()
+        t.sign_all(keys)
+        self.assertTrue(len(t.raw()) <= estimated <= len(t.raw()) + 4)
+        self.assertEqual(len(t.raw()), t.estimate_size())
+
+        se = SizeEstimator()
+        self.assertEqual(148, se.add_input('p2pkh'))
+        self.assertEqual(148, se.add_input('p2pkh'))
+        self.assertEqual(34, se.add_output('p2pkh'))
+        self.assertEqual(32, se.add_output(lock_script=t.outputs[1].lock_script))
+        self.assertEqual(estimated, se.size)
+        self.assertEqual(int(estimated / 1024.0 * 10000), se.fee(10000))
+        self.assertEqual(180, se.add_input('p2pkh', compressed=False))
+        self.assertRaisesRegexp(TransactionError, "Unknown input script type", se.add_input, 'pubkey')
+
+        t = Transaction()
+        t.fee_per_kb = 10000
+        t.add_input(self.rawtxs[0][1][:64], 0, unlocking_script=b'\x51\x51', script_type='p2pk')
+        self.assertEqual(len(t.raw()), t.estimate_size())
+        self.assertEqual(int(len(t.raw()) / 1024.0 * 10000), t.estimate_fee())
+
+    def test_transactions_estimate_size_multisig(self):
+        keys = [HDKey(network='testnet') for _ in range(3)]
+        t = Transaction(network='testnet')
+        t.add_input(self.rawtxs[0][1][:64], 0, [k.public_byte for k in keys], script_type='p2sh_multisig',
+                    sigs_required=2)
+        t.add_output(100000, 'mi1Lxs5boL6nDM3teraP3moVfLXJXWrWSK')
+        estimated = t.estimate_size()
+        self.assertEqual(estimate_input_size('p2sh_multisig', sigs_required=2, n_keys=3) + 44, estimated)
+        t.sign(keys[0].private_byte)
+        self.assertEqual(estimated, t.estimate_size())
+        t.sign(keys[2].private_byte)
+        self.assertTrue(len(t.raw()) <= estimated <= len(t.raw()) + 8)
+
     def test_transactions_serialize_raw(self):
         for r in self.rawtxs:
             print("Serialize %s" % r[0])
@@ -278,6 +728,35 @@ class TestTransactionsScriptType(unittest.TestCase):
         s = binascii.unhexlify('5123032487c2a32f7c8d57d2a93906a6457afd00697925b0e6e145d89af6d3bca330162102308673d169')
         self.assertRaisesRegexp(TransactionError, 'is not an op_n code', script_deserialize, s)
 
+    def test_transaction_script_type_pubkey(self):
+        s = binascii.unhexlify('4104678afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6bc3f4cef38c4f355'
+                               '04e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac')
+        res = script_deserialize(s)
+        self.assertEqual('pubkey', res['script_type'])
+        self.assertEqual(s[1:66], res['signatures'][0])
+
+    def test_transaction_script_deserialize_templates(self):
+        from bitcoinlib.transactions import _script_deserialize_parse, _SCRIPT_CACHE
+        scripts = [
+            '76a914af8e14a2cecd715c363b3a72b55b59a31e2acac988ac',
+            'a914e3bdbeab033c7e03fd4cbf3a03ff14533260f3f487',
+            '6a20985f23805edd2938e5bd9f744d36ccb8be643de00b369b901ae0b3fea911a1dd',
+            '5121032487c2a32f7c8d57d2a93906a6457afd00697925b0e6e145d89af6d3bca330162102308673d16987eaa010e540901cc6fe'
+            '3695e758c19f46ce604e174dac315e685a52ae',
+            '47304402201f6e18f4532e14f328bc820cb78c53c57c91b1da9949fecb8cf42318b791fb38022045e78c9e55df1cf3db74bfd52f'
+            'f2add2b59ba63e068680f0023e6a80ac9f51f401210239a18d586c34e51238a7c9a27a342abfb35e3e4aa5ac6559889db1dab281'
+            '6e9d',
+            # Not matched by a template: p2pkh with extra byte
+            '76a914af8e14a2cecd715c363b3a72b55b59a31e2acac988ac00',
+        ]
+        for script in scripts:
+            script = binascii.unhexlify(script)
+            expected = _script_deserialize_parse(script)
+            self.assertEqual(expected, script_deserialize(script))
+            self.assertIn(script, _SCRIPT_CACHE)
+            script_deserialize(script)['signatures'].append(b'')
+            self.assertEqual(expected, script_deserialize(script))
+
     def test_transaction_script_type_empty_unknown(self):
         self.assertEqual('empty', script_deserialize(b'')['script_type'])
 
@@ -421,6 +900,17 @@ class TestTransactionsMultisig(unittest.TestCase):
 
         self.assertTrue(t.verify())
 
+        sigs = t.inputs[0].signatures
+        t.inputs[0].signatures = [sigs[1], sigs[0], sigs[2]]
+        self.assertEqual("Signatures are not ordered like the public keys or sign the same key twice",
+                         t.verify_inputs()[0]['error'])
+        t.inputs[0].signatures = [sigs[0], sigs[0], sigs[2]]
+        self.assertFalse(t.verify())
+        t.inputs[0].signatures = [sigs[0], sigs[1], dict(sigs[2], pub_key=Key().public_byte)]
+        self.assertIn("is not a key of this input", t.verify_inputs()[0]['error'])
+        t.inputs[0].signatures = sigs
+        self.assertTrue(t.verify())
+
     def test_transaction_multisig_sign_2_of_5_not_enough(self):
         t = Transaction(network='testnet')
         t.add_input(self.utxo_prev_tx, self.utxo_output_n,
@@ -447,6 +937,27 @@ class TestTransactionsMultisig(unittest.TestCase):
         self.assertEqual(t.sign(self.pk1.private_byte), 1)
         self.assertEqual(t.sign(self.pk1.private_byte), 0)
 
+    def test_transaction_multisig_sign_11_of_15_imported(self):
+        keys = [HDKey(network='testnet') for _ in range(15)]
+        t = Transaction(network='testnet')
+        t.add_input(self.utxo_prev_tx, self.utxo_output_n, [k.public_byte for k in keys],
+                    script_type='p2sh_multisig', sigs_required=11)
+        t.add_output(100000, 'mi1Lxs5boL6nDM3teraP3moVfLXJXWrWSK')
+        for n in [13, 2, 7, 0, 9]:
+            t.sign(keys[n].private_byte)
+
+        t2 = Transaction.import_raw(t.raw(), network='testnet')
+        self.assertEqual(['', '', '', '', ''], [sig['pub_key'] for sig in t2.inputs[0].signatures])
+        for n in [14, 12, 5, 3, 1, 4]:
+            self.assertEqual(1, t2.sign(keys[n].private_byte))
+        self.assertLessEqual(len(t2._verified), 15)
+        self.assertEqual([keys[n].public_byte for n in [0, 1, 2, 3, 4, 5, 7, 9, 12, 13, 14]],
+                         [sig['pub_key'] for sig in t2.inputs[0].signatures])
+        self.assertEqual(0, t2.sign(keys[9].private_byte))
+        tsig = t2.signature_hash(0)
+        for sig in t2.inputs[0].signatures:
+            self.assertTrue(verify_signature(tsig, sig['signature'], sig['pub_key']))
+
     def test_transaction_multisig_sign_extra_sig(self):
         t = Transaction(network='testnet')
         t.add_input(self.utxo_prev_tx, self.utxo_output_n,
@@ -159,6 +159,13 @@ class TestWalletImport(unittest.TestCase):
         self.assertEqual(newkey.address, u'LPkJcpV1cmT8qLFmUApySBtxt7UWavoQmh')
         self.assertEqual(newkey.path, "m/44'/2'/0'/0/0")
 
+    def test_wallet_import_key_uncompressed(self):
+        w = HDWallet.create(
+            name='Wallet Uncompressed',
+            databasefile=DATABASEFILE_UNITTESTS)
+        k = w.import_key('5KJvsngHeMpm884wtkJNzQGaCErckhHJBGFsvd3VyK5qMZXj3hS')
+        self.assertEqual('1JwSSubhmg6iPtRjtyqhUYYH7bZg3Lfy1T', k.address)
+
     def test_wallet_import_key_network_error(self):
         w = HDWallet.create(
             name='Wallet Error',
@@ -342,6 +349,23 @@ class TestWalletBitcoinlibTestnet(unittest.TestCase):
         self.assertRaisesRegexp(WalletError, 'Not enough unspent transaction outputs found', w.send_to,
                                 '21DBmFUMQMP7A6KeENXgZQ4wJdSCeGc2zFo', balance),
 
+    def test_wallet_bitcoinlib_testnet_transaction_fee(self):
+        if os.path.isfile(DATABASEFILE_UNITTESTS):
+            os.remove(DATABASEFILE_UNITTESTS)
+        w = HDWallet.create(
+            network='bitcoinlib_test',
+            name='test_wallet_bitcoinlib_testnet',
+            databasefile=DATABASEFILE_UNITTESTS)
+        w.new_key()
+        w.utxos_update()
+        t = w.transaction_create([('21DBmFUMQMP7A6KeENXgZQ4wJdSCeGc2zFo', 50000000)])
+        estimated_size = t.estimate_size()
+        self.assertEqual(int(estimated_size / 1024.0 * t.fee_per_kb), t.fee)
+        self.assertEqual(100000000 - 50000000 - t.fee, t.change)
+        t = w.transaction_sign(t)
+        self.assertTrue(t.verify())
+        self.assertTrue(len(t.raw()) <= estimated_size <= len(t.raw()) + 2)
+
     def test_wallet_bitcoinlib_testnet_sweep(self):
         if os.path.isfile(DATABASEFILE_UNITTESTS):
             os.remove(DATABASEFILE_UNITTESTS)
@@ -584,6 +608,25 @@ class TestWalletMultisig(unittest.TestCase):
         t = wl.transaction_sign(t, keys[1])
         self.assertEqual(wl.transaction_send(t), 'succesfull_test_sendrawtransaction')
 
+    def test_wallet_multisig_sign_duplicate_keys(self):
+        if os.path.isfile(DATABASEFILE_UNITTESTS):
+            os.remove(DATABASEFILE_UNITTESTS)
+        keys = [
+            HDKey(network='bitcoinlib_test'),
+            HDKey(network='bitcoinlib_test', key_type='single')
+        ]
+        key_list = [keys[0], keys[1].public()]
+
+        wl = HDWallet.create_multisig('multisig_expk2_dedupe', key_list, sigs_required=2,
+                                      network='bitcoinlib_test', databasefile=DATABASEFILE_UNITTESTS)
+        wl.new_key()
+        wl.utxos_update()
+
+        t = wl.transaction_create([(HDKey(network='bitcoinlib_test').key.address(), 6400000)], min_confirms=0)
+        t = wl.transaction_sign(t, [keys[1], keys[1].wif()])
+        self.assertEqual(2, len(t.inputs[0].signatures))
+        self.assertTrue(t.verify())
+
     def test_wallet_multisig_sorted_keys(self):
         if os.path.isfile(DATABASEFILE_UNITTESTS):
             os.remove(DATABASEFILE_UNITTESTS)